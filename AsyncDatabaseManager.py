@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from DatabaseManager import DatabaseManager
+
+
+# Accès asynchrone à la base de données
+class AsyncDatabaseManager:
+    """
+    Équivalent asynchrone de DatabaseManager pour une application asyncio.
+
+    Chaque opération de DatabaseManager existe ici sous forme de coroutine, avec la
+    même signature et le même résultat. Les lectures sont exécutées par un pool
+    borné de threads, chacun avec sa propre connexion SQLite (lectures concurrentes
+    grâce au mode WAL). Les écritures passent par un thread unique et sont donc
+    sérialisées.
+    """
+    READ_METHODS = (
+        'get_schema_version', 'get_all_categories', 'get_category_shards', 'get_cards_by_category',
+        'get_cards_page', 'get_card_key_at', 'get_page_keys', 'count_cards', 'get_category_card_counts',
+        'get_category_stats', 'get_all_category_stats', 'get_due_cards', 'get_next_due',
+        'get_card_keys_by_category', 'get_due_card_keys', 'get_card_categories', 'get_card_texts',
+        'get_last_grade_sequence', 'search_cards', 'get_search_statistics', 'get_global_stats',
+        'get_category_review_stats', 'get_user_stats', 'get_daily_review_stats', 'get_all_users',
+    )
+    WRITE_METHODS = (
+        'setup_database', 'add_category', 'add_user', 'assign_category_shard', 'rename_category',
+        'delete_category', 'set_card_id_floor', 'add_card', 'add_cards_bulk', 'delete_card',
+        'deduplicate_cards', 'update_card_score', 'apply_grades', 'rebuild_search_index',
+        'rebuild_review_stats', 'rebuild_category_stats', 'record_session', 'update_global_stats',
+    )
+
+    def __init__(self, db_name='flashcards.db', pool_size=4, **options):
+        """
+        :param db_name: Nom du fichier de la base de données SQLite.
+        :param pool_size: Nombre maximal de connexions de lecture.
+        :param options: Options transmises à chaque DatabaseManager (busy_timeout, algorithm...).
+                        Par défaut, chaque thread garde sa connexion (persistent=True).
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size doit être supérieur à 0")
+        self._db_name = db_name
+        self._options = dict(options)
+        self._options.setdefault('persistent', True)
+        self._options['check_same_thread'] = False  # Connexion fermée par close depuis un autre thread
+        self._readers = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='sqlite-read')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-write')
+        self._local = threading.local()
+        self._managers = []  # Toutes les connexions ouvertes, pour la fermeture
+        self._managers_lock = threading.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _manager(self):
+        """
+        Retourne le DatabaseManager propre au thread courant.
+        """
+        manager = getattr(self._local, 'manager', None)
+        if manager is None:
+            manager = DatabaseManager(self._db_name, **self._options)
+            self._local.manager = manager
+            with self._managers_lock:
+                self._managers.append(manager)
+        return manager
+
+    def _call(self, name, args, kwargs):
+        return getattr(self._manager(), name)(*args, **kwargs)
+
+    async def _run(self, executor, name, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(self._call, name, args, kwargs))
+
+    async def iter_cards_by_category(self, category_id, batch_size=500):
+        """
+        Parcourt les cartes d'une catégorie (triées par score) sans les charger toutes,
+        par pages de batch_size cartes.
+        """
+        after = None
+        while True:
+            cards = await self.get_cards_page(category_id, after, batch_size)
+            for card in cards:
+                yield card
+            if len(cards) < batch_size:
+                return
+            after = (cards[-1][3], cards[-1][0])
+
+    async def close(self):
+        """
+        Attend la fin des opérations en cours et ferme toutes les connexions.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        with self._managers_lock:
+            for manager in self._managers:
+                manager.close()
+            self._managers = []
+
+
+def _make_operation(name, executor_attribute):
+    async def operation(self, *args, **kwargs):
+        return await self._run(getattr(self, executor_attribute), name, *args, **kwargs)
+    operation.__name__ = name
+    operation.__qualname__ = f"AsyncDatabaseManager.{name}"
+    operation.__doc__ = f"Version asynchrone de DatabaseManager.{name}.\n\n{getattr(DatabaseManager, name).__doc__}"
+    return operation
+
+
+for _name in AsyncDatabaseManager.READ_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_operation(_name, '_readers'))
+for _name in AsyncDatabaseManager.WRITE_METHODS:
+    setattr(AsyncDatabaseManager, _name, _make_operation(_name, '_writer'))
@@ -0,0 +1,361 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# Cache de lecture devant un DatabaseManager
+class CachedStore:
+    """
+    Cache en lecture seule placé devant un DatabaseManager (ou tout objet ayant la
+    même interface), qui s'utilise exactement comme lui.
+
+    Les lectures fréquentes (catégories, cartes d'une catégorie, pages, nombres de
+    cartes, cartes dues, statistiques) sont servies depuis la mémoire après la
+    première lecture. Chaque écriture passant par le cache invalide uniquement
+    les résultats qu'elle modifie : une réponse invalide les listes de la catégorie
+    de la carte, une suppression retire la carte des listes en cache, etc.
+    Les écritures faites directement sur la base, sans passer par le cache, ne
+    sont pas vues.
+
+    Le cache est borné en nombre d'entrées et en nombre total de lignes ; les
+    entrées les moins récemment utilisées sont oubliées en premier.
+    """
+    def __init__(self, store, max_entries=256, max_rows=200_000, max_texts=2048):
+        """
+        :param store: DatabaseManager à mettre en cache.
+        :param max_entries: Nombre maximal de résultats conservés.
+        :param max_rows: Nombre maximal de lignes conservées, tous résultats confondus.
+        :param max_texts: Nombre maximal de textes de cartes conservés (get_card_texts).
+        """
+        self.store = store
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.max_texts = max_texts
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Clé -> (groupe, valeur, lignes), dans l'ordre d'utilisation
+        self._groups = {}  # Groupe -> clés ; un groupe est 'categories', 'counts', 'stats', 'texts' ou ('category', id)
+        self._rows = 0
+        self._generation = 0  # Incrémenté à chaque invalidation
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        # Les opérations sans effet sur le cache sont transmises telles quelles
+        return getattr(self.store, name)
+
+    def __enter__(self):
+        self.store.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.store.__exit__(exc_type, exc_value, traceback)
+
+    # Gestion des entrées
+
+    @staticmethod
+    def _size(value):
+        return len(value) if isinstance(value, (list, dict)) else 1
+
+    @staticmethod
+    def _copy(value):
+        # Les appelants peuvent modifier les listes reçues (ReviewScheduler.load par exemple)
+        if isinstance(value, list):
+            return list(value)
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, self._generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, self._generation
+
+    def _store(self, key, group, value, generation, size=None):
+        """
+        Ajoute un résultat, sauf si une écriture a invalidé le cache pendant la lecture.
+        """
+        size = self._size(value) if size is None else size
+        with self._lock:
+            if generation != self._generation or size > self.max_rows:
+                return
+            self._discard(key)
+            self._entries[key] = (group, value, size)
+            self._groups.setdefault(group, set()).add(key)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            group, _, size = entry
+            self._rows -= size
+            keys = self._groups[group]
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+    def _read(self, key, group, load):
+        entry, generation = self._lookup(key)
+        if entry is not None:
+            return self._copy(entry[1])
+        value = load()
+        self._store(key, group, value, generation)
+        return self._copy(value)
+
+    def invalidate(self, *groups):
+        """
+        Oublie les résultats des groupes donnés, ou tous les résultats si aucun groupe n'est donné.
+        """
+        with self._lock:
+            self._generation += 1
+            if not groups:
+                self._entries.clear()
+                self._groups.clear()
+                self._rows = 0
+                return
+            for group in groups:
+                for key in list(self._groups.get(group, ())):
+                    self._discard(key)
+
+    def _has_category_entries(self):
+        with self._lock:
+            return any(isinstance(group, tuple) for group in self._groups)
+
+    def _invalidate_categories_of(self, card_ids):
+        """
+        Invalide les statistiques et les résultats des catégories de ces cartes (après des réponses).
+        """
+        if not self._has_category_entries():
+            self.invalidate('stats')  # Aucune liste en cache : inutile de chercher les catégories
+            return
+        categories = set(self.store.get_card_categories(card_ids).values())
+        self.invalidate('stats', *(('category', category_id) for category_id in categories))
+
+    # Lectures
+
+    def get_all_categories(self):
+        return self._read(('get_all_categories',), 'categories', self.store.get_all_categories)
+
+    def get_category_card_counts(self):
+        return self._read(('get_category_card_counts',), 'counts', self.store.get_category_card_counts)
+
+    def get_global_stats(self):
+        return self._read(('get_global_stats',), 'stats', self.store.get_global_stats)
+
+    def get_daily_review_stats(self, days=7):
+        return self._read(('get_daily_review_stats', days), 'stats',
+                          lambda: self.store.get_daily_review_stats(days))
+
+    def get_cards_by_category(self, category_id, user_id=None):
+        return self._read(('get_cards_by_category', category_id, user_id), ('category', category_id),
+                          lambda: self.store.get_cards_by_category(category_id, user_id=user_id))
+
+    def get_cards_page(self, category_id, after=None, limit=100, user_id=None):
+        key = ('get_cards_page', category_id, None if after is None else tuple(after), limit, user_id)
+        return self._read(key, ('category', category_id),
+                          lambda: self.store.get_cards_page(category_id, after, limit, user_id=user_id))
+
+    def get_card_key_at(self, category_id, position, user_id=None):
+        return self._read(('get_card_key_at', category_id, position, user_id), ('category', category_id),
+                          lambda: self.store.get_card_key_at(category_id, position, user_id=user_id))
+
+    def get_page_keys(self, category_id, page_size, user_id=None):
+        return self._read(('get_page_keys', category_id, page_size, user_id), ('category', category_id),
+                          lambda: self.store.get_page_keys(category_id, page_size, user_id=user_id))
+
+    def count_cards(self, category_id):
+        return self._read(('count_cards', category_id), ('category', category_id),
+                          lambda: self.store.count_cards(category_id))
+
+    def get_category_review_stats(self, category_id, user_id=None):
+        return self._read(('get_category_review_stats', category_id, user_id), ('category', category_id),
+                          lambda: self.store.get_category_review_stats(category_id, user_id=user_id))
+
+    def get_category_stats(self, category_id):
+        return self._read(('get_category_stats', category_id), ('category', category_id),
+                          lambda: self.store.get_category_stats(category_id))
+
+    def get_card_keys_by_category(self, category_id, user_id=None):
+        return self._read(('get_card_keys_by_category', category_id, user_id), ('category', category_id),
+                          lambda: self.store.get_card_keys_by_category(category_id, user_id=user_id))
+
+    def get_due_cards(self, category_id, now=None, limit=None, user_id=None):
+        """
+        Cartes dues, servies depuis le cache tant qu'aucune autre carte de la
+        catégorie n'est arrivée à échéance depuis la lecture.
+        """
+        return self._read_due('get_due_cards', category_id, now, limit, user_id)
+
+    def get_due_card_keys(self, category_id, now=None, limit=None, user_id=None):
+        """
+        Clés (id, review_score) des cartes dues, en cache comme get_due_cards.
+        """
+        return self._read_due('get_due_card_keys', category_id, now, limit, user_id)
+
+    def _read_due(self, name, category_id, now, limit, user_id):
+        now = time.time() if now is None else now
+        key = (name, category_id, limit, user_id)
+        entry, generation = self._lookup(key)
+        if entry is not None:
+            read_at, valid_until, cards = entry[1]
+            if read_at <= now < valid_until:
+                return list(cards)
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+        cards = getattr(self.store, name)(category_id, now, limit, user_id=user_id)
+        next_due = self.store.get_next_due(category_id, now, user_id=user_id)
+        self._store(key, ('category', category_id),
+                    (now, float('inf') if next_due is None else next_due, cards), generation, len(cards))
+        return list(cards)
+
+    def get_card_texts(self, card_ids):
+        """
+        Textes {card_id: (question, answer)} des cartes ; seuls les textes absents du cache
+        sont lus. Les réponses ne modifient pas les textes : ils restent en cache (au plus
+        max_texts, les plus anciens oubliés d'abord) jusqu'à la suppression de leur carte.
+        """
+        key = ('get_card_texts',)
+        card_ids = list(card_ids)
+        entry, generation = self._lookup(key)
+        cached = entry[1] if entry is not None else {}
+        texts = {card_id: cached[card_id] for card_id in card_ids if card_id in cached}
+        missing = [card_id for card_id in card_ids if card_id not in texts]
+        if not missing:
+            return texts
+        if entry is not None:
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+        loaded = self.store.get_card_texts(missing)
+        texts.update(loaded)
+        with self._lock:
+            entry = self._entries.get(key)
+            merged = dict(entry[1]) if entry is not None else {}
+            merged.update(loaded)
+            for card_id in list(merged)[:max(0, len(merged) - self.max_texts)]:
+                del merged[card_id]
+            self._store(key, 'texts', merged, generation)
+        return texts
+
+    # Écritures
+
+    def setup_database(self):
+        self.store.setup_database()
+        self.invalidate()
+
+    def add_category(self, name):
+        category_id = self.store.add_category(name)
+        self.invalidate('categories')
+        return category_id
+
+    def rename_category(self, category_id, name):
+        self.store.rename_category(category_id, name)
+        self.invalidate('categories')
+
+    def delete_category(self, category_id):
+        self.store.delete_category(category_id)
+        self.invalidate('categories', 'counts', 'texts', ('category', category_id))
+
+    def add_card(self, category_id, question, answer, on_duplicate='skip'):
+        card_id = self.store.add_card(category_id, question, answer, on_duplicate)
+        self.invalidate('counts', ('category', category_id), *(('texts',) if on_duplicate == 'update' else ()))
+        return card_id
+
+    def add_cards_bulk(self, cards, on_duplicate='skip'):
+        cards = list(cards)
+        inserted = self.store.add_cards_bulk(cards, on_duplicate)
+        self.invalidate('categories', 'counts', *(('texts',) if on_duplicate == 'update' else ()))
+        if self._has_category_entries():
+            names = {card[0] for card in cards}
+            self.invalidate(*(('category', category_id) for category_id, name in self.get_all_categories()
+                              if name in names))
+        return inserted
+
+    def delete_card(self, card_id):
+        """
+        Supprime une carte et la retire des résultats en cache de sa catégorie,
+        qui restent valides sans nouvelle lecture.
+        :return: True si la carte existait.
+        """
+        self._forget_text(card_id)
+        if not self._has_category_entries() and ('get_category_card_counts',) not in self._entries:
+            deleted = self.store.delete_card(card_id)
+            self.invalidate('counts')
+            return deleted
+        category_id = self.store.get_card_categories([card_id]).get(card_id)
+        deleted = self.store.delete_card(card_id)
+        if category_id is None:
+            return deleted
+        with self._lock:
+            self._generation += 1
+            for key in list(self._groups.get(('category', category_id), ())):
+                group, value, size = self._entries[key]
+                if key[0] in ('get_cards_by_category', 'get_card_keys_by_category'):
+                    cards = [card for card in value if card[0] != card_id]
+                    self._entries[key] = (group, cards, len(cards))
+                    self._rows -= size - len(cards)
+                elif key[0] in ('get_due_cards', 'get_due_card_keys') and key[2] is None:
+                    read_at, valid_until, cards = value
+                    cards = [card for card in cards if card[0] != card_id]
+                    self._entries[key] = (group, (read_at, valid_until, cards), len(cards))
+                    self._rows -= size - len(cards)
+                elif key[0] == 'count_cards':
+                    self._entries[key] = (group, value - 1, size)
+                elif key[0] != 'get_category_review_stats':
+                    self._discard(key)  # Pages et positions décalées
+            entry = self._entries.get(('get_category_card_counts',))
+            if entry is not None and category_id in entry[1]:
+                counts = dict(entry[1])
+                counts[category_id] -= 1
+                if not counts[category_id]:
+                    del counts[category_id]
+                self._entries[('get_category_card_counts',)] = (entry[0], counts, len(counts))
+        return deleted
+
+    def _forget_text(self, card_id):
+        with self._lock:
+            entry = self._entries.get(('get_card_texts',))
+            if entry is not None and card_id in entry[1]:
+                texts = dict(entry[1])
+                del texts[card_id]
+                self._entries[('get_card_texts',)] = (entry[0], texts, len(texts))
+                self._rows -= 1
+
+    def deduplicate_cards(self, chunk_size=1000, max_chunks=None):
+        result = self.store.deduplicate_cards(chunk_size, max_chunks)
+        if result[1]:
+            self.invalidate()
+        return result
+
+    def update_card_score(self, card_id, is_correct, now=None, user_id=None):
+        self.store.update_card_score(card_id, is_correct, now, user_id)
+        self._invalidate_categories_of([card_id])
+
+    def apply_grades(self, grades, journal=None, last_sequence=None, user_id=None):
+        grades = list(grades)
+        self.store.apply_grades(grades, journal, last_sequence, user_id)
+        if grades:
+            self._invalidate_categories_of({grade[0] for grade in grades})
+
+    def update_global_stats(self, correct, incorrect, reviewed):
+        self.store.update_global_stats(correct, incorrect, reviewed)
+        self.invalidate('stats')
+
+    def record_session(self):
+        self.store.record_session()
+        self.invalidate('stats')
+
+    def rebuild_review_stats(self):
+        self.store.rebuild_review_stats()
+        self.invalidate('stats')
+
+    def rebuild_category_stats(self):
+        self.store.rebuild_category_stats()
+        self.invalidate()
@@ -1,4 +1,6 @@
 from DatabaseManager import DatabaseManager
+from CardTextCache import CardTextCache
+from ReviewScheduler import CompactReviewScheduler, MergedReviewScheduler, ReviewScheduler
 
 
 # Gestion des cartes flash
@@ -6,48 +8,178 @@ class CardManager:
     """
     Classe pour gérer les cartes flash, y compris leur navigation et mise à jour.
     """
-    def __init__(self):
-        self.db_manager = DatabaseManager()  # Instance de DatabaseManager
-        self.cards = []  # Liste des cartes flash
-        self.current_card_index = 0  # Index de la carte actuelle
+    def __init__(self, scheduler=None, grade_buffer=None, db_manager=None, compact=False, user_id=None):
+        """
+        :param scheduler: File de révision à utiliser, ReviewScheduler par défaut.
+                          Permet de brancher une autre politique d'ordonnancement.
+        :param grade_buffer: GradeBuffer optionnel ; les réponses y sont alors
+                             regroupées au lieu d'être écrites une par une.
+        :param db_manager: Base de données partagée (DatabaseManager, CachedStore...).
+                           Si None, un DatabaseManager par défaut est créé au premier accès.
+        :param compact: Si True et sans scheduler, la session est une CompactReviewScheduler :
+                        seuls les identifiants et scores sont chargés, les textes sont lus
+                        par lot, à la demande, dans un CardTextCache.
+        :param user_id: Utilisateur dont la progression est chargée et mise à jour
+                        (sans grade_buffer ; sinon, celui du tampon) ; None pour la progression partagée.
+        """
+        self._db_manager = db_manager
+        if scheduler is None:
+            if compact:
+                scheduler = CompactReviewScheduler(texts=CardTextCache(lambda ids: self.db_manager.get_card_texts(ids)))
+            else:
+                scheduler = ReviewScheduler()
+        self._scheduler = scheduler
+        self.cards = scheduler  # File de révision des cartes flash (ou révision mixte en cours)
+        self.grade_buffer = grade_buffer
+        self.user_id = user_id
+
+    @property
+    def db_manager(self):
+        if self._db_manager is None:
+            self._db_manager = DatabaseManager()
+        return self._db_manager
+
+    @db_manager.setter
+    def db_manager(self, db_manager):
+        self._db_manager = db_manager
 
     def load_cards(self, category_id):
         """
-        Charge toutes les cartes d'une catégorie spécifique et les trie par score croissant.
+        Charge toutes les cartes d'une catégorie spécifique dans la file de révision.
+        Les cartes arrivent déjà triées par score depuis la base de données.
+        """
+        self.flush_grades()
+        self.cards = self._scheduler
+        if self.is_compact:
+            self.cards.load_keys(self.db_manager.get_card_keys_by_category(category_id, user_id=self.user_id))
+        else:
+            self.cards.load(self.db_manager.get_cards_by_category(category_id, user_id=self.user_id))
+
+    def load_due_cards(self, category_id, now=None, limit=None):
+        """
+        Charge uniquement les cartes de la catégorie dont la révision est due.
+        """
+        self.flush_grades()
+        self.cards = self._scheduler
+        if self.is_compact:
+            self.cards.load_keys(self.db_manager.get_due_card_keys(category_id, now, limit, user_id=self.user_id))
+        else:
+            self.cards.load(self.db_manager.get_due_cards(category_id, now, limit, user_id=self.user_id))
+
+    @property
+    def is_compact(self):
+        return hasattr(self.cards, 'load_keys')
+
+    @property
+    def is_mixed(self):
+        return hasattr(self.cards, 'pages_needed')
+
+    def set_cards(self, cards):
+        """
+        Remplace les cartes de la session par des cartes déjà lues
+        (par exemple depuis un DatabaseWorker).
+        """
+        self.cards = self._scheduler
+        self.cards.load(cards)
+
+    def set_card_keys(self, keys, texts=None):
+        """
+        Remplace les cartes d'une session compacte par des clés (id, review_score) déjà
+        lues, avec éventuellement les textes {card_id: (question, answer)} des premières.
+        """
+        self.cards = self._scheduler
+        if texts:
+            self.cards.texts.update(texts)
+        self.cards.load_keys(keys)
+
+    def load_mixed_cards(self, category_ids, weights=None, interleave=False, page_size=100):
+        """
+        Commence une révision mixte de plusieurs catégories (MergedReviewScheduler) : les
+        cartes sont lues page par page dans chaque catégorie, à mesure de la révision.
+        :param weights: Poids {category_id: poids} des catégories, 1 par défaut.
+        :param interleave: True pour alterner les catégories, False pour l'ordre des scores.
+        :param page_size: Nombre de cartes lues à la fois dans chaque catégorie.
+        """
+        self.flush_grades()
+        weights = weights or {}
+        db_manager, user_id = self.db_manager, self.user_id
+        self.cards = MergedReviewScheduler(
+            lambda category_id, after, limit: db_manager.get_cards_page(category_id, after, limit, user_id=user_id),
+            interleave, page_size)
+        self.cards.load_categories([(category_id, weights.get(category_id, 1), db_manager.count_cards(category_id))
+                                    for category_id in category_ids])
+
+    def set_mixed_cards(self, categories, interleave=False, page_size=100):
+        """
+        Commence une révision mixte à partir de lectures déjà faites (par exemple par un
+        DatabaseWorker) : categories est une liste de (category_id, poids, nombre de cartes,
+        première page). Les pages suivantes sont demandées par cards.pages_needed et
+        ajoutées par cards.add_page.
+        """
+        self.cards = MergedReviewScheduler(interleave=interleave, page_size=page_size)
+        self.cards.load_categories([category[:3] for category in categories])
+        for category_id, _, _, page in categories:
+            self.cards.add_page(category_id, page)
+
+    def insert_card(self, card_id, question, answer, review_score=0):
+        """
+        Ajoute à la session une carte créée pendant la révision (identifiant retourné
+        par DatabaseManager.add_card), sans relire la catégorie. La carte ne doit pas
+        déjà faire partie de la session (voir update_card_score).
+        """
+        self.cards.push((card_id, question, answer, review_score))
+
+    def remove_card(self, card_id):
+        """
+        Retire une carte de la session (par exemple après DatabaseManager.delete_card),
+        sans relire la catégorie.
+        :return: True si la carte faisait partie de la session.
         """
-        self.cards = self.db_manager.get_cards_by_category(category_id)
-        self.cards.sort(key=lambda card: card[3])  # Trier par review_score
-        self.current_card_index = 0
+        return self.cards.remove(card_id)
+
+    def update_card_score(self, card_id, review_score):
+        """
+        Replace une carte de la session selon un score modifié hors de la révision.
+        :return: True si la carte faisait partie de la session.
+        """
+        return self.cards.update(card_id, review_score)
+
+    def flush_grades(self):
+        """
+        Écrit en base les réponses en attente dans le tampon, s'il y en a un.
+        """
+        if self.grade_buffer is not None:
+            self.grade_buffer.flush(self.db_manager if self.grade_buffer.db_manager is None else None)
+
+    def _record_grade(self, card_id, is_correct):
+        if self.grade_buffer is not None:
+            self.grade_buffer.record(card_id, is_correct)
+        else:
+            self.db_manager.update_card_score(card_id, is_correct, user_id=self.user_id)
 
     def get_next_card(self):
         """
         Retourne la carte actuelle. Si aucune carte n'est disponible, retourne None.
         """
-        if not self.cards:
-            return None
-        return self.cards[self.current_card_index]
+        return self.cards.peek()
 
     def mark_card_as_correct(self):
         """
-        Augmente le score de la carte actuelle après une réponse correcte.
+        Augmente le score de la carte actuelle après une réponse correcte
+        et la retire de la session.
         """
-        if self.cards:
-            card_id = self.cards[self.current_card_index][0]
-            self.db_manager.update_card_score(card_id, True)
-            self.cards.pop(self.current_card_index)
-            # Ajuster l'index si nécessaire
-            if self.current_card_index >= len(self.cards):
-                self.current_card_index = 0  # Retourner au début si l'index dépasse
+        card = self.cards.peek()
+        if card is not None:
+            self._record_grade(card[0], True)
+            self.cards.pop()
 
     def mark_card_as_incorrect(self):
         """
-        Passe à la carte suivante après avoir enregistré le score incorrect.
+        Enregistre le score incorrect et replace la carte dans la file
+        selon son score remis à zéro.
         """
-        if self.cards:
-            card_id = self.cards[self.current_card_index][0]
-            self.db_manager.update_card_score(card_id, False)
-            # Passer à la carte suivante uniquement si la liste n'est pas vide
-            if len(self.cards) > 1:
-                self.current_card_index = (self.current_card_index + 1) % len(self.cards)
-            else:
-                self.current_card_index = 0
\ No newline at end of file
+        card = self.cards.peek()
+        if card is not None:
+            card_id, question, answer, _ = card
+            self._record_grade(card_id, False)
+            self.cards.reschedule((card_id, question, answer, 0))
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+
+# Cache des textes des cartes
+class CardTextCache:
+    """
+    Cache LRU des textes (question, réponse) des cartes d'une session compacte.
+    Les textes absents sont lus par lot avec loader ; sans loader (lecture faite
+    par un DatabaseWorker), ils doivent être ajoutés avec update.
+    """
+    def __init__(self, loader=None, max_cards=256):
+        """
+        :param loader: Fonction (liste d'identifiants) -> {card_id: (question, answer)},
+                       par exemple DatabaseManager.get_card_texts.
+        :param max_cards: Nombre maximal de cartes dont le texte est conservé.
+        """
+        self.loader = loader
+        self.max_cards = max_cards
+        self._texts = OrderedDict()  # card_id -> (question, answer), dans l'ordre d'utilisation
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, card_id):
+        return card_id in self._texts
+
+    def get(self, card_id):
+        """
+        Retourne (question, answer), lu si nécessaire ; None si le texte n'est pas disponible.
+        """
+        texts = self._texts.get(card_id)
+        if texts is None and self.loader is not None:
+            self.prefetch([card_id])
+            texts = self._texts.get(card_id)
+        if texts is not None:
+            self._texts.move_to_end(card_id)
+        return texts
+
+    def missing(self, card_ids):
+        return [card_id for card_id in card_ids if card_id not in self._texts]
+
+    def prefetch(self, card_ids):
+        """
+        Lit en une requête les textes absents du cache.
+        """
+        missing = self.missing(card_ids)
+        if missing and self.loader is not None:
+            self.update(self.loader(missing))
+
+    def update(self, texts):
+        """
+        Ajoute des textes {card_id: (question, answer)} en oubliant les moins récemment utilisés.
+        """
+        for card_id, card_texts in texts.items():
+            self._texts[card_id] = tuple(card_texts)
+            self._texts.move_to_end(card_id)
+        while len(self._texts) > self.max_cards:
+            self._texts.popitem(last=False)
+
+    def discard(self, card_id):
+        self._texts.pop(card_id, None)
+
+    def clear(self):
+        self._texts.clear()
+
+
+class LazyCard:
+    """
+    Carte d'une session compacte : identifiant et score en mémoire, textes lus à la
+    demande dans un CardTextCache. Se lit comme le tuple (id, question, answer,
+    review_score) ; question et answer valent None si le texte n'est pas disponible.
+    """
+    __slots__ = ('id', 'review_score', '_texts')
+
+    def __init__(self, card_id, review_score, texts=None):
+        self.id = card_id
+        self.review_score = review_score
+        self._texts = texts
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += 4
+        if index == 0:
+            return self.id
+        if index == 3:
+            return self.review_score
+        if index in (1, 2):
+            texts = self._texts.get(self.id) if self._texts is not None else None
+            return texts[index - 1] if texts is not None else None
+        raise IndexError("index de carte hors limites")
+
+    def __iter__(self):
+        return (self[index] for index in range(4))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"LazyCard({self.id}, review_score={self.review_score})"
@@ -1,25 +1,224 @@
 from DatabaseManager import DatabaseManager
 
 
+class _Positions:
+    """
+    Positions des catégories dans l'ordre d'ajout : arbre de Fenwick sur les cases
+    (1 si la case est occupée, 0 si sa catégorie a été supprimée). Ajouter, retirer
+    et trouver la position d'une case coûtent O(log n).
+    """
+    def __init__(self):
+        self._tree = [0]  # Indices à partir de 1
+
+    def _prefix(self, slot):
+        total = 0
+        while slot > 0:
+            total += self._tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def append(self):
+        """
+        Ajoute une case occupée en fin d'ordre et retourne son numéro.
+        """
+        slot = len(self._tree)
+        self._tree.append(1 + self._prefix(slot - 1) - self._prefix(slot - (slot & -slot)))
+        return slot
+
+    def remove(self, slot):
+        while slot < len(self._tree):
+            self._tree[slot] -= 1
+            slot += slot & -slot
+
+    def position(self, slot):
+        """
+        Retourne le nombre de cases occupées avant slot.
+        """
+        return self._prefix(slot - 1)
+
+
 # Gestion des catégories
 class CategoryManager:
     """
     Classe pour gérer les catégories, y compris leur récupération et ajout.
+    Les catégories sont indexées par identifiant et par nom (recherche en O(1)) et
+    mises à jour individuellement, sans relire toute la table après chaque changement.
     """
-    def __init__(self):
-        # Charger toutes les catégories depuis une instance de DatabaseManager
-        self.db_manager = DatabaseManager()
-        self.categories = self.db_manager.get_all_categories()
+    def __init__(self, load=True, db_manager=None):
+        """
+        :param load: Si False, les catégories ne sont pas lues à la construction
+                     et doivent être fournies avec set_categories.
+        :param db_manager: Base de données partagée (DatabaseManager, CachedStore...).
+                           Si None, un DatabaseManager par défaut est créé au premier accès.
+        """
+        self._db_manager = db_manager
+        self._by_id = {}  # id -> nom, dans l'ordre d'ajout
+        self._by_name = {}  # nom -> id
+        self._slots = {}  # id -> case dans _positions
+        self._positions = _Positions()
+        self._card_counts = {}  # Cache du nombre de cartes par catégorie
+        self._all_counts_loaded = False
+        if load:
+            self.set_categories(self.db_manager.get_all_categories())
+
+    @property
+    def db_manager(self):
+        if self._db_manager is None:
+            self._db_manager = DatabaseManager()
+        return self._db_manager
+
+    @db_manager.setter
+    def db_manager(self, db_manager):
+        self._db_manager = db_manager
+
+    @property
+    def categories(self):
+        """
+        Liste des catégories sous forme de tuples (id, nom).
+        """
+        return list(self._by_id.items())
+
+    def set_categories(self, categories):
+        """
+        Remplace toutes les catégories (par exemple après une lecture asynchrone).
+        """
+        self._by_id = dict(categories)
+        self._by_name = {name: category_id for category_id, name in self._by_id.items()}
+        self._positions = _Positions()
+        self._slots = {category_id: self._positions.append() for category_id in self._by_id}
+        self.invalidate_card_count()
 
     def get_category_names(self):
         """
-        Retourne une liste des noms des catégories.
+        Retourne une liste des noms des catégories, dans l'ordre d'ajout.
+        """
+        return list(self._by_id.values())
+
+    def get_by_name(self, name):
+        """
+        Retourne la catégorie (id, nom) portant ce nom, ou None.
+        """
+        category_id = self._by_name.get(name)
+        return None if category_id is None else (category_id, name)
+
+    def get_by_id(self, category_id):
+        """
+        Retourne la catégorie (id, nom) de cet identifiant, ou None.
+        """
+        name = self._by_id.get(category_id)
+        return None if name is None else (category_id, name)
+
+    def get_position(self, category_id):
+        """
+        Retourne la position d'une catégorie dans l'ordre d'ajout (celui de get_category_names
+        et du menu des catégories) en O(log n), ou None si elle est inconnue.
         """
-        return [category[1] for category in self.categories]
+        slot = self._slots.get(category_id)
+        return None if slot is None else self._positions.position(slot)
+
+    def register_category(self, category_id, name):
+        """
+        Ajoute ou renomme une catégorie dans le registre, sans accès à la base.
+        """
+        previous_name = self._by_id.get(category_id)
+        if previous_name is not None:
+            del self._by_name[previous_name]
+        else:
+            self._slots[category_id] = self._positions.append()
+        if previous_name is None and self._all_counts_loaded:
+            self._card_counts[category_id] = 0  # Nouvelle catégorie, encore vide
+        self._by_id[category_id] = name
+        self._by_name[name] = category_id
+
+    def forget_category(self, category_id):
+        """
+        Retire une catégorie du registre, sans accès à la base.
+        """
+        name = self._by_id.pop(category_id, None)
+        if name is not None:
+            del self._by_name[name]
+            self._positions.remove(self._slots.pop(category_id))
+        self._card_counts.pop(category_id, None)
 
     def add_category(self, name):
         """
         Ajoute une catégorie et met à jour la liste des catégories.
+        :return: Identifiant de la catégorie.
+        """
+        category_id = self.db_manager.add_category(name)
+        self.register_category(category_id, name)
+        return category_id
+
+    def rename_category(self, category_id, name):
+        """
+        Renomme une catégorie dans la base et dans le registre.
+        """
+        self.db_manager.rename_category(category_id, name)
+        self.register_category(category_id, name)
+
+    def delete_category(self, category_id):
+        """
+        Supprime une catégorie (et ses cartes) de la base et du registre.
+        """
+        self.db_manager.delete_category(category_id)
+        self.forget_category(category_id)
+
+    def get_card_count(self, category_id):
+        """
+        Retourne le nombre de cartes d'une catégorie, lu en base seulement s'il n'est pas en cache.
+        """
+        if category_id not in self._card_counts:
+            self._card_counts[category_id] = self.db_manager.count_cards(category_id)
+        return self._card_counts[category_id]
+
+    def get_category_stats(self, category_id):
+        """
+        Retourne les statistiques d'une catégorie (nombre de cartes, cartes maîtrisées,
+        histogramme des scores), voir DatabaseManager.get_category_stats. La lecture met
+        aussi à jour le nombre de cartes en cache.
+        """
+        stats = self.db_manager.get_category_stats(category_id)
+        self.set_category_stats(category_id, stats)
+        return stats
+
+    def set_category_stats(self, category_id, stats):
+        """
+        Met en cache le nombre de cartes d'une catégorie à partir de ses statistiques déjà lues
+        (par exemple depuis un DatabaseWorker).
+        """
+        if category_id in self._by_id:
+            self._card_counts[category_id] = stats[0]
+
+    def get_cached_card_counts(self):
+        """
+        Retourne les nombres en cache {category_id: nombre}, ou None si le cache n'a jamais
+        été rempli. Les catégories invalidées depuis sont absentes du dictionnaire.
+        """
+        if not self._all_counts_loaded:
+            return None
+        return dict(self._card_counts)
+
+    def set_card_count(self, category_id, count):
+        """
+        Met en cache le nombre de cartes d'une catégorie.
+        """
+        self._card_counts[category_id] = count
+
+    def set_card_counts(self, counts):
+        """
+        Remplit le cache avec les nombres de toutes les catégories (par exemple
+        le résultat de DatabaseManager.get_category_card_counts).
+        """
+        self._card_counts = {category_id: counts.get(category_id, 0) for category_id in self._by_id}
+        self._all_counts_loaded = True
+
+    def invalidate_card_count(self, category_id=None):
+        """
+        Invalide le nombre de cartes d'une catégorie après un changement de ses cartes,
+        ou de toutes les catégories si category_id est None.
         """
-        self.db_manager.add_category(name)
-        self.categories = self.db_manager.get_all_categories()
\ No newline at end of file
+        if category_id is None:
+            self._card_counts = {}
+            self._all_counts_loaded = False
+        else:
+            self._card_counts.pop(category_id, None)
@@ -0,0 +1,19 @@
+import hashlib
+import unicodedata
+
+
+def normalize(text):
+    """
+    Forme normalisée d'un texte de carte : Unicode NFC, sans distinction de casse,
+    espaces de début et de fin retirés, suites d'espaces réduites à une seule.
+    """
+    return " ".join(unicodedata.normalize('NFC', text).casefold().split())
+
+
+def content_hash(question, answer):
+    """
+    Empreinte (16 octets) du contenu normalisé d'une carte : deux cartes dont la question
+    et la réponse ne diffèrent que par la casse ou les espaces ont la même empreinte.
+    """
+    data = normalize(question) + '\x1f' + normalize(answer)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).digest()
@@ -1,24 +1,114 @@
+import itertools
+import random
 import sqlite3
+import time
+from Migrations import MIGRATIONS, SCHEMA_VERSION, category_stats_select
+from SpacedRepetition import SM2
+from ContentHash import content_hash
+
+DEFERRED_SEARCH_INDEX_ROWS = 1000  # Taille de lot à partir de laquelle add_cards_bulk indexe la recherche après coup
+_DEFERRED_TRIGGERS = ('flashcards_fts_insert', 'category_stats_insert')
+SCORE_BUCKETS = ('0', '1', '2', '3-4', '5+')  # Tranches de review_score de l'histogramme de get_category_stats
+
+# Traitement d'une carte dont le contenu existe déjà dans la catégorie
+DUPLICATE_POLICIES = ('skip', 'update', 'report')
+_INSERT_CARD = "INSERT INTO flashcards (category_id, question, answer, content_hash) VALUES (?, ?, ?, ?)"
+_ON_DUPLICATE = {
+    'skip': " ON CONFLICT (category_id, content_hash) DO NOTHING",
+    'update': " ON CONFLICT (category_id, content_hash) DO UPDATE SET question = excluded.question, answer = excluded.answer",
+    'report': "",
+}
+
+
+def _is_lock_error(error):
+    """
+    Indique si une erreur SQLite signale une base verrouillée par une autre connexion.
+    """
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class DuplicateCardError(sqlite3.IntegrityError):
+    """
+    Carte refusée car une carte de même contenu existe déjà dans la catégorie.
+    """
+    def __init__(self, card_id):
+        super().__init__(f"La carte existe déjà dans cette catégorie (carte {card_id})")
+        self.card_id = card_id  # Carte existante
+
 
 class DatabaseManager:
     """
     Classe pour gérer la base de données SQLite utilisée pour stocker les catégories et les cartes flash.
     """
-    def __init__(self, db_name='flashcards.db'):
+    def __init__(self, db_name='flashcards.db', persistent=True, busy_timeout=5.0, cached_statements=128,
+                 algorithm=None, check_same_thread=True, instrumentation=None, write_retries=5,
+                 retry_backoff=0.05):
         """
         Initialise la connexion à la base de données.
         :param db_name: Nom du fichier de la base de données SQLite.
+        :param persistent: Si True, la connexion reste ouverte entre les appels (mode WAL).
+                           Si False, mode historique : une connexion par appel.
+        :param busy_timeout: Délai d'attente (en secondes) lorsque la base est verrouillée.
+        :param cached_statements: Taille du cache de requêtes préparées de la connexion.
+        :param algorithm: Algorithme de répétition espacée, SM2 par défaut.
+        :param check_same_thread: Si False, la connexion peut être utilisée depuis plusieurs
+                                  threads, à condition de ne pas l'utiliser simultanément.
+        :param instrumentation: Instance d'Instrumentation qui mesure les méthodes et les requêtes ;
+                                si None, aucune mesure n'est faite.
+        :param write_retries: Nombre de nouvelles tentatives d'une écriture si la base est encore
+                              verrouillée par un autre processus après busy_timeout.
+        :param retry_backoff: Délai (en secondes) avant la première nouvelle tentative, doublé
+                              à chaque tentative suivante.
         """
         self._db_name = db_name  # Nom de la base de données encapsulé
         self._connection = None  # Connexion privée à la base de données
+        self._persistent = persistent
+        self._busy_timeout = busy_timeout
+        self._cached_statements = cached_statements
+        self._algorithm = algorithm if algorithm is not None else SM2()
+        self._check_same_thread = check_same_thread
+        self._instrumentation = instrumentation
+        self._write_retries = write_retries
+        self._retry_backoff = retry_backoff
+        self.lock_retries = 0  # Écritures réessayées car la base était verrouillée
+        if instrumentation is not None:
+            # Les méthodes mesurées masquent celles de la classe pour cette instance seulement
+            for name, value in vars(type(self)).items():
+                if not name.startswith('_') and callable(value):
+                    setattr(self, name, instrumentation.wrap_method(name, getattr(self, name)))
+
+    def __enter__(self):
+        self._connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _connect(self):
         """
         Établit une connexion à la base de données.
         """
         if not self._connection:
-            self._connection = sqlite3.connect(self._db_name)
+            connect = sqlite3.connect if self._instrumentation is None else self._instrumentation.connect
+            self._connection = connect(self._db_name, timeout=self._busy_timeout,
+                                       cached_statements=self._cached_statements,
+                                       check_same_thread=self._check_same_thread)
             self._connection.execute('PRAGMA foreign_keys = ON;')  # Activer les clés étrangères
+            if self._persistent:
+                # Le journal WAL permet des lectures concurrentes et des commits moins coûteux
+                self._connection.execute('PRAGMA journal_mode = WAL;')
+                self._connection.execute('PRAGMA synchronous = NORMAL;')
+
+    def _release(self):
+        """
+        Libère la connexion à la fin d'une opération.
+        En mode persistant la connexion est conservée, sinon elle est fermée.
+        """
+        if not self._persistent:
+            self._disconnect()
 
     def _disconnect(self):
         """
@@ -28,57 +118,195 @@ class DatabaseManager:
             self._connection.close()
             self._connection = None
 
+    def close(self):
+        """
+        Ferme explicitement la connexion persistante.
+        """
+        self._disconnect()
+
+    def _rollback(self):
+        if self._connection is not None and self._connection.in_transaction:
+            self._connection.rollback()
+
+    def _write_transaction(self, work):
+        """
+        Exécute work(cursor) dans une transaction d'écriture et retourne son résultat.
+        La transaction prend le verrou d'écriture dès le début (BEGIN IMMEDIATE), en attendant
+        au plus busy_timeout : elle ne peut pas échouer en cours de route faute de verrou.
+        Si la base reste verrouillée, la transaction est réessayée jusqu'à write_retries fois
+        après un délai exponentiel avec gigue, pour désynchroniser les écrivains concurrents.
+        """
+        for attempt in itertools.count():
+            self._connect()
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                result = work(cursor)
+                self._connection.commit()
+                return result
+            except sqlite3.OperationalError as error:
+                self._rollback()
+                if attempt >= self._write_retries or not _is_lock_error(error):
+                    raise
+                self.lock_retries += 1
+            except BaseException:
+                self._rollback()
+                raise
+            finally:
+                self._release()
+            time.sleep(self._retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    @staticmethod
+    def _cards_source(user_id):
+        """
+        Retourne (table, paramètres) des cartes avec leur progression : celle de flashcards,
+        ou celle d'un utilisateur (cartes jamais révisées par lui : score 0, dues immédiatement).
+        """
+        if user_id is None:
+            return "flashcards", ()
+        return ("(SELECT f.id, f.category_id, f.question, f.answer, "
+                "COALESCE(p.review_score, 0) AS review_score, COALESCE(p.next_due, 0) AS next_due "
+                "FROM flashcards f LEFT JOIN user_progress p ON p.user_id = ? AND p.card_id = f.id)"), (user_id,)
+
     def setup_database(self):
         """
-        Crée les tables nécessaires dans la base de données si elles n'existent pas déjà.
+        Met le schéma de la base de données à jour en appliquant les migrations manquantes.
+        Si le schéma est déjà à jour, aucune requête DDL n'est exécutée.
+        """
+        for number in range(self.get_schema_version() + 1, SCHEMA_VERSION + 1):
+            self._apply_migration(number, MIGRATIONS[number - 1])
+
+    def get_schema_version(self):
+        """
+        Retourne la version du schéma enregistrée dans PRAGMA user_version.
+        """
+        self._connect()
+        version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+        self._release()
+        return version
+
+    def _apply_migration(self, number, steps):
+        """
+        Applique une migration dans une transaction d'écriture et enregistre son numéro de version.
+        La version est relue une fois le verrou pris : une migration déjà appliquée par un autre
+        processus démarré en même temps n'est pas rejouée.
+        """
+        def work(cursor):
+            if cursor.execute('PRAGMA user_version').fetchone()[0] >= number:
+                return
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f'PRAGMA user_version = {int(number)}')
+        self._write_transaction(work)
+
+    def add_category(self, name, category_id=None):
+        """
+        Ajoute une nouvelle catégorie à la base de données.
+        :param category_id: Identifiant imposé (attribué par la table de routage en mode réparti).
+        :return: Identifiant de la catégorie (celui de la catégorie existante si le nom est déjà pris).
+        """
+        def work(cursor):
+            cursor.execute("INSERT OR IGNORE INTO categories (id, name) VALUES (?, ?)", (category_id, name))
+            if cursor.rowcount:
+                return cursor.lastrowid
+            cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+            return cursor.fetchone()[0]
+        return self._write_transaction(work)
+
+    def add_user(self, name):
+        """
+        Ajoute un utilisateur, dont la progression et les statistiques sont séparées de celles
+        des autres utilisateurs.
+        :return: Identifiant de l'utilisateur (celui de l'utilisateur existant si le nom est déjà pris).
+        """
+        def work(cursor):
+            cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+            cursor.execute("SELECT id FROM users WHERE name = ?", (name,))
+            return cursor.fetchone()[0]
+        return self._write_transaction(work)
+
+    def get_all_users(self):
+        """
+        Récupère tous les utilisateurs : liste de (id, nom).
         """
         self._connect()
         cursor = self._connection.cursor()
+        cursor.execute("SELECT id, name FROM users ORDER BY name")
+        users = cursor.fetchall()
+        self._release()
+        return users
 
-        # Création des tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS flashcards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category_id INTEGER NOT NULL,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                review_score INTEGER DEFAULT 0,
-                FOREIGN KEY (category_id) REFERENCES categories(id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS global_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                total_sessions INTEGER DEFAULT 0,
-                total_correct INTEGER DEFAULT 0,
-                total_incorrect INTEGER DEFAULT 0,
-                total_reviewed INTEGER DEFAULT 0
-            )
-        ''')
-        # Initialisation des statistiques globales si elles n'existent pas
-        cursor.execute('''
-            INSERT OR IGNORE INTO global_stats (id, total_sessions, total_correct, total_incorrect, total_reviewed)
-            VALUES (1, 0, 0, 0, 0)
-        ''')
+    def rename_category(self, category_id, name):
+        """
+        Renomme une catégorie. Lève sqlite3.IntegrityError si le nom est déjà pris.
+        """
+        def work(cursor):
+            cursor.execute("UPDATE categories SET name = ? WHERE id = ?", (name, category_id))
+            cursor.execute("UPDATE category_shards SET name = ? WHERE category_id = ?", (name, category_id))
+        self._write_transaction(work)
 
-        self._connection.commit()
-        self._disconnect()
+    def delete_category(self, category_id):
+        """
+        Supprime une catégorie et toutes ses cartes.
+        """
+        def work(cursor):
+            cursor.execute("DELETE FROM flashcards WHERE category_id = ?", (category_id,))
+            cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            cursor.execute("DELETE FROM category_shards WHERE category_id = ?", (category_id,))
+        self._write_transaction(work)
 
-    def add_category(self, name):
+    def assign_category_shard(self, name, shard_count):
         """
-        Ajoute une nouvelle catégorie à la base de données.
+        Table de routage du mode réparti : retourne (category_id, shard) pour une catégorie,
+        en l'affectant au fichier le moins chargé si elle n'est pas encore routée.
+        Une catégorie présente dans la table categories sans route (base créée avant
+        la répartition) reste dans le fichier 0.
+        """
+        def work(cursor):
+            cursor.execute("SELECT category_id, shard FROM category_shards WHERE name = ?", (name,))
+            route = cursor.fetchone()
+            if route is None:
+                cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+                row = cursor.fetchone()
+                if row is not None:
+                    route = (row[0], 0)
+                else:
+                    cursor.execute("SELECT shard, COUNT(*) FROM category_shards GROUP BY shard")
+                    loads = dict(cursor.fetchall())
+                    shard = min(range(shard_count), key=lambda index: loads.get(index, 0))
+                    # Identifiant supérieur à tous ceux déjà attribués, routés ou non
+                    cursor.execute("SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'category_shards'), 0), "
+                                   "COALESCE((SELECT MAX(id) FROM categories), 0)) + 1")
+                    route = (cursor.fetchone()[0], shard)
+                cursor.execute("INSERT INTO category_shards (category_id, name, shard) VALUES (?, ?, ?)",
+                               (route[0], name, route[1]))
+            return route
+        return self._write_transaction(work)
+
+    def get_category_shards(self):
+        """
+        Retourne la table de routage du mode réparti : {category_id: shard}.
         """
         self._connect()
         cursor = self._connection.cursor()
-        cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
-        self._connection.commit()
-        self._disconnect()
+        cursor.execute("SELECT category_id, shard FROM category_shards")
+        routes = dict(cursor.fetchall())
+        self._release()
+        return routes
+
+    def set_card_id_floor(self, floor):
+        """
+        Garantit que les prochaines cartes auront un identifiant supérieur à floor
+        (plage d'identifiants propre à un fichier en mode réparti).
+        """
+        def work(cursor):
+            cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'flashcards'", (floor,))
+            if not cursor.rowcount:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('flashcards', ?)", (floor,))
+        self._write_transaction(work)
 
     def get_all_categories(self):
         """
@@ -88,78 +316,628 @@ class DatabaseManager:
         cursor = self._connection.cursor()
         cursor.execute("SELECT id, name FROM categories")
         categories = cursor.fetchall()
-        self._disconnect()
+        self._release()
         return categories
 
-    def add_card(self, category_id, question, answer):
+    def add_card(self, category_id, question, answer, on_duplicate='skip'):
         """
         Ajoute une nouvelle carte flash à une catégorie spécifique.
+        Une carte dont la question et la réponse normalisées (voir ContentHash) existent
+        déjà dans la catégorie est un doublon.
+        :param on_duplicate: 'skip' pour ignorer le doublon, 'update' pour remplacer le texte
+                             de la carte existante, 'report' pour lever DuplicateCardError.
+        :return: Identifiant de la carte ajoutée, ou de la carte existante pour un doublon.
         """
-        self._connect()
-        cursor = self._connection.cursor()
-        cursor.execute("INSERT INTO flashcards (category_id, question, answer) VALUES (?, ?, ?)",
-                       (category_id, question, answer))
-        self._connection.commit()
-        self._disconnect()
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f"on_duplicate doit valoir {', '.join(DUPLICATE_POLICIES)}")
+        digest = content_hash(question, answer)
+
+        def work(cursor):
+            cursor.execute(_INSERT_CARD + _ON_DUPLICATE['skip'], (category_id, question, answer, digest))
+            if cursor.rowcount:
+                return cursor.lastrowid
+            cursor.execute("SELECT id FROM flashcards WHERE category_id = ? AND content_hash = ?", (category_id, digest))
+            card_id = cursor.fetchone()[0]
+            if on_duplicate == 'report':
+                raise DuplicateCardError(card_id)
+            if on_duplicate == 'update':
+                cursor.execute("UPDATE flashcards SET question = ?, answer = ? WHERE id = ?", (question, answer, card_id))
+            return card_id
+        return self._write_transaction(work)
 
-    def get_cards_by_category(self, category_id):
+    def add_cards_bulk(self, cards, on_duplicate='skip'):
+        """
+        Ajoute un lot de cartes dans une seule transaction avec executemany.
+        Les catégories absentes sont créées à la volée.
+        :param cards: Itérable de tuples (nom_categorie, question, reponse).
+        :param on_duplicate: Traitement des doublons, comme pour add_card ; avec 'report', un
+                             doublon lève sqlite3.IntegrityError et aucune carte n'est ajoutée.
+        :return: Nombre de cartes insérées (ou mises à jour avec 'update').
+        """
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f"on_duplicate doit valoir {', '.join(DUPLICATE_POLICIES)}")
+        cards = list(cards)  # Relu si la transaction est réessayée
+
+        def work(cursor):
+            category_ids = {}
+            rows = []
+            for category_name, question, answer in cards:
+                if category_name not in category_ids:
+                    cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (category_name,))
+                    cursor.execute("SELECT id FROM categories WHERE name = ?", (category_name,))
+                    category_ids[category_name] = cursor.fetchone()[0]
+                rows.append((category_ids[category_name], question, answer, content_hash(question, answer)))
+            if on_duplicate != 'report':
+                # Doublons internes au lot réglés d'avance : seules les cartes déjà en base sont en conflit
+                unique = {}
+                for row in rows:
+                    if on_duplicate == 'update' or (row[0], row[3]) not in unique:
+                        unique[(row[0], row[3])] = row
+                rows = list(unique.values())
+            insert = _INSERT_CARD + _ON_DUPLICATE[on_duplicate]
+            triggers = []
+            if len(rows) >= DEFERRED_SEARCH_INDEX_ROWS:
+                cursor.execute(f"SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+                               f"AND name IN ({', '.join('?' * len(_DEFERRED_TRIGGERS))})", _DEFERRED_TRIGGERS)
+                triggers = [row[0] for row in cursor.fetchall()]
+            if len(triggers) < len(_DEFERRED_TRIGGERS):
+                return cursor.executemany(insert, rows).rowcount
+            # Gros lot : l'index de recherche et les statistiques des catégories sont
+            # alimentés en une requête chacun après l'insertion, plusieurs fois plus vite
+            # que par les triggers ligne à ligne. Les triggers sont retirés puis recréés
+            # dans la même transaction, invisibles des autres connexions.
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM flashcards")
+            last_id = cursor.fetchone()[0]
+            for name in _DEFERRED_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {name}")
+            changed = cursor.executemany(insert, rows).rowcount
+            cursor.execute("INSERT INTO flashcards_fts (rowid, question, answer) "
+                           "SELECT id, question, answer FROM flashcards WHERE id > ?", (last_id,))
+            cursor.execute(category_stats_select("id > ?"), (last_id,))
+            for trigger in triggers:
+                cursor.execute(trigger)
+            return changed
+        changed = self._write_transaction(work)
+        return max(changed, 0)  # rowcount vaut -1 pour un lot vide
+
+    def get_cards_by_category(self, category_id, user_id=None):
         """
         Récupère toutes les cartes d'une catégorie donnée triées par score.
+        :param user_id: Utilisateur dont la progression donne les scores (voir add_user) ;
+                        None pour la progression partagée de flashcards.
         """
+        source, params = self._cards_source(user_id)
         self._connect()
         cursor = self._connection.cursor()
-        cursor.execute("SELECT id, question, answer, review_score FROM flashcards WHERE category_id = ? ORDER BY review_score ASC", (category_id,))
+        cursor.execute(f"SELECT id, question, answer, review_score FROM {source} WHERE category_id = ? "
+                       "ORDER BY review_score ASC", params + (category_id,))
         cards = cursor.fetchall()
-        self._disconnect()
+        self._release()
         return cards
 
     def delete_card(self, card_id):
         """
         Supprime une carte flash de la base de données en fonction de son ID.
+        :return: True si la carte existait.
+        """
+        return self._write_transaction(
+            lambda cursor: cursor.execute("DELETE FROM flashcards WHERE id = ?", (card_id,)).rowcount > 0)
+
+    def deduplicate_cards(self, chunk_size=1000, max_chunks=None):
+        """
+        Calcule l'empreinte des cartes qui n'en ont pas (cartes antérieures à la migration 8)
+        et fusionne les doublons par transactions de chunk_size cartes. Une carte en double
+        est supprimée ; si elle était mieux connue (review_score plus élevé), la carte
+        conservée reprend sa progression (score, facilité, intervalle, échéance), de même
+        pour la progression de chaque utilisateur.
+        :param max_chunks: Nombre maximal de transactions, None pour tout traiter.
+        :return: (nombre de cartes traitées, nombre de doublons supprimés).
+        """
+        def work(cursor):
+            cursor.execute("SELECT id, category_id, question, answer, review_score, ease, interval, next_due "
+                           "FROM flashcards WHERE content_hash IS NULL ORDER BY id LIMIT ?", (chunk_size,))
+            rows = cursor.fetchall()
+            merged = 0
+            for card_id, category_id, question, answer, score, ease, interval, next_due in rows:
+                digest = content_hash(question, answer)
+                cursor.execute("SELECT id, review_score FROM flashcards WHERE category_id = ? AND content_hash = ?",
+                               (category_id, digest))
+                kept = cursor.fetchone()
+                if kept is None:
+                    cursor.execute("UPDATE flashcards SET content_hash = ? WHERE id = ?", (digest, card_id))
+                    continue
+                if score > kept[1]:
+                    cursor.execute("UPDATE flashcards SET review_score = ?, ease = ?, interval = ?, next_due = ? "
+                                   "WHERE id = ?", (score, ease, interval, next_due, kept[0]))
+                # Progression de chaque utilisateur : la meilleure des deux copies est gardée
+                # (celle de la copie supprimée est effacée par le trigger flashcards_progress_delete)
+                cursor.execute("INSERT INTO user_progress (user_id, card_id, review_score, ease, interval, next_due) "
+                               "SELECT user_id, ?, review_score, ease, interval, next_due FROM user_progress "
+                               "WHERE card_id = ? "
+                               "ON CONFLICT (user_id, card_id) DO UPDATE SET review_score = excluded.review_score, "
+                               "ease = excluded.ease, interval = excluded.interval, next_due = excluded.next_due "
+                               "WHERE excluded.review_score > review_score", (kept[0], card_id))
+                cursor.execute("DELETE FROM flashcards WHERE id = ?", (card_id,))
+                merged += 1
+            return len(rows), merged
+
+        processed = removed = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            read, merged = self._write_transaction(work)
+            if not read:
+                break
+            processed += read
+            removed += merged
+            chunks += 1
+        return processed, removed
+
+    def get_cards_page(self, category_id, after=None, limit=100, user_id=None):
+        """
+        Récupère une page de cartes d'une catégorie triées par (score, id), par pagination
+        sur clé : la page suivante commence après la dernière carte de la précédente.
+        :param after: Clé (review_score, id) de la dernière carte de la page précédente, None pour la première page.
+        :param limit: Nombre maximal de cartes de la page.
+        :param user_id: Utilisateur dont les scores sont lus, None pour la progression partagée.
         """
+        score, card_id = after if after is not None else (-1, -1)
+        source, params = self._cards_source(user_id)
         self._connect()
         cursor = self._connection.cursor()
-        cursor.execute("DELETE FROM flashcards WHERE id = ?", (card_id,))
-        self._connection.commit()
-        self._disconnect()
+        cursor.execute(f"SELECT id, question, answer, review_score FROM {source} "
+                       "WHERE category_id = ? AND (review_score, id) > (?, ?) "
+                       "ORDER BY review_score ASC, id ASC LIMIT ?",
+                       params + (category_id, score, card_id, limit))
+        cards = cursor.fetchall()
+        self._release()
+        return cards
+
+    def get_card_key_at(self, category_id, position, user_id=None):
+        """
+        Retourne la clé (review_score, id) de la carte à une position donnée dans l'ordre
+        de get_cards_page, ou None. Seul l'index est parcouru, sans lire le texte des cartes,
+        mais la requête saute position entrées (OFFSET) : son coût croît avec la position.
+        Pour sauter souvent dans une grande catégorie, voir get_page_keys.
+        :param user_id: Utilisateur dont les scores ordonnent les cartes, comme pour get_cards_page.
+        """
+        source, params = self._cards_source(user_id)
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(f"SELECT review_score, id FROM {source} WHERE category_id = ? "
+                       "ORDER BY review_score ASC, id ASC LIMIT 1 OFFSET ?", params + (category_id, position))
+        row = cursor.fetchone()
+        self._release()
+        return row
 
-    def update_card_score(self, card_id, is_correct):
+    def get_page_keys(self, category_id, page_size, user_id=None):
         """
-        Met à jour le score de la carte en fonction de la réponse.
+        Retourne la clé (review_score, id) de la dernière carte de chaque page complète de
+        page_size cartes, dans l'ordre de get_cards_page, en un seul parcours de l'index :
+        la page n commence après la clé n - 1. Une fois ces clés lues, aller à n'importe
+        quelle page ne coûte qu'une lecture de page.
+        :param user_id: Utilisateur dont les scores ordonnent les cartes, comme pour get_cards_page.
         """
+        source, params = self._cards_source(user_id)
         self._connect()
         cursor = self._connection.cursor()
-        if is_correct:
-            cursor.execute("UPDATE flashcards SET review_score = review_score + 1 WHERE id = ?", (card_id,))
+        cursor.execute(f"SELECT review_score, id FROM (SELECT review_score, id, "
+                       f"ROW_NUMBER() OVER (ORDER BY review_score ASC, id ASC) AS position "
+                       f"FROM {source} WHERE category_id = ?) WHERE position % ? = 0 ORDER BY position",
+                       params + (category_id, page_size))
+        keys = [tuple(row) for row in cursor.fetchall()]
+        self._release()
+        return keys
+
+    def count_cards(self, category_id):
+        """
+        Retourne le nombre de cartes d'une catégorie, lu dans category_stats.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT card_count FROM category_stats WHERE category_id = ?", (category_id,))
+        row = cursor.fetchone()
+        self._release()
+        return row[0] if row else 0
+
+    def get_category_card_counts(self):
+        """
+        Retourne le nombre de cartes de chaque catégorie non vide sous forme de dictionnaire
+        {category_id: nombre}, lu dans category_stats.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT category_id, card_count FROM category_stats WHERE card_count > 0")
+        counts = dict(cursor.fetchall())
+        self._release()
+        return counts
+
+    def get_category_stats(self, category_id):
+        """
+        Retourne les statistiques d'une catégorie, tenues à jour par triggers (une ligne lue,
+        quelle que soit la taille du deck) : (nombre de cartes, cartes maîtrisées, histogramme).
+        Une carte est maîtrisée quand son intervalle atteint Migrations.MASTERED_INTERVAL jours ;
+        l'histogramme compte les cartes de chaque tranche de score de SCORE_BUCKETS.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT card_count, mastered_count, score_0, score_1, score_2, score_3_4, score_5_plus "
+                       "FROM category_stats WHERE category_id = ?", (category_id,))
+        row = cursor.fetchone()
+        self._release()
+        if row is None:
+            return 0, 0, (0,) * len(SCORE_BUCKETS)
+        return row[0], row[1], row[2:]
+
+    def get_all_category_stats(self):
+        """
+        Retourne les statistiques de chaque catégorie non vide : {category_id: statistiques de get_category_stats}.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT category_id, card_count, mastered_count, score_0, score_1, score_2, score_3_4, "
+                       "score_5_plus FROM category_stats WHERE card_count > 0")
+        stats = {row[0]: (row[1], row[2], row[3:]) for row in cursor}
+        self._release()
+        return stats
+
+    def rebuild_category_stats(self):
+        """
+        Recalcule les statistiques des catégories à partir des cartes.
+        """
+        def work(cursor):
+            cursor.execute("DELETE FROM category_stats")
+            cursor.execute(category_stats_select())
+        self._write_transaction(work)
+
+    def search_cards(self, query, category_id=None, limit=20, offset=0, with_rank=False):
+        """
+        Recherche plein texte dans les questions et réponses, résultats classés par pertinence.
+        Chaque mot de la requête est cherché comme préfixe.
+        :param query: Texte saisi par l'utilisateur.
+        :param category_id: Limite la recherche à une catégorie si précisé.
+        :return: Liste de tuples (id, category_id, question, answer, extrait) ; les termes
+                 trouvés sont entourés de [ ] dans la question et dans l'extrait de réponse.
+                 Avec with_rank, le score de pertinence (plus petit = plus pertinent) est ajouté en dernier.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        sql = ("SELECT f.id, f.category_id, highlight(flashcards_fts, 0, '[', ']'), f.answer, "
+               "snippet(flashcards_fts, 1, '[', ']', '…', 12)" + (", rank " if with_rank else " ") +
+               "FROM flashcards_fts JOIN flashcards f ON f.id = flashcards_fts.rowid "
+               "WHERE flashcards_fts MATCH ?")
+        params = [match]
+        if category_id is not None:
+            sql += " AND f.category_id = ?"
+            params.append(category_id)
+        sql += " ORDER BY rank LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+        self._release()
+        return results
+
+    def get_search_statistics(self, query, card_ids):
+        """
+        Statistiques bm25 de ce fichier pour une recherche, qui permettent de recalculer le score
+        de cartes trouvées dans plusieurs fichiers avec des fréquences globales (voir
+        ShardedDatabaseManager.search_cards).
+        :param card_ids: Cartes trouvées dont on veut le score de chaque mot.
+        :return: Tuple (nombre de cartes indexées, nombre de cartes contenant chaque mot,
+                 {card_id: [score bm25 de chaque mot seul]}).
+        """
+        phrases = self._fts_phrases(query)
+        card_ids = list(card_ids)
+        self._connect()
+        cursor = self._connection.cursor()
+        rows = cursor.execute("SELECT COUNT(*) FROM flashcards").fetchone()[0]
+        documents = []
+        scores = {card_id: [0.0] * len(phrases) for card_id in card_ids}
+        for position, phrase in enumerate(phrases):
+            documents.append(cursor.execute("SELECT COUNT(*) FROM flashcards_fts WHERE flashcards_fts MATCH ?",
+                                            (phrase,)).fetchone()[0])
+            for start in range(0, len(card_ids), 500):  # Limite du nombre de paramètres SQLite
+                chunk = card_ids[start:start + 500]
+                cursor.execute("SELECT rowid, rank FROM flashcards_fts WHERE flashcards_fts MATCH ? "
+                               f"AND rowid IN ({', '.join('?' * len(chunk))})", [phrase] + chunk)
+                for card_id, rank in cursor:
+                    scores[card_id][position] = rank
+        self._release()
+        return rows, documents, scores
+
+    @staticmethod
+    def _fts_phrases(text):
+        """
+        Découpe un texte libre en phrases FTS5 : chaque mot devient un préfixe entre guillemets,
+        ce qui neutralise la syntaxe FTS5 (opérateurs, parenthèses...).
+        """
+        return ['"' + term.replace('"', '""') + '"*' for term in text.split()]
+
+    @staticmethod
+    def _fts_query(text):
+        """
+        Transforme un texte libre en requête FTS5 (toutes les phrases de _fts_phrases).
+        """
+        return " ".join(DatabaseManager._fts_phrases(text))
+
+    def rebuild_search_index(self):
+        """
+        Reconstruit entièrement l'index de recherche à partir de la table flashcards.
+        """
+        self._write_transaction(
+            lambda cursor: cursor.execute("INSERT INTO flashcards_fts (flashcards_fts) VALUES ('rebuild')"))
+
+    def get_due_cards(self, category_id, now=None, limit=None, user_id=None):
+        """
+        Récupère les cartes d'une catégorie dont l'échéance est passée, les plus en retard d'abord.
+        :param now: Instant de référence (epoch), maintenant par défaut.
+        :param limit: Nombre maximal de cartes retournées.
+        :param user_id: Utilisateur dont la progression donne les échéances.
+        """
+        now = time.time() if now is None else now
+        source, params = self._cards_source(user_id)
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(f"SELECT id, question, answer, review_score FROM {source} "
+                       "WHERE category_id = ? AND next_due <= ? ORDER BY next_due ASC LIMIT ?",
+                       params + (category_id, now, -1 if limit is None else limit))
+        cards = cursor.fetchall()
+        self._release()
+        return cards
+
+    def get_card_keys_by_category(self, category_id, user_id=None):
+        """
+        Récupère (id, review_score) des cartes d'une catégorie triées par score, sans leurs
+        textes (lus à l'index, voir get_card_texts).
+        """
+        source, params = self._cards_source(user_id)
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(f"SELECT id, review_score FROM {source} WHERE category_id = ? ORDER BY review_score ASC",
+                       params + (category_id,))
+        keys = cursor.fetchall()
+        self._release()
+        return keys
+
+    def get_due_card_keys(self, category_id, now=None, limit=None, user_id=None):
+        """
+        Récupère (id, review_score) des cartes dues d'une catégorie, dans l'ordre de get_due_cards.
+        """
+        now = time.time() if now is None else now
+        source, params = self._cards_source(user_id)
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(f"SELECT id, review_score FROM {source} "
+                       "WHERE category_id = ? AND next_due <= ? ORDER BY next_due ASC LIMIT ?",
+                       params + (category_id, now, -1 if limit is None else limit))
+        keys = cursor.fetchall()
+        self._release()
+        return keys
+
+    def get_next_due(self, category_id, after, user_id=None):
+        """
+        Retourne la prochaine échéance strictement postérieure à after dans une catégorie,
+        ou None si aucune carte n'est attendue après cet instant.
+        """
+        source, params = self._cards_source(user_id)
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute(f"SELECT MIN(next_due) FROM {source} WHERE category_id = ? AND next_due > ?",
+                       params + (category_id, after))
+        next_due = cursor.fetchone()[0]
+        self._release()
+        return next_due
+
+    def get_card_categories(self, card_ids):
+        """
+        Retourne la catégorie de chaque carte existante : {card_id: category_id}.
+        """
+        card_ids = list(card_ids)
+        self._connect()
+        cursor = self._connection.cursor()
+        categories = {}
+        for start in range(0, len(card_ids), 500):  # Limite du nombre de paramètres SQLite
+            chunk = card_ids[start:start + 500]
+            cursor.execute(f"SELECT id, category_id FROM flashcards WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            categories.update(cursor.fetchall())
+        self._release()
+        return categories
+
+    def get_card_texts(self, card_ids):
+        """
+        Retourne les textes des cartes existantes : {card_id: (question, answer)}.
+        """
+        card_ids = list(card_ids)
+        self._connect()
+        cursor = self._connection.cursor()
+        texts = {}
+        for start in range(0, len(card_ids), 500):  # Limite du nombre de paramètres SQLite
+            chunk = card_ids[start:start + 500]
+            cursor.execute(f"SELECT id, question, answer FROM flashcards WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            texts.update((card_id, (question, answer)) for card_id, question, answer in cursor)
+        self._release()
+        return texts
+
+    def update_card_score(self, card_id, is_correct, now=None, user_id=None):
+        """
+        Met à jour le score de la carte en fonction de la réponse,
+        ainsi que sa facilité, son intervalle et sa prochaine échéance.
+        :param user_id: Utilisateur dont la progression est mise à jour ; None pour celle de flashcards.
+        """
+        now = time.time() if now is None else now
+
+        def work(cursor):
+            self._log_reviews(cursor, [self._grade_card(cursor, card_id, is_correct, now, user_id)])
+        self._write_transaction(work)
+
+    def apply_grades(self, grades, journal=None, last_sequence=None, user_id=None):
+        """
+        Applique un lot de réponses dans une seule transaction, dans l'ordre.
+        :param grades: Itérable de tuples (card_id, is_correct, instant).
+        :param journal: Identifiant du journal d'origine, pour enregistrer la progression.
+        :param last_sequence: Numéro de la dernière réponse du lot dans ce journal.
+        :param user_id: Utilisateur auteur des réponses ; None pour la progression de flashcards.
+        """
+        grades = list(grades)  # Relu si la transaction est réessayée
+
+        def work(cursor):
+            log_rows = [self._grade_card(cursor, card_id, is_correct, now, user_id)
+                        for card_id, is_correct, now in grades]
+            self._log_reviews(cursor, log_rows)
+            if journal is not None:
+                cursor.execute("INSERT OR REPLACE INTO grade_journals (journal, last_sequence) VALUES (?, ?)",
+                               (journal, last_sequence))
+        self._write_transaction(work)
+
+    def get_last_grade_sequence(self, journal):
+        """
+        Retourne le numéro de la dernière réponse appliquée depuis un journal (0 si aucune).
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT last_sequence FROM grade_journals WHERE journal = ?", (journal,))
+        row = cursor.fetchone()
+        self._release()
+        return row[0] if row else 0
+
+    def _grade_card(self, cursor, card_id, is_correct, now, user_id=None):
+        """
+        Applique une réponse à une carte dans la transaction en cours.
+        :return: Ligne à ajouter au journal des révisions, ou None si la carte n'existe plus.
+        """
+        if user_id is None:
+            cursor.execute("SELECT category_id, ease, interval, review_score FROM flashcards WHERE id = ?", (card_id,))
         else:
-            cursor.execute("UPDATE flashcards SET review_score = 0 WHERE id = ?", (card_id,))
-        self._connection.commit()
-        self._disconnect()
+            cursor.execute("SELECT f.category_id, COALESCE(p.ease, ?), COALESCE(p.interval, 0), "
+                           "COALESCE(p.review_score, 0) FROM flashcards f "
+                           "LEFT JOIN user_progress p ON p.user_id = ? AND p.card_id = f.id WHERE f.id = ?",
+                           (SM2.DEFAULT_EASE, user_id, card_id))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        category_id = row[0]
+        ease, interval, repetitions, next_due = self._algorithm.review(*row[1:], is_correct, now)
+        if user_id is None:
+            cursor.execute("UPDATE flashcards SET ease = ?, interval = ?, review_score = ?, next_due = ? WHERE id = ?",
+                           (ease, interval, repetitions, next_due, card_id))
+        else:
+            cursor.execute("INSERT OR REPLACE INTO user_progress (user_id, card_id, review_score, ease, interval, next_due) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", (user_id, card_id, repetitions, ease, interval, next_due))
+        return card_id, category_id, 1 if is_correct else 0, now, user_id
+
+    @staticmethod
+    def _log_reviews(cursor, log_rows):
+        """
+        Ajoute des réponses au journal des révisions ; les agrégats sont mis à jour par trigger.
+        """
+        cursor.executemany("INSERT INTO review_log (card_id, category_id, is_correct, reviewed_at, user_id) "
+                           "VALUES (?, ?, ?, ?, ?)", [row for row in log_rows if row is not None])
 
     def get_global_stats(self):
         """
-        Récupère les statistiques globales.
+        Récupère les statistiques globales : (sessions, bonnes réponses, mauvaises réponses, cartes révisées).
+        Les totaux combinent la ligne global_stats (sessions et totaux historiques) et les
+        agrégats précalculés du journal des révisions.
         """
         self._connect()
         cursor = self._connection.cursor()
-        cursor.execute('SELECT total_sessions, total_correct, total_incorrect, total_reviewed FROM global_stats WHERE id = 1')
+        cursor.execute('''
+            SELECT g.total_sessions,
+                   g.total_correct + COALESCE(s.correct, 0),
+                   g.total_incorrect + COALESCE(s.incorrect, 0),
+                   g.total_reviewed + COALESCE(s.correct + s.incorrect, 0)
+            FROM global_stats g
+            LEFT JOIN review_stats s ON s.scope = 'global' AND s.scope_key = ''
+            WHERE g.id = 1
+        ''')
         stats = cursor.fetchone()
-        self._disconnect()
+        self._release()
         return stats
 
-    def update_global_stats(self, correct, incorrect, reviewed):
+    def get_category_review_stats(self, category_id, user_id=None):
         """
-        Met à jour les statistiques globales en ajoutant les statistiques d'une session.
+        Retourne (bonnes réponses, mauvaises réponses) enregistrées pour une catégorie,
+        tous utilisateurs confondus ou pour un utilisateur.
         """
+        if user_id is None:
+            scope, key = 'category', str(category_id)
+        else:
+            scope, key = 'user_category', f"{user_id}:{category_id}"
         self._connect()
         cursor = self._connection.cursor()
-        cursor.execute('''
+        cursor.execute("SELECT correct, incorrect FROM review_stats WHERE scope = ? AND scope_key = ?", (scope, key))
+        stats = cursor.fetchone()
+        self._release()
+        return stats if stats else (0, 0)
+
+    def get_user_stats(self, user_id):
+        """
+        Retourne (bonnes réponses, mauvaises réponses) enregistrées pour un utilisateur.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT correct, incorrect FROM review_stats WHERE scope = 'user' AND scope_key = ?",
+                       (str(user_id),))
+        stats = cursor.fetchone()
+        self._release()
+        return stats if stats else (0, 0)
+
+    def get_daily_review_stats(self, days=7):
+        """
+        Retourne les statistiques des derniers jours de révision : liste de (date, bonnes, mauvaises),
+        du plus récent au plus ancien.
+        """
+        self._connect()
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT scope_key, correct, incorrect FROM review_stats WHERE scope = 'day' "
+                       "ORDER BY scope_key DESC LIMIT ?", (days,))
+        stats = cursor.fetchall()
+        self._release()
+        return stats
+
+    def rebuild_review_stats(self):
+        """
+        Recalcule tous les agrégats à partir du journal des révisions.
+        """
+        def work(cursor):
+            cursor.execute("DELETE FROM review_stats")
+            cursor.execute('''
+                INSERT INTO review_stats (scope, scope_key, correct, incorrect)
+                SELECT 'global', '', SUM(is_correct), SUM(1 - is_correct) FROM review_log HAVING COUNT(*) > 0
+                UNION ALL
+                SELECT 'category', CAST(category_id AS TEXT), SUM(is_correct), SUM(1 - is_correct)
+                FROM review_log GROUP BY category_id
+                UNION ALL
+                SELECT 'day', date(reviewed_at, 'unixepoch', 'localtime'), SUM(is_correct), SUM(1 - is_correct)
+                FROM review_log GROUP BY 2
+                UNION ALL
+                SELECT 'user', CAST(user_id AS TEXT), SUM(is_correct), SUM(1 - is_correct)
+                FROM review_log WHERE user_id IS NOT NULL GROUP BY user_id
+                UNION ALL
+                SELECT 'user_category', user_id || ':' || category_id, SUM(is_correct), SUM(1 - is_correct)
+                FROM review_log WHERE user_id IS NOT NULL GROUP BY user_id, category_id
+            ''')
+        self._write_transaction(work)
+
+    def record_session(self):
+        """
+        Comptabilise une session de révision. Les réponses sont déjà dans le journal des révisions.
+        """
+        self.update_global_stats(0, 0, 0)
+
+    def update_global_stats(self, correct, incorrect, reviewed):
+        """
+        Met à jour les statistiques globales en ajoutant les statistiques d'une session.
+        Ces totaux s'ajoutent à ceux du journal des révisions : utiliser record_session
+        pour une session dont les réponses ont été enregistrées par update_card_score ou apply_grades.
+        """
+        self._write_transaction(lambda cursor: cursor.execute('''
             UPDATE global_stats
             SET total_sessions = total_sessions + 1,
                 total_correct = total_correct + ?,
                 total_incorrect = total_incorrect + ?,
                 total_reviewed = total_reviewed + ?
             WHERE id = 1
-        ''', (correct, incorrect, reviewed))
-        self._connection.commit()
-        self._disconnect()
\ No newline at end of file
+        ''', (correct, incorrect, reviewed)))
\ No newline at end of file
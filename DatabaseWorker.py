@@ -0,0 +1,113 @@
+import queue
+import threading
+
+
+# Thread dédié aux accès à la base de données
+class DatabaseWorker:
+    """
+    Exécute les accès à la base de données sur un thread dédié pour que la boucle
+    Tkinter ne soit jamais bloquée par SQLite.
+
+    Une tâche est une fonction qui reçoit le DatabaseManager du thread. Son résultat
+    est renvoyé au thread Tkinter, qui appelle le callback lors d'un passage de
+    root.after. Les tâches soumises avec la même clé s'annulent : seule la plus
+    récente est exécutée et voit son résultat livré.
+    """
+    POLL_INTERVAL_MS = 20
+
+    def __init__(self, root, db_factory, on_busy_change=None):
+        """
+        :param root: Fenêtre Tkinter (ou tout objet fournissant after).
+        :param db_factory: Fonction créant le DatabaseManager, appelée dans le thread.
+        :param on_busy_change: Fonction appelée avec True/False quand des tâches sont en cours ou non.
+        """
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._generations = {}  # Dernière génération soumise pour chaque clé
+        self._pending = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(db_factory,), daemon=True)
+        self._thread.start()
+        self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def submit(self, task, callback=None, errback=None, key=None):
+        """
+        Soumet une tâche au thread de la base de données.
+        :param task: Fonction recevant le DatabaseManager et retournant un résultat.
+        :param callback: Fonction appelée dans le thread Tkinter avec le résultat.
+        :param errback: Fonction appelée dans le thread Tkinter avec l'exception levée.
+        :param key: Clé d'annulation ; une nouvelle tâche rend obsolètes les précédentes de même clé.
+        """
+        generation = None
+        if key is not None:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+        self._pending += 1
+        if self._pending == 1 and self.on_busy_change:
+            self.on_busy_change(True)
+        self._requests.put((task, callback, errback, key, generation))
+
+    def cancel(self, key):
+        """
+        Annule les tâches en attente ou en cours associées à une clé.
+        """
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _is_stale(self, key, generation):
+        return key is not None and self._generations.get(key) != generation
+
+    def _run(self, db_factory):
+        db_manager = db_factory()
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+                task, callback, errback, key, generation = request
+                result = error = None
+                if not self._is_stale(key, generation):
+                    try:
+                        result = task(db_manager)
+                    except Exception as exception:  # L'erreur est transmise au thread Tkinter
+                        error = exception
+                self._results.put((callback, errback, key, generation, result, error))
+        finally:
+            db_manager.close()
+
+    def _poll(self):
+        """
+        Livre les résultats disponibles dans le thread Tkinter.
+        """
+        while True:
+            try:
+                callback, errback, key, generation, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if self._pending == 0 and self.on_busy_change:
+                self.on_busy_change(False)
+            if self._is_stale(key, generation):
+                continue
+            if error is not None:
+                if errback is None:
+                    raise error
+                errback(error)
+            elif callback is not None:
+                callback(result)
+        if self._running:
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def stop(self, timeout=None):
+        """
+        Termine les tâches déjà soumises puis arrête le thread.
+        Les callbacks des tâches restantes ne sont pas appelés.
+        """
+        self._running = False
+        self._requests.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,163 @@
+import csv
+import json
+import sqlite3
+from itertools import islice
+
+
+class ImportReport:
+    """
+    Résultat d'un import : nombre de lignes traitées, importées et erreurs par ligne.
+    """
+    def __init__(self):
+        self.processed = 0  # Nombre de lignes lues
+        self.imported = 0  # Nombre de cartes insérées
+        self.errors = []  # Liste de tuples (numéro de ligne, message)
+
+    def add_error(self, line_number, message):
+        self.errors.append((line_number, message))
+
+
+# Import de decks en flux
+class DeckImporter:
+    """
+    Classe pour importer des cartes en masse depuis un fichier CSV/JSONL ou un itérable.
+    Les lignes sont lues en flux et écrites par paquets dans des transactions séparées.
+    """
+    def __init__(self, db_manager, chunk_size=1000, progress_callback=None, on_duplicate='skip'):
+        """
+        :param db_manager: Instance de DatabaseManager dans laquelle importer.
+        :param chunk_size: Nombre de cartes écrites par transaction.
+        :param progress_callback: Fonction appelée après chaque paquet avec le rapport en cours.
+        :param on_duplicate: Traitement des cartes déjà présentes dans leur catégorie : 'skip'
+                             (ignorées), 'update' (texte remplacé) ou 'report' (erreur sur la ligne).
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size doit être supérieur à 0")
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.on_duplicate = on_duplicate
+
+    def import_file(self, path, default_category=None):
+        """
+        Importe un fichier .csv, .jsonl ou un deck binaire .fcpk (voir DeckPack) selon son extension.
+        """
+        if path.lower().endswith('.fcpk'):
+            return self.import_pack(path)
+        if path.lower().endswith('.jsonl'):
+            return self.import_rows(self.read_jsonl(path), default_category)
+        if path.lower().endswith('.csv'):
+            return self.import_rows(self.read_csv(path), default_category)
+        raise ValueError(f"Format de fichier non supporté : {path}")
+
+    def import_pack(self, path):
+        """
+        Restaure un deck binaire : ses cartes sont déjà validées, elles sont écrites
+        directement par gros lots.
+        """
+        from DeckPack import DeckPack
+
+        report = ImportReport()
+        with DeckPack(path) as pack:
+            report.processed = len(pack)
+
+            def progress(restored):
+                report.imported = restored
+                if self.progress_callback:
+                    self.progress_callback(report)
+
+            report.imported = pack.restore(self.db_manager, max(self.chunk_size, 50_000), progress, self.on_duplicate)
+        return report
+
+    @staticmethod
+    def read_csv(path):
+        """
+        Lit un CSV avec en-tête (category, question, answer) ligne par ligne.
+        La colonne category est optionnelle.
+        """
+        with open(path, newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+
+    @staticmethod
+    def read_jsonl(path):
+        """
+        Lit un fichier JSONL contenant un objet {category, question, answer} par ligne.
+        """
+        with open(path, encoding='utf-8') as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_number, error
+
+    def import_rows(self, records, default_category=None):
+        """
+        Importe un itérable de dictionnaires (ou de tuples (numéro, dictionnaire)).
+        Les lignes invalides sont reportées dans le rapport sans interrompre l'import.
+        """
+        report = ImportReport()
+        numbered = self._number(records)
+        while True:
+            batch = list(islice(numbered, self.chunk_size))
+            if not batch:
+                break
+            chunk = []
+            for line_number, record in batch:
+                report.processed += 1
+                card = self._parse(record, default_category)
+                if isinstance(card, str):
+                    report.add_error(line_number, card)
+                else:
+                    chunk.append((line_number, card))
+            if chunk:
+                self._write_chunk(chunk, report)
+            if self.progress_callback:
+                self.progress_callback(report)
+        return report
+
+    @staticmethod
+    def _number(records):
+        """
+        Associe un numéro de ligne à chaque enregistrement s'il n'en a pas.
+        """
+        for index, record in enumerate(records, start=1):
+            if isinstance(record, tuple) and len(record) == 2 and isinstance(record[0], int):
+                yield record
+            else:
+                yield index, record
+
+    @staticmethod
+    def _parse(record, default_category):
+        """
+        Valide un enregistrement et retourne (catégorie, question, réponse) ou un message d'erreur.
+        """
+        if isinstance(record, Exception):
+            return f"Ligne illisible : {record}"
+        if not isinstance(record, dict):
+            return "Enregistrement invalide"
+        category = str(record.get('category') or default_category or '').strip()
+        question = str(record.get('question') or '').strip()
+        answer = str(record.get('answer') or '').strip()
+        if not category:
+            return "Catégorie manquante"
+        if not question or not answer:
+            return "Question ou réponse manquante"
+        return category, question, answer
+
+    def _write_chunk(self, chunk, report):
+        """
+        Écrit un paquet en une transaction. En cas d'échec, les lignes sont réessayées
+        une par une pour isoler celles qui posent problème.
+        """
+        try:
+            report.imported += self.db_manager.add_cards_bulk((card for _, card in chunk), self.on_duplicate)
+        except sqlite3.Error:
+            for line_number, card in chunk:
+                try:
+                    report.imported += self.db_manager.add_cards_bulk([card], self.on_duplicate)
+                except sqlite3.Error as error:
+                    report.add_error(line_number, str(error))
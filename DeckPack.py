@@ -0,0 +1,234 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+# Format (entiers little-endian) :
+#   en-tête        : 'FCPK', version (u16), réservé (u16), nombre de catégories (u64),
+#                    nombre de cartes (u64), position de la table des catégories (u64),
+#                    position de l'index des cartes (u64)
+#   chaînes        : longueur en octets (u32) puis texte UTF-8 ; la réponse d'une carte suit sa question
+#   catégories     : par catégorie, position du nom (u64), première carte (u64), nombre de cartes (u64)
+#   index          : par carte, position de sa question (u64) ; les cartes sont regroupées par catégorie
+HEADER = struct.Struct('<4sHHQQQQ')
+CATEGORY = struct.Struct('<QQQ')
+OFFSET = struct.Struct('<Q')
+LENGTH = struct.Struct('<I')
+MAGIC = b'FCPK'
+VERSION = 1
+
+
+# Deck binaire en lecture seule
+class DeckPack:
+    """
+    Deck au format binaire compact (.fcpk), lu par projection en mémoire (mmap) :
+    l'ouverture ne lit que l'en-tête et la table des catégories, chaque carte est
+    ensuite lue directement à sa position, quelle que soit la taille du deck.
+
+    Un deck s'écrit avec DeckPack.write (cartes quelconques) ou DeckPack.export
+    (contenu d'une base), et se restaure dans une base avec restore.
+    """
+    def __init__(self, path):
+        """
+        :param path: Fichier .fcpk à ouvrir.
+        :raises ValueError: Si le fichier n'est pas un deck valide.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"Deck invalide (fichier tronqué) : {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _, category_count, card_count, categories_at, self._index_at = \
+                HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Deck invalide (signature inconnue) : {path}")
+            if version != VERSION:
+                raise ValueError(f"Version de deck non supportée ({version}) : {path}")
+            if categories_at + category_count * CATEGORY.size > size or self._index_at + card_count * OFFSET.size > size:
+                raise ValueError(f"Deck invalide (fichier tronqué) : {path}")
+            self._card_count = card_count
+            self.categories = []  # (nom, première carte, nombre de cartes)
+            for position in range(categories_at, categories_at + category_count * CATEGORY.size, CATEGORY.size):
+                name_at, first, count = CATEGORY.unpack_from(self._map, position)
+                try:
+                    name = str(self._string(name_at)[0], 'utf-8')
+                except UnicodeDecodeError:
+                    raise ValueError(f"Deck invalide (nom de catégorie mal encodé) : {path}") from None
+                self.categories.append((name, first, count))
+            self._firsts = [first for _, first, _ in self.categories]
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Ferme le deck. Les vues retournées par raw_card doivent avoir été libérées.
+        """
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __len__(self):
+        return self._card_count
+
+    def _string(self, position):
+        """
+        Retourne (vue sur les octets de la chaîne à position, position suivante), sans copie.
+        """
+        start = position + LENGTH.size
+        if start > len(self._map):
+            raise ValueError(f"Deck invalide (chaîne hors du fichier) : {self.path}")
+        length, = LENGTH.unpack_from(self._map, position)
+        if start + length > len(self._map):
+            raise ValueError(f"Deck invalide (chaîne hors du fichier) : {self.path}")
+        return memoryview(self._map)[start:start + length], start + length
+
+    def _position(self, index):
+        if index < 0:
+            index += self._card_count
+        if not 0 <= index < self._card_count:
+            raise IndexError("index de carte hors limites")
+        return OFFSET.unpack_from(self._map, self._index_at + index * OFFSET.size)[0]
+
+    def raw_card(self, index):
+        """
+        Retourne (question, réponse) d'une carte sous forme de vues memoryview sur les
+        octets UTF-8 du fichier, sans copie ni décodage.
+        """
+        question, answer_at = self._string(self._position(index))
+        return question, self._string(answer_at)[0]
+
+    def category_of(self, index):
+        """
+        Retourne le nom de la catégorie d'une carte.
+        """
+        if index < 0:
+            index += self._card_count
+        return self.categories[bisect_right(self._firsts, index) - 1][0]
+
+    def __getitem__(self, index):
+        """
+        Retourne la carte (catégorie, question, réponse) à une position du deck.
+        """
+        question, answer = self.raw_card(index)
+        return self.category_of(index), str(question, 'utf-8'), str(answer, 'utf-8')
+
+    def __iter__(self):
+        for name, first, count in self.categories:
+            for question, answer in self._texts(first, count):
+                yield name, question, answer
+
+    def _texts(self, first, count):
+        for index in range(first, first + count):
+            question, answer = self.raw_card(index)
+            yield str(question, 'utf-8'), str(answer, 'utf-8')
+
+    def category_cards(self, name):
+        """
+        Parcourt les cartes (question, réponse) d'une catégorie du deck.
+        """
+        for category, first, count in self.categories:
+            if category == name:
+                return self._texts(first, count)
+        raise KeyError(name)
+
+    def restore(self, db_manager, chunk_size=50_000, progress_callback=None, on_duplicate='skip'):
+        """
+        Ajoute toutes les cartes du deck dans une base, par transactions de chunk_size cartes.
+        :param db_manager: DatabaseManager (ou base de même interface) à remplir.
+        :param progress_callback: Fonction appelée avec le nombre de cartes ajoutées après chaque transaction.
+        :param on_duplicate: Traitement des cartes déjà présentes (voir DatabaseManager.add_card).
+        :return: Nombre de cartes ajoutées.
+        """
+        restored = 0
+        for name, first, count in self.categories:
+            for start in range(first, first + count, chunk_size):
+                end = min(start + chunk_size, first + count)
+                restored += db_manager.add_cards_bulk(((name, question, answer)
+                                                       for question, answer in self._texts(start, end - start)),
+                                                      on_duplicate)
+                if progress_callback:
+                    progress_callback(restored)
+        return restored
+
+    # Écriture
+
+    @staticmethod
+    def write(path, cards):
+        """
+        Écrit un deck à partir d'un itérable de cartes (catégorie, question, réponse), lu
+        en flux. Les cartes d'une même catégorie sont regroupées, dans l'ordre de première
+        apparition des catégories. Le fichier est remplacé d'un coup une fois complet.
+        :return: Nombre de cartes écrites.
+        """
+        positions = {}  # Catégorie -> positions des questions de ses cartes
+        with open(path + '.tmp', 'wb') as output:
+            output.write(bytes(HEADER.size))  # Réécrit à la fin
+            position = HEADER.size
+
+            def write_string(text):
+                nonlocal position
+                data = text.encode('utf-8')
+                output.write(LENGTH.pack(len(data)))
+                output.write(data)
+                start, position = position, position + LENGTH.size + len(data)
+                return start
+
+            for category, question, answer in cards:
+                card_positions = positions.get(category)
+                if card_positions is None:
+                    card_positions = positions[category] = array('Q')
+                card_positions.append(write_string(question))
+                write_string(answer)
+
+            name_positions = [write_string(category) for category in positions]
+            categories_at = position
+            first = 0
+            for name_at, card_positions in zip(name_positions, positions.values()):
+                output.write(CATEGORY.pack(name_at, first, len(card_positions)))
+                first += len(card_positions)
+            index_at = categories_at + len(positions) * CATEGORY.size
+            for card_positions in positions.values():
+                if sys.byteorder == 'big':
+                    card_positions.byteswap()
+                output.write(card_positions.tobytes())
+            output.seek(0)
+            output.write(HEADER.pack(MAGIC, VERSION, 0, len(positions), first, categories_at, index_at))
+        os.replace(path + '.tmp', path)
+        return first
+
+    @classmethod
+    def export(cls, db_manager, path, category_ids=None, page_size=1000):
+        """
+        Écrit dans un deck les cartes d'une base, page par page.
+        :param category_ids: Catégories à exporter, toutes par défaut.
+        :return: Nombre de cartes écrites.
+        """
+        categories = db_manager.get_all_categories()
+        if category_ids is not None:
+            category_ids = set(category_ids)
+            categories = [category for category in categories if category[0] in category_ids]
+
+        def cards():
+            for category_id, name in categories:
+                after = None
+                while True:
+                    page = db_manager.get_cards_page(category_id, after, page_size)
+                    for _, question, answer, _ in page:
+                        yield name, question, answer
+                    if len(page) < page_size:
+                        break
+                    after = (page[-1][3], page[-1][0])
+
+        return cls.write(path, cards())
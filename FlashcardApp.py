@@ -1,27 +1,70 @@
 import tkinter as tk
 from tkinter import messagebox
+import re
 import time
-from DatabaseManager import DatabaseManager
+from DatabaseManager import DatabaseManager, DuplicateCardError, SCORE_BUCKETS
+from DatabaseWorker import DatabaseWorker
+from GradeBuffer import GradeBuffer
 from CategoryManager import CategoryManager
 from CardManager import CardManager
+from CardTextCache import CardTextCache
+from ReviewScheduler import CompactReviewScheduler
+from CachedStore import CachedStore
 
 # Interface utilisateur principale
 class FlashcardApp:
     """
     Classe principale pour l'application Flashcard avec interface Tkinter.
     """
-    def __init__(self, root):
+    GRADE_FLUSH_INTERVAL_MS = 5000  # Écriture périodique des réponses en attente
+    SEARCH_DELAY_MS = 250  # Délai sans frappe avant de lancer une recherche
+    MIXED_PAGE_SIZE = 50  # Cartes lues à la fois dans chaque catégorie d'une révision mixte
+    # Étapes du démarrage mesurées dans startup_times
+    STARTUP_MILESTONES = ("window", "interactive", "schema", "categories", "global_stats")
+
+    def __init__(self, root, instrumentation=None, store_factory=None, started_at=None, user=None):
+        """
+        :param root: Fenêtre principale Tkinter.
+        :param instrumentation: Instrumentation optionnelle des accès à la base.
+        :param store_factory: Fonction créant la base utilisée par l'application, appelée
+                              dans le thread du DatabaseWorker. Par défaut, un DatabaseManager
+                              sur flashcards.db. Le résultat est placé derrière un CachedStore.
+        :param started_at: Instant (time.perf_counter) de référence des mesures de démarrage,
+                           la construction de l'application par défaut.
+        :param user: Nom de l'utilisateur qui révise, créé s'il n'existe pas. Chaque utilisateur a
+                     sa propre progression et ses statistiques ; sans nom, la progression est partagée.
+        """
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.startup_times = {}  # Étape -> secondes écoulées depuis started_at
         self.root = root
-        self.root.title("Flashcards")
+        self.root.title("Flashcards" if user is None else f"Flashcards - {user}")
         self.root.geometry("600x500")
         self.root.config(bg="#F4F4F9")  # Couleur de fond de l'application
 
-        self.db_manager = DatabaseManager()
-        self.db_manager.setup_database()
+        # Tous les accès à la base passent par le thread du DatabaseWorker, à travers un cache partagé
+        if store_factory is None:
+            store_factory = lambda: DatabaseManager(instrumentation=instrumentation)
+        self.worker = DatabaseWorker(self.root, lambda: CachedStore(store_factory()))
+        # La fenêtre s'affiche sans attendre : le schéma, les catégories et les statistiques
+        # sont lus en arrière-plan, dans l'ordre des demandes
+        self.worker.submit(lambda db: db.setup_database(), lambda _: self.mark_startup("schema"),
+                           self.show_database_error)
+        self.deduplicate_cards()
 
         # Gestion des catégories et des cartes
-        self.category_manager = CategoryManager()
-        self.card_manager = CardManager()
+        self.category_manager = CategoryManager(load=False)
+        journal_path = 'grades.journal'
+        if user is not None:
+            journal_path = f"grades.{re.sub(r'[^0-9A-Za-z_-]', '_', user)}.journal"  # Un journal par utilisateur
+        self.grade_buffer = GradeBuffer(journal_path=journal_path, on_full=self.flush_grades)
+        # Session compacte : les textes des cartes sont lus par le worker, quelques cartes à l'avance
+        self.card_manager = CardManager(scheduler=CompactReviewScheduler(texts=CardTextCache()),
+                                        grade_buffer=self.grade_buffer)
+        self.user_id = None
+        if user is not None:
+            # Résolu par le worker avant toute autre lecture ou écriture de progression
+            self.worker.submit(lambda db: self.set_user_id(db.add_user(user)), errback=self.show_database_error)
+        self.worker.submit(self.grade_buffer.recover, errback=self.show_database_error)
         self.selected_category_id = None
 
         # Statistiques
@@ -33,17 +76,63 @@ class FlashcardApp:
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         self.create_widgets()
+        self.mark_startup("window")
+        self.worker.on_busy_change = self.show_loading
+        self.show_loading(self.worker.busy)
+        self.refresh_categories(lambda: self.mark_startup("categories"))
+        self.root.after(self.GRADE_FLUSH_INTERVAL_MS, self.flush_grades_periodically)
         self.display_global_stats()
+        # Premier passage dans la boucle d'événements, après l'affichage de la fenêtre
+        self.root.after_idle(lambda: self.mark_startup("interactive"))
+
+    def deduplicate_cards(self):
+        """
+        Fusionne en arrière-plan les doublons des cartes antérieures à l'empreinte de contenu,
+        une transaction par tâche pour ne pas retarder les autres accès à la base.
+        """
+        def on_chunk(result):
+            processed, removed = result
+            if removed:
+                self.category_manager.invalidate_card_count()
+            if processed:
+                self.deduplicate_cards()
+
+        self.worker.submit(lambda db: db.deduplicate_cards(max_chunks=1), on_chunk, self.show_database_error)
+
+    def set_user_id(self, user_id):
+        """
+        Attribue la progression de la session, des réponses et des statistiques à un utilisateur.
+        """
+        self.user_id = self.grade_buffer.user_id = self.card_manager.user_id = user_id
+
+    def mark_startup(self, milestone):
+        """
+        Enregistre la première occurrence d'une étape du démarrage.
+        """
+        self.startup_times.setdefault(milestone, time.perf_counter() - self.started_at)
 
     def create_widgets(self):
         """
         Crée tous les widgets de l'interface utilisateur.
         """
+        # Indicateur de chargement
+        self.loading_label = tk.Label(self.root, text="", bg="#F4F4F9", fg="#6C757D", font=("Arial", 10))
+        self.loading_label.pack()
+        # Statistiques globales, affichées sans fenêtre modale dès qu'elles sont lues
+        self.global_stats_label = tk.Label(self.root, text="", bg="#F4F4F9", fg="#495057", font=("Arial", 10))
+        self.global_stats_label.pack()
+
         # Interface pour ajouter des catégories
         self.category_entry = tk.Entry(self.root, width=40, bg="#E9ECEF", fg="#495057", font=("Arial", 12))
         self.category_entry.pack(pady=5)
-        tk.Button(self.root, text="Ajouter la catégorie", command=self.add_category,
-                  bg="#007BFF", fg="white", font=("Arial", 12)).pack(pady=5)
+        category_buttons = tk.Frame(self.root, bg="#F4F4F9")
+        category_buttons.pack(pady=5)
+        tk.Button(category_buttons, text="Ajouter la catégorie", command=self.add_category,
+                  bg="#007BFF", fg="white", font=("Arial", 12)).pack(side="left", padx=5)
+        tk.Button(category_buttons, text="Renommer", command=self.rename_category,
+                  bg="#6C757D", fg="white", font=("Arial", 12)).pack(side="left", padx=5)
+        tk.Button(category_buttons, text="Supprimer", command=self.delete_category,
+                  bg="#DC3545", fg="white", font=("Arial", 12)).pack(side="left", padx=5)
 
         # Menu de sélection des catégories
         self.category_var = tk.StringVar(self.root)
@@ -55,6 +144,8 @@ class FlashcardApp:
 
         self.category_menu.config(bg="#E9ECEF", fg="#495057", font=("Arial", 12))
         self.category_menu.pack(pady=5)
+        tk.Button(self.root, text="Réviser plusieurs catégories", command=self.show_mixed_review,
+                  bg="#6C757D", fg="white", font=("Arial", 12)).pack(pady=5)
 
         # Interface pour ajouter des cartes
         self.question_entry = tk.Entry(self.root, width=40, bg="#E9ECEF", fg="#495057", font=("Arial", 12))
@@ -63,6 +154,12 @@ class FlashcardApp:
         self.answer_entry.pack(pady=5)
         tk.Button(self.root, text="Ajouter la carte", command=self.add_card,
                   bg="#28A745", fg="white", font=("Arial", 12)).pack(pady=5)
+        deck_buttons = tk.Frame(self.root, bg="#F4F4F9")
+        deck_buttons.pack(pady=5)
+        tk.Button(deck_buttons, text="Importer un deck", command=self.import_deck,
+                  bg="#20C997", fg="white", font=("Arial", 12)).pack(side="left", padx=5)
+        tk.Button(deck_buttons, text="Exporter un deck", command=self.export_deck,
+                  bg="#20C997", fg="white", font=("Arial", 12)).pack(side="left", padx=5)
 
         # Interface pour la révision
         self.question_label = tk.Label(self.root, text="", wraplength=400, bg="#F4F4F9", font=("Arial", 14))
@@ -85,9 +182,36 @@ class FlashcardApp:
         # Boutons pour afficher les cartes et les statistiques
         tk.Button(self.root, text="Voir toutes les cartes et catégories",
                   command=self.show_all_cards, bg="#6F42C1", fg="white", font=("Arial", 12)).pack(pady=10)
+        tk.Button(self.root, text="Rechercher une carte",
+                  command=self.show_search, bg="#6F42C1", fg="white", font=("Arial", 12)).pack(pady=10)
         tk.Button(self.root, text="Voir les statistiques de la session",
                   command=self.show_statistics, bg="#343A40", fg="white", font=("Arial", 12)).pack(pady=10)
 
+    def show_loading(self, busy):
+        """
+        Affiche ou masque l'indicateur de chargement selon l'activité du DatabaseWorker.
+        """
+        self.loading_label.config(text="Chargement..." if busy else "")
+
+    def show_database_error(self, error):
+        """
+        Signale une erreur survenue dans le thread de la base de données.
+        """
+        messagebox.showerror("Erreur", f"Erreur de base de données : {error}")
+
+    def refresh_categories(self, callback=None):
+        """
+        Recharge la liste des catégories en arrière-plan puis met à jour le menu.
+        """
+        def on_loaded(categories):
+            self.category_manager.set_categories(categories)
+            self.update_category_menu()
+            if callback:
+                callback()
+
+        self.worker.submit(lambda db: db.get_all_categories(), on_loaded,
+                           self.show_database_error, key="categories")
+
     def start_review(self):
         """
         Enregistre le temps de début de la révision.
@@ -102,34 +226,185 @@ class FlashcardApp:
         if not category_name:  # Vérifie si le champ est vide
             messagebox.showwarning("Erreur", "Le nom de la catégorie ne peut pas être vide.")
             return
-        self.category_manager.add_category(category_name)
-        self.update_category_menu()
-        messagebox.showinfo("Succès", "Catégorie ajoutée avec succès.")
+
+        def on_added(category_id):
+            if self.category_manager.get_by_id(category_id) is None:
+                if not self.category_manager.categories:
+                    self.category_menu["menu"].delete(0, "end")  # Retire « Aucune catégorie disponible »
+                self.category_manager.register_category(category_id, category_name)
+                self.add_category_menu_entry(category_name)
+            messagebox.showinfo("Succès", "Catégorie ajoutée avec succès.")
+
+        self.worker.submit(lambda db: db.add_category(category_name), on_added, self.show_database_error)
+        self.category_entry.delete(0, tk.END)
+
+    def rename_category(self):
+        """
+        Renomme la catégorie sélectionnée avec le nom saisi dans le champ des catégories.
+        """
+        category = self.category_manager.get_by_id(self.selected_category_id)
+        new_name = self.category_entry.get().strip()
+        if category is None or not new_name:
+            messagebox.showwarning("Erreur", "Sélectionnez une catégorie et saisissez son nouveau nom.")
+            return
+        if self.category_manager.get_by_name(new_name) is not None:
+            messagebox.showwarning("Erreur", "Une catégorie porte déjà ce nom.")
+            return
+        category_id = category[0]
+
+        def on_renamed(_):
+            index = self.category_manager.get_position(category_id)
+            self.category_manager.register_category(category_id, new_name)
+            self.category_menu["menu"].entryconfigure(
+                index, label=new_name, command=lambda: self.select_category(new_name))
+            if self.selected_category_id == category_id:
+                self.category_var.set(new_name)
+
+        self.worker.submit(lambda db: db.rename_category(category_id, new_name), on_renamed,
+                           self.show_database_error)
         self.category_entry.delete(0, tk.END)
 
+    def delete_category(self):
+        """
+        Supprime la catégorie sélectionnée et toutes ses cartes.
+        """
+        category = self.category_manager.get_by_id(self.selected_category_id)
+        if category is None:
+            messagebox.showwarning("Erreur", "Veuillez sélectionner une catégorie.")
+            return
+        if not messagebox.askyesno("Confirmation", f"Supprimer la catégorie « {category[1]} » et ses cartes ?"):
+            return
+        category_id = category[0]
+
+        def on_deleted(_):
+            menu = self.category_menu["menu"]
+            menu.delete(self.category_manager.get_position(category_id))
+            self.category_manager.forget_category(category_id)
+            if not self.category_manager.categories:
+                self.update_category_menu()
+            self.selected_category_id = None
+            self.category_var.set("Sélectionner une catégorie")
+            self.card_manager.set_cards([])
+            self.show_next_card()
+
+        self.worker.cancel("session")
+        self.worker.submit(lambda db: db.delete_category(category_id), on_deleted, self.show_database_error)
+
     def update_category_menu(self):
         """
-        Met à jour le menu déroulant des catégories avec les nouvelles catégories ajoutées.
+        Reconstruit entièrement le menu déroulant des catégories (au chargement initial).
+        Les ajouts, renommages et suppressions modifient ensuite une seule entrée.
         """
         menu = self.category_menu["menu"]
         menu.delete(0, "end")
         categories = self.category_manager.get_category_names()
         if not categories:
-            categories = ["Aucune catégorie disponible"]
+            menu.add_command(label="Aucune catégorie disponible")
         for category in categories:
-            menu.add_command(label=category, command=lambda value=category: self.select_category(value))
+            self.add_category_menu_entry(category)
+
+    def add_category_menu_entry(self, category_name):
+        """
+        Ajoute une catégorie à la fin du menu déroulant.
+        """
+        self.category_menu["menu"].add_command(label=category_name,
+                                               command=lambda: self.select_category(category_name))
 
     def select_category(self, category_name):
         """
         Sélectionne une catégorie et charge ses cartes flash pour la révision.
         """
-        category = next((cat for cat in self.category_manager.categories if cat[1] == category_name), None)
+        self.category_var.set(category_name)
+        category = self.category_manager.get_by_name(category_name)
         if category:
             self.selected_category_id = category[0]
-            self.card_manager.load_cards(self.selected_category_id)
+            self.load_session(self.start_review)
+
+    def load_session(self, callback=None):
+        """
+        Écrit les réponses en attente puis charge en arrière-plan les cartes dues
+        de la catégorie sélectionnée. Un changement rapide de catégorie annule
+        le chargement précédent.
+        """
+        category_id = self.selected_category_id
+
+        def load(db):
+            self.grade_buffer.flush(db)
+            return db.get_due_card_keys(category_id, user_id=self.user_id)
+
+        def on_loaded(keys):
+            self.card_manager.set_card_keys(keys)
+            if callback:
+                callback()
+            self.show_next_card()
+
+        self.question_label.config(text="Chargement des cartes...")
+        self.answer_label.config(text="")
+        self.worker.submit(load, on_loaded, self.show_database_error, key="session")
+
+    def show_mixed_review(self):
+        """
+        Ouvre une fenêtre de choix des catégories à réviser ensemble, avec le poids de
+        chacune et l'ordre de présentation.
+        """
+        categories = self.category_manager.categories
+        if not categories:
+            messagebox.showwarning("Erreur", "Aucune catégorie disponible.")
+            return
+        popup = tk.Toplevel(self.root)
+        popup.title("Réviser plusieurs catégories")
+        rows = tk.Frame(popup)
+        rows.pack(padx=10, pady=5)
+        tk.Label(rows, text="Poids", font=("Arial", 10)).grid(row=0, column=1)
+        choices = []
+        for row, (category_id, name) in enumerate(categories, start=1):
+            selected = tk.BooleanVar(popup, value=category_id == self.selected_category_id)
+            weight = tk.IntVar(popup, value=1)
+            tk.Checkbutton(rows, text=name, variable=selected, font=("Arial", 12)).grid(row=row, column=0, sticky="w")
+            tk.Spinbox(rows, from_=1, to=5, width=3, textvariable=weight).grid(row=row, column=1, padx=5)
+            choices.append((category_id, selected, weight))
+        interleave = tk.BooleanVar(popup, value=False)
+        tk.Checkbutton(popup, text="Alterner les catégories (sinon, cartes les moins connues d'abord)",
+                       variable=interleave).pack(pady=5)
+
+        def start():
+            try:
+                weights = {category_id: weight.get() for category_id, selected, weight in choices if selected.get()}
+            except tk.TclError:
+                weights = None
+            if not weights or min(weights.values()) < 1:
+                messagebox.showwarning("Erreur", "Cochez au moins une catégorie, avec un poids entier positif.")
+                return
+            popup.destroy()
+            self.load_mixed_session(weights, interleave.get())
+
+        tk.Button(popup, text="Commencer la révision", command=start,
+                  bg="#17A2B8", fg="white", font=("Arial", 12)).pack(pady=10)
+
+    def load_mixed_session(self, weights, interleave=False):
+        """
+        Écrit les réponses en attente puis commence en arrière-plan une révision mixte des
+        catégories {category_id: poids} : seule la première page de chacune est lue.
+        """
+        page_size = self.MIXED_PAGE_SIZE
+
+        def load(db):
+            self.grade_buffer.flush(db)
+            return [(category_id, weight, db.count_cards(category_id),
+                     db.get_cards_page(category_id, None, page_size, user_id=self.user_id))
+                    for category_id, weight in weights.items()]
+
+        def on_loaded(categories):
+            self.card_manager.set_mixed_cards(categories, interleave, page_size)
             self.start_review()
             self.show_next_card()
 
+        self.selected_category_id = None
+        self.category_var.set(f"Révision mixte ({len(weights)} catégories)")
+        self.question_label.config(text="Chargement des cartes...")
+        self.answer_label.config(text="")
+        self.worker.submit(load, on_loaded, self.show_database_error, key="session")
+
     def add_card(self):
         """
         Ajoute une carte flash à la catégorie sélectionnée.
@@ -140,19 +415,78 @@ class FlashcardApp:
             messagebox.showwarning("Erreur", "Les champs question et réponse ne peuvent pas être vides.")
             return
         if self.selected_category_id:
-            self.db_manager.add_card(self.selected_category_id, question, answer)
-            messagebox.showinfo("Succès", "Carte ajoutée avec succès.")
+            category_id = self.selected_category_id
+            self.category_manager.invalidate_card_count(category_id)
+
+            def on_added(card_id):
+                # Une nouvelle carte est due tout de suite : elle rejoint la session en cours
+                if self.selected_category_id == category_id:
+                    self.update_session(lambda: self.card_manager.insert_card(card_id, question, answer))
+                messagebox.showinfo("Succès", "Carte ajoutée avec succès.")
+
+            self.worker.submit(lambda db: db.add_card(category_id, question, answer, on_duplicate='report'),
+                               on_added, self.show_add_card_error)
             self.question_entry.delete(0, tk.END)
             self.answer_entry.delete(0, tk.END)
         else:
             messagebox.showwarning("Erreur", "Veuillez sélectionner une catégorie avant d'ajouter une carte.")
 
+    def show_add_card_error(self, error):
+        """
+        Signale un doublon refusé, ou une autre erreur de la base.
+        """
+        if isinstance(error, DuplicateCardError):
+            messagebox.showwarning("Doublon", "Cette carte existe déjà dans la catégorie.")
+        else:
+            self.show_database_error(error)
+
+    def import_deck(self):
+        """
+        Importe un deck depuis un fichier CSV, JSONL ou un deck binaire (.fcpk).
+        Les cartes sans catégorie sont ajoutées à la catégorie sélectionnée.
+        """
+        from tkinter import filedialog  # Modules chargés à la première utilisation
+        from DeckImporter import DeckImporter
+
+        path = filedialog.askopenfilename(filetypes=[("Decks", "*.csv *.jsonl *.fcpk")])
+        if not path:
+            return
+        category = self.category_manager.get_by_id(self.selected_category_id)
+        default_category = category[1] if category else None
+
+        def on_imported(report):
+            self.refresh_categories()
+            if self.selected_category_id:
+                self.load_session()
+            message = f"{report.imported} cartes importées sur {report.processed} lignes."
+            if report.errors:
+                message += f"\n{len(report.errors)} lignes en erreur (première : ligne {report.errors[0][0]}, {report.errors[0][1]})."
+            messagebox.showinfo("Import terminé", message)
+
+        self.worker.submit(lambda db: DeckImporter(db).import_file(path, default_category), on_imported,
+                           lambda error: messagebox.showwarning("Erreur", f"Import impossible : {error}"))
+
+    def export_deck(self):
+        """
+        Exporte la catégorie sélectionnée, ou toutes les catégories, dans un deck binaire (.fcpk).
+        """
+        from tkinter import filedialog  # Modules chargés à la première utilisation
+        from DeckPack import DeckPack
+
+        path = filedialog.asksaveasfilename(defaultextension=".fcpk", filetypes=[("Deck binaire", "*.fcpk")])
+        if not path:
+            return
+        category_ids = [self.selected_category_id] if self.selected_category_id else None
+        self.worker.submit(lambda db: DeckPack.export(db, path, category_ids),
+                           lambda exported: messagebox.showinfo("Export terminé", f"{exported} cartes exportées."),
+                           lambda error: messagebox.showwarning("Erreur", f"Export impossible : {error}"))
+
     def reveal_answer(self):
         """
         Affiche la réponse de la carte actuelle.
         """
         card = self.card_manager.get_next_card()
-        if card:
+        if card and card[2] is not None:
             self.answer_label.config(text=f"Réponse : {card[2]}")
 
     def mark_correct(self):
@@ -164,6 +498,8 @@ class FlashcardApp:
             self.question_label.config(text="Aucune carte restante.")
             self.answer_label.config(text="")
             return
+        if self.card_manager.get_next_card() is None:  # Page de la révision mixte en cours de lecture
+            return
 
         self.correct_answers += 1
         self.total_cards_reviewed += 1
@@ -179,6 +515,8 @@ class FlashcardApp:
             self.question_label.config(text="Aucune carte restante.")
             self.answer_label.config(text="")
             return
+        if self.card_manager.get_next_card() is None:  # Page de la révision mixte en cours de lecture
+            return
 
         self.incorrect_answers += 1
         self.total_cards_reviewed += 1
@@ -191,8 +529,30 @@ class FlashcardApp:
         """
         card = self.card_manager.get_next_card()
         if card:
-            self.db_manager.delete_card(card[0])
-            self.card_manager.load_cards(self.selected_category_id)
+            card_id = card[0]
+
+            def delete(db):
+                # En révision mixte, la carte n'est pas forcément de la catégorie sélectionnée
+                category_id = db.get_card_categories([card_id]).get(card_id)
+                return category_id if db.delete_card(card_id) else None
+
+            def on_deleted(category_id):
+                if category_id is not None:
+                    self.category_manager.invalidate_card_count(category_id)
+                    self.update_session(lambda: self.card_manager.remove_card(card_id))
+
+            self.worker.submit(delete, on_deleted, self.show_database_error)
+
+    def update_session(self, change):
+        """
+        Applique une modification à la session en cours sans la recharger, et affiche
+        la nouvelle carte en tête de file si elle a changé.
+        """
+        card = self.card_manager.get_next_card()
+        before = card[0] if card else None
+        change()
+        card = self.card_manager.get_next_card()
+        if (card[0] if card else None) != before:
             self.show_next_card()
 
     def show_next_card(self):
@@ -205,41 +565,152 @@ class FlashcardApp:
             return
 
         card = self.card_manager.get_next_card()
-        if card:
+        if card is None or card[1] is None:  # Texte ou page de la révision mixte en cours de lecture
+            self.question_label.config(text="Chargement de la carte...")
+        else:
             self.question_label.config(text=f"Question : {card[1]}")
-            self.answer_label.config(text="Réponse masquée")
+        self.answer_label.config(text="Réponse masquée")
+        if self.card_manager.is_mixed:
+            self.prefetch_pages()
+        else:
+            self.prefetch_card_texts()
+
+    def prefetch_pages(self):
+        """
+        Lit en arrière-plan la page suivante des catégories de la révision mixte dont la
+        page en cours est presque épuisée, puis affiche la carte actuelle si elle attendait.
+        """
+        cards = self.card_manager.cards
+        needed = cards.pages_needed()
+        if not needed:
+            return
+
+        def load(db):
+            return [(category_id, db.get_cards_page(category_id, after, limit, user_id=self.user_id))
+                    for category_id, after, limit in needed]
+
+        def on_loaded(pages):
+            waiting = cards.peek() is None
+            for category_id, page in pages:
+                cards.add_page(category_id, page)
+            if waiting and cards is self.card_manager.cards:
+                self.show_next_card()
+
+        self.worker.submit(load, on_loaded, self.show_database_error)
+
+    def prefetch_card_texts(self):
+        """
+        Lit en arrière-plan les textes des prochaines cartes absents du cache, puis
+        affiche la carte actuelle si elle attendait son texte.
+        """
+        texts = self.card_manager.cards.texts
+        missing = texts.missing(self.card_manager.cards.upcoming())
+        if not missing:
+            return
+
+        def on_loaded(card_texts):
+            texts.update(card_texts)
+            card = self.card_manager.get_next_card()
+            if card and card[0] in card_texts and card[0] in missing:  # La carte attendait son texte
+                self.show_next_card()
+
+        self.worker.submit(lambda db: db.get_card_texts(missing), on_loaded, self.show_database_error,
+                           key="card_texts")
 
     def show_all_cards(self):
         """
         Ouvre une fenêtre affichant toutes les cartes par catégorie.
+        Seules les cartes visibles sont lues, page par page.
         """
+        from VirtualCardList import VirtualCardList  # Chargé à la première ouverture
+
         popup = tk.Toplevel(self.root)
         popup.title("Toutes les cartes et catégories")
         popup.geometry("400x400")
 
-        # Liste des catégories
+        # Liste des catégories avec leur nombre de cartes
         category_listbox = tk.Listbox(popup, selectmode="single", width=50, height=10)
         category_listbox.pack(pady=5)
-
-        for category in self.category_manager.categories:
-            category_listbox.insert(tk.END, category[1])
+        categories = self.category_manager.categories
+        counts = {}
+
+        def show_counts(card_counts):
+            if not category_listbox.winfo_exists():  # Fenêtre fermée entre-temps
+                return
+            counts.update(card_counts)
+            category_listbox.delete(0, tk.END)
+            for category in categories:
+                category_listbox.insert(tk.END, f"{category[1]} ({counts.get(category[0], 0)})")
+
+        def on_counts_loaded(card_counts):
+            self.category_manager.set_card_counts(card_counts)
+            show_counts(card_counts)
+
+        def on_count_loaded(category_id, count):
+            self.category_manager.set_card_count(category_id, count)
+            show_counts({category_id: count})
+
+        cached_counts = self.category_manager.get_cached_card_counts()
+        if cached_counts is not None:
+            show_counts(cached_counts)
+            # Seules les catégories modifiées depuis le dernier comptage sont relues
+            for category_id, _ in categories:
+                if category_id not in cached_counts:
+                    self.worker.submit(lambda db, cid=category_id: (cid, db.count_cards(cid)),
+                                       lambda result: on_count_loaded(*result), self.show_database_error)
+        else:
+            show_counts({})
+            self.worker.submit(lambda db: db.get_category_card_counts(), on_counts_loaded,
+                               self.show_database_error)
 
         # Fonction pour afficher les cartes d'une catégorie sélectionnée
         def on_category_select(event):
-            selected_category = category_listbox.get(category_listbox.curselection())
-            category = next((cat for cat in self.category_manager.categories if cat[1] == selected_category), None)
-            if category:
-                cards = self.db_manager.get_cards_by_category(category[0])
-                card_listbox.delete(0, tk.END)
-                for card in cards:
-                    card_info = f"{card[1]} - {card[2]}"
-                    card_listbox.insert(tk.END, card_info)
+            selection = category_listbox.curselection()
+            if selection:
+                category = categories[selection[0]]
+                card_list.show_category(category[0], counts.get(category[0], 0))
 
         category_listbox.bind("<<ListboxSelect>>", on_category_select)
 
-        # Liste des cartes
-        card_listbox = tk.Listbox(popup, selectmode="single", width=50, height=10)
-        card_listbox.pack(pady=5)
+        # Liste virtualisée des cartes
+        card_list = VirtualCardList(popup, self.worker, height=10)
+        card_list.pack(pady=5)
+
+    def show_search(self):
+        """
+        Ouvre une fenêtre de recherche plein texte. La recherche est relancée à chaque
+        frappe, après un court délai sans saisie.
+        """
+        popup = tk.Toplevel(self.root)
+        popup.title("Rechercher une carte")
+        popup.geometry("500x400")
+
+        query_var = tk.StringVar(popup)
+        tk.Entry(popup, textvariable=query_var, width=50, bg="#E9ECEF", fg="#495057",
+                 font=("Arial", 12)).pack(pady=5)
+        result_listbox = tk.Listbox(popup, selectmode="single", width=70, height=15)
+        result_listbox.pack(pady=5)
+        pending = {"after_id": None}
+
+        def show_results(results):
+            if not result_listbox.winfo_exists():  # Fenêtre fermée entre-temps
+                return
+            result_listbox.delete(0, tk.END)
+            for card_id, category_id, question, answer, snippet in results:
+                result_listbox.insert(tk.END, f"{question} - {snippet}")
+
+        def search():
+            pending["after_id"] = None
+            query = query_var.get()
+            self.worker.submit(lambda db: db.search_cards(query, limit=50), show_results,
+                               self.show_database_error, key="search")
+
+        def on_change(*args):
+            if pending["after_id"] is not None:
+                popup.after_cancel(pending["after_id"])
+            pending["after_id"] = popup.after(self.SEARCH_DELAY_MS, search)
+
+        query_var.trace_add("write", on_change)
 
     def show_statistics(self):
         """
@@ -247,7 +718,7 @@ class FlashcardApp:
         """
         popup = tk.Toplevel(self.root)
         popup.title("Statistiques")
-        popup.geometry("400x300")
+        popup.geometry("400x380")
         popup.config(bg="#F4F4F9")
 
         # Calcul des statistiques
@@ -267,45 +738,81 @@ class FlashcardApp:
         for stat in stats:
             tk.Label(popup, text=stat, font=("Arial", 12), bg="#F4F4F9", wraplength=350).pack(pady=5)
 
+        # Statistiques précalculées (catégorie, deck et jour), lues par le DatabaseWorker
+        history_label = tk.Label(popup, text="", font=("Arial", 12), bg="#F4F4F9", wraplength=350)
+        history_label.pack(pady=5)
+        category_id = self.selected_category_id
+
+        def read_history(db):
+            category_stats = db.get_category_review_stats(category_id, user_id=self.user_id) if category_id else None
+            deck_stats = db.get_category_stats(category_id) if category_id else None
+            user_stats = db.get_user_stats(self.user_id) if self.user_id is not None else None
+            today = db.get_daily_review_stats(1)
+            today = today[0][1:] if today and today[0][0] == time.strftime("%Y-%m-%d") else (0, 0)
+            return category_stats, deck_stats, user_stats, today
+
+        def show_history(history):
+            if not popup.winfo_exists():
+                return
+            category_stats, deck_stats, user_stats, today = history
+            lines = [f"Aujourd'hui : {today[0]} bonnes / {today[1]} mauvaises réponses"]
+            if user_stats is not None:
+                lines.append(f"Vous, au total : {user_stats[0]} bonnes / {user_stats[1]} mauvaises réponses")
+            if category_stats is not None:
+                lines.append(f"Catégorie : {category_stats[0]} bonnes / {category_stats[1]} mauvaises réponses")
+            if deck_stats is not None:
+                card_count, mastered, histogram = deck_stats
+                self.category_manager.set_category_stats(category_id, deck_stats)
+                lines.append(f"Cartes : {card_count} · maîtrisées : {mastered}")
+                lines.append("Scores : " + " · ".join(f"{bucket} : {count}"
+                                                     for bucket, count in zip(SCORE_BUCKETS, histogram)))
+            history_label.config(text="\n".join(lines))
+
+        self.worker.submit(read_history, show_history, self.show_database_error)
+
         # Bouton pour fermer la fenêtre
         tk.Button(popup, text="Fermer", command=popup.destroy,
                   bg="#DC3545", fg="white", font=("Arial", 12)).pack(pady=10)
     
     def display_global_stats(self):
         """
-        Affiche les statistiques globales au démarrage.
+        Affiche les statistiques globales au démarrage, dans la fenêtre principale.
+        """
+        def show(stats):
+            if stats:
+                self.global_stats_label.config(
+                    text=f"Sessions : {stats[0]} · Bonnes réponses : {stats[1]} · "
+                         f"Mauvaises réponses : {stats[2]} · Cartes révisées : {stats[3]}")
+            self.mark_startup("global_stats")
+
+        self.worker.submit(lambda db: db.get_global_stats(), show, self.show_database_error)
+
+    def flush_grades(self):
+        """
+        Demande au DatabaseWorker d'écrire les réponses en attente.
+        """
+        self.worker.submit(self.grade_buffer.flush, errback=self.show_database_error)
+
+    def flush_grades_periodically(self):
+        """
+        Écrit régulièrement en base les réponses en attente.
         """
-        stats = self.db_manager.get_global_stats()
-        if stats:
-            messagebox.showinfo(
-                "Statistiques Globales",
-                f"Sessions totales : {stats[0]}\n"
-                f"Bonnes réponses : {stats[1]}\n"
-                f"Mauvaises réponses : {stats[2]}\n"
-                f"Cartes révisées : {stats[3]}"
-            )
-            self.root.after(100, self.reset_focus)
+        if len(self.grade_buffer):
+            self.flush_grades()
+        self.root.after(self.GRADE_FLUSH_INTERVAL_MS, self.flush_grades_periodically)
 
     def save_session_stats(self):
         """
-        Ajoute les statistiques de la session actuelle aux statistiques globales.
+        Comptabilise la session actuelle dans les statistiques globales. Les réponses
+        sont déjà enregistrées une par une dans le journal des révisions.
         """
-        self.db_manager.update_global_stats(
-            self.correct_answers,
-            self.incorrect_answers,
-            self.total_cards_reviewed
-        )
+        self.worker.submit(lambda db: db.record_session())
 
     def on_closing(self):
         """
         Gère la fermeture de l'application.
         """
+        self.worker.submit(self.grade_buffer.flush)  # Écrit les réponses en attente
         self.save_session_stats()  # Enregistre les statistiques de la session
+        self.worker.stop()  # Termine les écritures et ferme la connexion
         self.root.destroy()  # Ferme la fenêtre
-
-    def reset_focus(self):
-        """
-        Forcer le focus sur la fenêtre principale et le champ texte après un délai.
-        """
-        self.root.focus_force()  # Garantir que la fenêtre principale est au premier plan
-        self.category_entry.focus_set()  # Donner le focus au champ de texte pour qu'il soit cliquable
\ No newline at end of file
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+
+
+# Tampon d'écriture différée des réponses
+class GradeBuffer:
+    """
+    Collecte les réponses (carte, correcte ou non) en mémoire et les écrit en base
+    dans une seule transaction. Chaque réponse est d'abord ajoutée à un journal
+    sur disque : si le processus s'arrête avant l'écriture en base, les réponses
+    sont rejouées au prochain démarrage.
+
+    Chaque réponse porte un numéro de séquence. La transaction qui écrit un lot
+    enregistre aussi le dernier numéro appliqué, ce qui évite de rejouer deux fois
+    une réponse si l'arrêt survient entre le commit et le vidage du journal.
+
+    Les réponses peuvent être enregistrées depuis un thread pendant qu'un autre
+    écrit le lot précédent : le journal en cours est mis de côté (fichier
+    .flushing) le temps de l'écriture.
+
+    Les réponses d'un utilisateur (user_id) mettent à jour sa propre progression ;
+    chaque utilisateur doit alors avoir son propre journal.
+    """
+    def __init__(self, db_manager=None, journal_path='grades.journal', max_pending=50, fsync=False,
+                 on_full=None, user_id=None):
+        """
+        :param db_manager: Instance de DatabaseManager qui reçoit les lots. Si None, elle doit
+                           être passée à recover et flush (par exemple depuis un DatabaseWorker).
+        :param journal_path: Fichier journal en ajout seul.
+        :param max_pending: Nombre de réponses en attente déclenchant une écriture.
+        :param fsync: Si True, force l'écriture physique du journal à chaque réponse
+                      (protège aussi contre une coupure de courant, mais plus lent).
+        :param on_full: Fonction appelée à la place de flush quand le seuil est atteint.
+        :param user_id: Utilisateur auteur des réponses (voir DatabaseManager.add_user).
+        """
+        self.db_manager = db_manager
+        self.journal_path = journal_path
+        self.flushing_path = journal_path + '.flushing'
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.on_full = on_full
+        self.user_id = user_id
+        self.pending = []  # Réponses en attente : (séquence, card_id, is_correct, instant)
+        self._sequence = 0
+        self._journal = None
+        self._lock = threading.Lock()  # Protège pending et le journal
+        self._flush_lock = threading.Lock()  # Une seule écriture en base à la fois
+        if db_manager is not None:
+            self.recover()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _journal_key(self):
+        return os.path.abspath(self.journal_path)
+
+    def recover(self, db_manager=None):
+        """
+        Rejoue les réponses du journal qui n'ont pas encore été écrites en base.
+        """
+        db_manager = db_manager if db_manager is not None else self.db_manager
+        last_applied = db_manager.get_last_grade_sequence(self._journal_key())
+        with self._lock:
+            events = list(self._read_journal(self.flushing_path)) + list(self._read_journal(self.journal_path))
+            self._sequence = max([self._sequence, last_applied] + [event[0] for event in events])
+            # Les réponses encore en mémoire figurent aussi dans les journaux
+            self.pending = [event for event in events if event[0] > last_applied]
+        self.flush(db_manager)
+
+    @staticmethod
+    def _read_journal(path):
+        """
+        Lit un journal ; une dernière ligne incomplète (arrêt pendant l'écriture) est ignorée.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    sequence, card_id, is_correct, reviewed_at = line.split()
+                    yield int(sequence), int(card_id), is_correct == '1', float(reviewed_at)
+                except ValueError:
+                    continue
+
+    def record(self, card_id, is_correct, now=None):
+        """
+        Enregistre une réponse dans le journal puis dans le tampon.
+        L'écriture en base a lieu lorsque le tampon atteint max_pending.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._sequence += 1
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            self._journal.write(f"{self._sequence} {card_id} {1 if is_correct else 0} {now!r}\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self.pending.append((self._sequence, card_id, is_correct, now))
+            full = len(self.pending) >= self.max_pending
+        if full:
+            if self.on_full is not None:
+                self.on_full()
+            else:
+                self.flush()
+
+    def flush(self, db_manager=None):
+        """
+        Écrit toutes les réponses en attente dans une transaction puis vide le journal.
+        En cas d'erreur, les réponses restent en attente.
+        """
+        db_manager = db_manager if db_manager is not None else self.db_manager
+        with self._flush_lock:
+            with self._lock:
+                batch = self.pending
+                self.pending = []
+                self._set_journal_aside()
+            try:
+                if batch:
+                    db_manager.apply_grades([event[1:] for event in batch], self._journal_key(), batch[-1][0],
+                                            user_id=self.user_id)
+            except Exception:
+                with self._lock:
+                    self.pending = batch + self.pending
+                raise
+            if os.path.exists(self.flushing_path):
+                os.remove(self.flushing_path)
+
+    def _set_journal_aside(self):
+        """
+        Ferme le journal en cours et le déplace vers le fichier .flushing
+        (en l'ajoutant à la suite si une écriture précédente a échoué).
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if not os.path.exists(self.journal_path):
+            return
+        if os.path.exists(self.flushing_path):
+            with open(self.journal_path, encoding='utf-8') as journal, \
+                    open(self.flushing_path, 'a', encoding='utf-8') as flushing:
+                flushing.write(journal.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.flushing_path)
+
+    def close(self, db_manager=None):
+        """
+        Écrit les réponses restantes et ferme le journal.
+        """
+        self.flush(db_manager)
@@ -0,0 +1,316 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger('flashcards.sql')
+
+
+# Histogramme de durées
+class Histogram:
+    """
+    Histogramme à seuils fixes (en secondes), au format des histogrammes Prometheus.
+    """
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Dernière case : au-delà du dernier seuil
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        Retourne les couples (seuil, nombre cumulé de valeurs inférieures ou égales), seuil infini compris.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': {('+Inf' if bound == float('inf') else repr(bound)): total
+                        for bound, total in self.cumulative()},
+        }
+
+
+# Mesures des accès à la base
+class Instrumentation:
+    """
+    Collecte les mesures d'un ou plusieurs DatabaseManager : durée de chaque méthode
+    publique, durée et nombre de lignes de chaque requête SQL, ouvertures et
+    fermetures de connexions. Les requêtes plus lentes que slow_query_threshold
+    sont journalisées (logger 'flashcards.sql') avec leur plan d'exécution.
+
+    Une même instance peut être partagée entre plusieurs threads.
+    Sans instrumentation (DatabaseManager(instrumentation=None)), rien n'est mesuré.
+    """
+    def __init__(self, slow_query_threshold=None, explain=True, max_slow_queries=100):
+        """
+        :param slow_query_threshold: Durée (en secondes) à partir de laquelle une requête est
+                                     journalisée ; None pour désactiver le journal.
+        :param explain: Si True, le journal contient le résultat de EXPLAIN QUERY PLAN.
+        :param max_slow_queries: Nombre de requêtes lentes conservées pour snapshot.
+        """
+        self.slow_query_threshold = slow_query_threshold
+        self.explain = explain
+        self.method_latency = {}  # Nom de méthode -> Histogram
+        self.sql_latency = {}  # Requête normalisée -> Histogram
+        self.sql_rows = {}  # Requête normalisée -> nombre total de lignes
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.slow_queries = deque(maxlen=max_slow_queries)  # (requête, durée, plan)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(sql):
+        return " ".join(sql.split())
+
+    def connect(self, database, **options):
+        """
+        Ouvre une connexion SQLite dont les curseurs mesurent les requêtes.
+        """
+        connection = sqlite3.connect(database, factory=InstrumentedConnection, **options)
+        connection.instrumentation = self
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections_closed += 1
+
+    def wrap_method(self, name, method):
+        """
+        Retourne method mesurée sous le nom name.
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record_method(name, time.perf_counter() - start)
+        timed.__name__ = name
+        timed.__doc__ = method.__doc__
+        return timed
+
+    def record_method(self, name, duration):
+        with self._lock:
+            histogram = self.method_latency.get(name)
+            if histogram is None:
+                histogram = self.method_latency[name] = Histogram()
+            histogram.observe(duration)
+
+    def record_query(self, connection, sql, parameters, duration, rows):
+        """
+        Enregistre une requête exécutée ; parameters vaut None pour executemany.
+        """
+        statement = self.normalize(sql)
+        with self._lock:
+            histogram = self.sql_latency.get(statement)
+            if histogram is None:
+                histogram = self.sql_latency[statement] = Histogram()
+            histogram.observe(duration)
+            self.sql_rows[statement] = self.sql_rows.get(statement, 0) + rows
+        if self.slow_query_threshold is not None and duration >= self.slow_query_threshold:
+            plan = self._query_plan(connection, sql, parameters) if self.explain else None
+            with self._lock:
+                self.slow_queries.append((statement, duration, plan))
+            logger.warning("Requête lente (%.1f ms, %d lignes) : %s%s", duration * 1000, rows, statement,
+                           "".join(f"\n    {line}" for line in plan or ()))
+
+    @staticmethod
+    def _query_plan(connection, sql, parameters):
+        if parameters is None or not sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            return None
+        try:
+            cursor = sqlite3.Connection.cursor(connection)
+            return [row[-1] for row in sqlite3.Cursor.execute(cursor, 'EXPLAIN QUERY PLAN ' + sql, parameters)]
+        except sqlite3.Error:
+            return None
+
+    def reset(self):
+        with self._lock:
+            self.method_latency = {}
+            self.sql_latency = {}
+            self.sql_rows = {}
+            self.connections_opened = 0
+            self.connections_closed = 0
+            self.slow_queries.clear()
+
+    def snapshot(self):
+        """
+        Retourne toutes les mesures sous forme d'un dictionnaire sérialisable en JSON.
+        """
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'connections': {'opened': self.connections_opened, 'closed': self.connections_closed},
+                'methods': {name: histogram.to_dict() for name, histogram in self.method_latency.items()},
+                'queries': {sql: dict(histogram.to_dict(), rows=self.sql_rows.get(sql, 0))
+                            for sql, histogram in self.sql_latency.items()},
+                'slow_queries': [{'sql': sql, 'duration': duration, 'plan': plan}
+                                 for sql, duration, plan in self.slow_queries],
+            }
+
+    def to_prometheus(self):
+        """
+        Retourne les mesures au format texte de Prometheus.
+        """
+        lines = []
+
+        def histogram_lines(metric, label, histograms):
+            lines.append(f"# TYPE {metric} histogram")
+            for key, histogram in sorted(histograms.items()):
+                value = _label_value(key)
+                for bound, total in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {total}')
+                lines.append(f'{metric}_sum{{{label}="{value}"}} {histogram.sum!r}')
+                lines.append(f'{metric}_count{{{label}="{value}"}} {histogram.count}')
+
+        with self._lock:
+            lines.append("# HELP flashcards_method_seconds Durée des méthodes de DatabaseManager.")
+            histogram_lines('flashcards_method_seconds', 'method', self.method_latency)
+            lines.append("# HELP flashcards_sql_seconds Durée des requêtes SQL (exécution et lecture des lignes).")
+            histogram_lines('flashcards_sql_seconds', 'sql', self.sql_latency)
+            lines.append("# HELP flashcards_sql_rows_total Lignes lues ou modifiées par requête SQL.")
+            lines.append("# TYPE flashcards_sql_rows_total counter")
+            for sql, rows in sorted(self.sql_rows.items()):
+                lines.append(f'flashcards_sql_rows_total{{sql="{_label_value(sql)}"}} {rows}')
+            lines.append("# TYPE flashcards_connections_opened_total counter")
+            lines.append(f"flashcards_connections_opened_total {self.connections_opened}")
+            lines.append("# TYPE flashcards_connections_closed_total counter")
+            lines.append(f"flashcards_connections_closed_total {self.connections_closed}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Écrit les mesures dans un fichier : JSON si path se termine par .json, sinon texte Prometheus.
+        Le fichier est remplacé d'un coup (compatible avec le textfile collector de node_exporter).
+        """
+        if path.endswith('.json'):
+            content = json.dumps(self.snapshot(), indent=2)
+        else:
+            content = self.to_prometheus()
+        with open(path + '.tmp', 'w', encoding='utf-8') as output:
+            output.write(content)
+        os.replace(path + '.tmp', path)
+
+
+def _label_value(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Curseur qui mesure chaque requête, de l'exécution à la lecture des lignes.
+    Une requête SELECT est enregistrée à la lecture de ses lignes (fetchone, fetchmany,
+    fetchall ou parcours du curseur), à la requête suivante ou à la fermeture du curseur.
+    """
+    _pending = None  # [sql, paramètres, durée cumulée, lignes]
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._started(sql, parameters, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._started(sql, None, time.perf_counter() - start)
+        return self
+
+    def _started(self, sql, parameters, duration):
+        self._pending = [sql, parameters, duration, 0]
+        if self.description is None:  # Pas de lignes à lire : requête terminée
+            self._pending[3] = max(self.rowcount, 0)  # -1 pour les requêtes DDL
+            self._finish()
+
+    def _fetched(self, start, rows, done):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - start
+            self._pending[3] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, True)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, parameters, duration, rows = pending
+            self.connection.instrumentation.record_query(self.connection, sql, parameters, duration, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connexion dont les curseurs sont des InstrumentedCursor.
+    """
+    instrumentation = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        super().close()
+        self.instrumentation.connection_closed()
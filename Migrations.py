@@ -0,0 +1,339 @@
+# Migrations du schéma de la base de données
+#
+# Chaque migration est une liste d'étapes appliquées dans une transaction.
+# Une étape est soit une requête SQL, soit une fonction recevant le curseur.
+# La migration numéro N (index N - 1) amène le schéma à PRAGMA user_version = N.
+# Les migrations doivent rester idempotentes : une base créée avant le
+# versionnage (user_version = 0) possède déjà une partie des tables.
+from SpacedRepetition import SM2
+
+MASTERED_INTERVAL = 21  # Intervalle (en jours) à partir duquel une carte est maîtrisée
+
+
+def card_stats(prefix):
+    """
+    Expressions des colonnes de category_stats pour une carte (prefix 'new.', 'old.' ou ''
+    dans un SELECT sur flashcards) : carte maîtrisée, puis tranche de score de la carte.
+    """
+    score = f"COALESCE({prefix}review_score, 0)"
+    return (f"{prefix}interval >= {MASTERED_INTERVAL}",
+            f"{score} = 0", f"{score} = 1", f"{score} = 2", f"{score} BETWEEN 3 AND 4", f"{score} >= 5")
+
+
+def category_stats_change(prefix, sign):
+    """
+    Requête de trigger ajoutant (sign '+') ou retirant (sign '-') une carte des statistiques de sa catégorie.
+    """
+    values = ", ".join(f"{sign}({expression})" for expression in card_stats(prefix))
+    return f'''
+            INSERT INTO category_stats (category_id, card_count, mastered_count,
+                                        score_0, score_1, score_2, score_3_4, score_5_plus)
+            VALUES ({prefix}category_id, {sign}1, {values})
+            ON CONFLICT (category_id) DO UPDATE SET
+                card_count = card_count + excluded.card_count,
+                mastered_count = mastered_count + excluded.mastered_count,
+                score_0 = score_0 + excluded.score_0,
+                score_1 = score_1 + excluded.score_1,
+                score_2 = score_2 + excluded.score_2,
+                score_3_4 = score_3_4 + excluded.score_3_4,
+                score_5_plus = score_5_plus + excluded.score_5_plus;'''
+
+
+def category_stats_delta():
+    """
+    Affectations de category_stats remplaçant la carte old par la carte new, de même catégorie.
+    """
+    columns = ('mastered_count', 'score_0', 'score_1', 'score_2', 'score_3_4', 'score_5_plus')
+    return ",\n                ".join(f"{column} = {column} + ({new}) - ({old})" for column, new, old
+                                      in zip(columns, card_stats('new.'), card_stats('old.')))
+
+
+def category_stats_select(condition='1'):
+    """
+    Requête ajoutant aux statistiques de leurs catégories les cartes vérifiant condition.
+    """
+    sums = ", ".join(f"SUM({expression})" for expression in card_stats(''))
+    return f'''
+        INSERT INTO category_stats (category_id, card_count, mastered_count,
+                                    score_0, score_1, score_2, score_3_4, score_5_plus)
+        SELECT category_id, COUNT(*), {sums} FROM flashcards WHERE {condition} GROUP BY category_id
+        ON CONFLICT (category_id) DO UPDATE SET
+            card_count = card_count + excluded.card_count,
+            mastered_count = mastered_count + excluded.mastered_count,
+            score_0 = score_0 + excluded.score_0,
+            score_1 = score_1 + excluded.score_1,
+            score_2 = score_2 + excluded.score_2,
+            score_3_4 = score_3_4 + excluded.score_3_4,
+            score_5_plus = score_5_plus + excluded.score_5_plus
+        '''
+
+
+def add_column(table, column, declaration):
+    """
+    Étape qui ajoute une colonne si elle n'existe pas encore.
+    """
+    def step(cursor):
+        columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+    return step
+
+
+def migrate_review_scores(cursor):
+    """
+    Convertit les anciens review_score en intervalles SM-2.
+    Le score correspond au nombre de bonnes réponses consécutives ; sans date de
+    dernière révision connue, toutes les cartes sont dues immédiatement.
+    """
+    algorithm = SM2()
+    scores = [row[0] for row in cursor.execute('SELECT DISTINCT review_score FROM flashcards')]
+    for score in scores:
+        cursor.execute('UPDATE flashcards SET interval = ?, next_due = 0 WHERE review_score IS ?',
+                       (algorithm.interval_for(score or 0), score))
+    cursor.execute('UPDATE flashcards SET review_score = 0 WHERE review_score IS NULL')
+
+
+MIGRATIONS = [
+    # 1 : schéma initial
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS flashcards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            review_score INTEGER DEFAULT 0,
+            FOREIGN KEY (category_id) REFERENCES categories(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS global_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            total_sessions INTEGER DEFAULT 0,
+            total_correct INTEGER DEFAULT 0,
+            total_incorrect INTEGER DEFAULT 0,
+            total_reviewed INTEGER DEFAULT 0
+        )
+        ''',
+        # Initialisation des statistiques globales si elles n'existent pas
+        '''
+        INSERT OR IGNORE INTO global_stats (id, total_sessions, total_correct, total_incorrect, total_reviewed)
+        VALUES (1, 0, 0, 0, 0)
+        ''',
+    ],
+    # 2 : index pour get_cards_by_category (filtre par catégorie, tri par score)
+    [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_flashcards_category_score
+        ON flashcards (category_id, review_score)
+        ''',
+    ],
+    # 3 : répétition espacée (facilité, intervalle en jours, échéance en secondes)
+    [
+        add_column('flashcards', 'ease', 'REAL NOT NULL DEFAULT 2.5'),
+        add_column('flashcards', 'interval', 'REAL NOT NULL DEFAULT 0'),
+        add_column('flashcards', 'next_due', 'REAL NOT NULL DEFAULT 0'),
+        migrate_review_scores,
+        '''
+        CREATE INDEX IF NOT EXISTS idx_flashcards_category_due
+        ON flashcards (category_id, next_due)
+        ''',
+    ],
+    # 4 : suivi des journaux d'écriture différée (dernière réponse appliquée)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS grade_journals (
+            journal TEXT PRIMARY KEY,
+            last_sequence INTEGER NOT NULL
+        )
+        ''',
+    ],
+    # 5 : recherche plein texte (FTS5) sur les questions et réponses
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS flashcards_fts USING fts5(
+            question, answer,
+            content = 'flashcards', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        ''',
+        # Index synchronisé par triggers ; les mises à jour de score ne le touchent pas
+        '''
+        CREATE TRIGGER IF NOT EXISTS flashcards_fts_insert AFTER INSERT ON flashcards BEGIN
+            INSERT INTO flashcards_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS flashcards_fts_delete AFTER DELETE ON flashcards BEGIN
+            INSERT INTO flashcards_fts (flashcards_fts, rowid, question, answer)
+            VALUES ('delete', old.id, old.question, old.answer);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS flashcards_fts_update AFTER UPDATE OF question, answer ON flashcards BEGIN
+            INSERT INTO flashcards_fts (flashcards_fts, rowid, question, answer)
+            VALUES ('delete', old.id, old.question, old.answer);
+            INSERT INTO flashcards_fts (rowid, question, answer) VALUES (new.id, new.question, new.answer);
+        END
+        ''',
+        # Indexation des cartes déjà présentes
+        "INSERT INTO flashcards_fts (flashcards_fts) VALUES ('rebuild')",
+    ],
+    # 6 : journal des révisions (une ligne par réponse) et agrégats maintenus par trigger
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS review_log (
+            id INTEGER PRIMARY KEY,
+            card_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            is_correct INTEGER NOT NULL,
+            reviewed_at REAL NOT NULL
+        )
+        ''',
+        # Portées : 'global' (clé vide), 'category' (id de catégorie), 'day' (date locale AAAA-MM-JJ)
+        '''
+        CREATE TABLE IF NOT EXISTS review_stats (
+            scope TEXT NOT NULL,
+            scope_key TEXT NOT NULL,
+            correct INTEGER NOT NULL DEFAULT 0,
+            incorrect INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, scope_key)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS review_log_stats AFTER INSERT ON review_log BEGIN
+            INSERT INTO review_stats (scope, scope_key, correct, incorrect)
+            VALUES ('global', '', new.is_correct, 1 - new.is_correct),
+                   ('category', CAST(new.category_id AS TEXT), new.is_correct, 1 - new.is_correct),
+                   ('day', date(new.reviewed_at, 'unixepoch', 'localtime'), new.is_correct, 1 - new.is_correct)
+            ON CONFLICT (scope, scope_key) DO UPDATE SET
+                correct = correct + excluded.correct,
+                incorrect = incorrect + excluded.incorrect;
+        END
+        ''',
+    ],
+    # 7 : table de routage du mode réparti (catégorie -> fichier), vide en mode fichier unique
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS category_shards (
+            category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            shard INTEGER NOT NULL
+        )
+        ''',
+    ],
+    # 8 : empreinte du contenu des cartes, unique par catégorie (doublons refusés). Les cartes
+    #     existantes restent sans empreinte jusqu'au passage de DatabaseManager.deduplicate_cards
+    [
+        add_column('flashcards', 'content_hash', 'BLOB'),
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_flashcards_category_hash
+        ON flashcards (category_id, content_hash)
+        ''',
+        # Cartes restant à traiter par deduplicate_cards (index vide une fois le traitement fait)
+        '''
+        CREATE INDEX IF NOT EXISTS idx_flashcards_unhashed
+        ON flashcards (id) WHERE content_hash IS NULL
+        ''',
+    ],
+    # 9 : progression par utilisateur (une ligne par carte révisée par l'utilisateur) et
+    #     statistiques par utilisateur ; sans utilisateur, la progression reste celle de flashcards
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_progress (
+            user_id INTEGER NOT NULL,
+            card_id INTEGER NOT NULL,
+            review_score INTEGER NOT NULL DEFAULT 0,
+            ease REAL NOT NULL DEFAULT 2.5,
+            interval REAL NOT NULL DEFAULT 0,
+            next_due REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, card_id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_progress_card
+        ON user_progress (card_id)
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS flashcards_progress_delete AFTER DELETE ON flashcards BEGIN
+            DELETE FROM user_progress WHERE card_id = old.id;
+        END
+        ''',
+        add_column('review_log', 'user_id', 'INTEGER'),
+        # Portées supplémentaires : 'user' (id de l'utilisateur), 'user_category' (utilisateur:catégorie)
+        '''
+        CREATE TRIGGER IF NOT EXISTS review_log_user_stats AFTER INSERT ON review_log
+        WHEN new.user_id IS NOT NULL BEGIN
+            INSERT INTO review_stats (scope, scope_key, correct, incorrect)
+            VALUES ('user', CAST(new.user_id AS TEXT), new.is_correct, 1 - new.is_correct),
+                   ('user_category', new.user_id || ':' || new.category_id, new.is_correct, 1 - new.is_correct)
+            ON CONFLICT (scope, scope_key) DO UPDATE SET
+                correct = correct + excluded.correct,
+                incorrect = incorrect + excluded.incorrect;
+        END
+        ''',
+    ],
+    # 10 : statistiques par catégorie (nombre de cartes, cartes maîtrisées, histogramme des
+    #      scores), tenues à jour par triggers : une ligne à lire quelle que soit la taille du deck
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category_id INTEGER PRIMARY KEY,
+            card_count INTEGER NOT NULL DEFAULT 0,
+            mastered_count INTEGER NOT NULL DEFAULT 0,
+            score_0 INTEGER NOT NULL DEFAULT 0,
+            score_1 INTEGER NOT NULL DEFAULT 0,
+            score_2 INTEGER NOT NULL DEFAULT 0,
+            score_3_4 INTEGER NOT NULL DEFAULT 0,
+            score_5_plus INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        'DELETE FROM category_stats',
+        category_stats_select(),
+        f'''
+        CREATE TRIGGER IF NOT EXISTS category_stats_insert AFTER INSERT ON flashcards BEGIN
+            {category_stats_change('new.', '+')}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS category_stats_delete AFTER DELETE ON flashcards BEGIN
+            {category_stats_change('old.', '-')}
+        END
+        ''',
+        # Réponse à une carte : une seule mise à jour, par différence entre l'ancienne et la nouvelle carte
+        f'''
+        CREATE TRIGGER IF NOT EXISTS category_stats_update AFTER UPDATE OF review_score, interval ON flashcards
+        WHEN old.category_id = new.category_id BEGIN
+            UPDATE category_stats SET
+                {category_stats_delta()}
+            WHERE category_id = new.category_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS category_stats_move AFTER UPDATE OF category_id ON flashcards
+        WHEN old.category_id IS NOT new.category_id BEGIN
+            {category_stats_change('old.', '-')}
+            {category_stats_change('new.', '+')}
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS category_stats_category_delete AFTER DELETE ON categories BEGIN
+            DELETE FROM category_stats WHERE category_id = old.id;
+        END
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
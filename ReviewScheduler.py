@@ -0,0 +1,747 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import count
+
+from CardTextCache import LazyCard
+
+
+# Politiques d'ordonnancement
+class ReviewPolicy:
+    """
+    Politique qui détermine la priorité d'une carte dans la file de révision.
+    Plus la priorité est petite, plus la carte est présentée tôt.
+    """
+    def priority(self, card):
+        """
+        Retourne la priorité d'une carte (id, question, answer, review_score).
+        """
+        raise NotImplementedError
+
+
+class LowestScoreFirst(ReviewPolicy):
+    """
+    Présente d'abord les cartes au score de révision le plus bas.
+    """
+    def priority(self, card):
+        return card[3]
+
+
+class InsertionOrder(ReviewPolicy):
+    """
+    Présente les cartes dans leur ordre d'arrivée (file FIFO).
+    """
+    def priority(self, card):
+        return 0
+
+
+# File de révision
+class ReviewScheduler:
+    """
+    File de priorité (tas binaire) des cartes d'une session de révision.
+    Les égalités de priorité sont départagées par ordre d'insertion, ce qui rend
+    l'ordre stable. Consulter la tête est en O(1), noter une carte en O(log n).
+
+    Une carte peut être retirée ou changer de score n'importe où dans la file
+    (remove, update) : son entrée est marquée périmée et ignorée en tête de file
+    (suppression paresseuse, voir la documentation de heapq). Le tas est reconstruit
+    lorsque les entrées périmées y deviennent majoritaires.
+    """
+    def __init__(self, policy=None):
+        """
+        :param policy: Instance de ReviewPolicy, LowestScoreFirst par défaut.
+        """
+        self.policy = policy or LowestScoreFirst()
+        self._heap = []  # Entrées (priorité, numéro d'ordre, carte)
+        self._entries = {}  # card_id -> entrée valide de la carte dans le tas
+        self._sequence = count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __contains__(self, card_id):
+        return card_id in self._entries
+
+    def __iter__(self):
+        """
+        Parcourt les cartes dans l'ordre de présentation (sans modifier la file).
+        """
+        return (entry[2] for entry in sorted(self._entries.values()))
+
+    def _entry(self, card):
+        entry = (self.policy.priority(card), next(self._sequence), card)
+        self._entries[card[0]] = entry
+        return entry
+
+    def _purge(self):
+        """
+        Retire les entrées périmées de la tête du tas.
+        """
+        heap, entries = self._heap, self._entries
+        while heap and entries.get(heap[0][2][0]) is not heap[0]:
+            heapq.heappop(heap)
+
+    def load(self, cards):
+        """
+        Remplace le contenu de la file. Une liste déjà triée (ordre SQL) est déjà
+        un tas valide, heapify se contente alors de la vérifier en O(n).
+        """
+        self._entries = {}
+        self._heap = [self._entry(card) for card in cards]
+        heapq.heapify(self._heap)
+
+    def peek(self):
+        """
+        Retourne la carte en tête de file, ou None si la file est vide.
+        """
+        self._purge()
+        return self._heap[0][2] if self._heap else None
+
+    def push(self, card):
+        """
+        Ajoute une carte à la file (ou remplace la version déjà présente de la carte).
+        """
+        heapq.heappush(self._heap, self._entry(card))
+        self._compact()
+
+    def pop(self):
+        """
+        Retire et retourne la carte en tête de file.
+        """
+        self._purge()
+        card = heapq.heappop(self._heap)[2]
+        del self._entries[card[0]]
+        return card
+
+    def reschedule(self, card):
+        """
+        Remplace la carte en tête de file par sa nouvelle version (score mis à jour)
+        et la replace à sa priorité, derrière les cartes de même priorité.
+        """
+        self._purge()
+        if not self._heap:
+            raise IndexError("reschedule sur une file vide")
+        head = self._heap[0]
+        if self._entries.get(head[2][0]) is head:
+            del self._entries[head[2][0]]
+        heapq.heapreplace(self._heap, self._entry(card))
+
+    def remove(self, card_id):
+        """
+        Retire une carte de la file, où qu'elle soit, en O(1).
+        :return: True si la carte était dans la file.
+        """
+        if self._entries.pop(card_id, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def _compact(self):
+        """
+        Reconstruit le tas avec les seules entrées valides lorsque les entrées périmées
+        (cartes retirées ou dont le score a changé) y sont majoritaires.
+        """
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+    def update(self, card_id, review_score):
+        """
+        Change le score d'une carte de la file, où qu'elle soit, et la replace à sa
+        nouvelle priorité, derrière les cartes de même priorité, en O(log n).
+        :return: True si la carte était dans la file.
+        """
+        entry = self._entries.get(card_id)
+        if entry is None:
+            return False
+        card = entry[2]
+        self.push((card[0], card[1], card[2], review_score))
+        return True
+
+
+# File de révision compacte
+class CompactReviewScheduler:
+    """
+    Variante de ReviewScheduler pour les grandes sessions : le tas est stocké dans des
+    tableaux parallèles (priorité, numéro d'ordre, identifiant, score) et les textes
+    des cartes ne sont pas gardés en mémoire. Les cartes retournées sont des LazyCard,
+    qui lisent question et réponse dans le CardTextCache donné ; les textes des
+    prochaines cartes sont demandés par lot (voir upcoming).
+
+    Mémoire retenue par une session de 100 000 cartes (questions et réponses de 40 à
+    120 caractères, mesurée avec python -m benchmarks.bench_session_memory) :
+    ReviewScheduler avec les tuples complets ~55 Mo (~547 octets par carte),
+    CompactReviewScheduler ~5 Mo (~49 octets par carte, index card_id -> case compris :
+    identifiants triés et cases dans des tableaux, recherche par bisect). En contrepartie,
+    noter une carte coûte ~20 µs au lieu de ~4 µs (~45 000 réponses/s contre ~280 000,
+    hors lecture des textes) : le tas est réordonné en Python et non par heapq.
+
+    Les priorités doivent être des nombres (ce que retournent les politiques fournies).
+    """
+    def __init__(self, policy=None, texts=None, prefetch=8):
+        """
+        :param policy: Instance de ReviewPolicy, LowestScoreFirst par défaut.
+        :param texts: CardTextCache où lire les textes des cartes.
+        :param prefetch: Nombre de cartes dont les textes sont lus avec celui de la tête de file.
+        """
+        self.policy = policy or LowestScoreFirst()
+        self.texts = texts
+        self.prefetch = prefetch
+        self._sequence = count()
+        self._clear()
+
+    def _clear(self):
+        self._priorities = array('d')
+        self._sequences = array('q')
+        self._ranks = array('q')  # Rang de la carte de chaque case (voir _keys)
+        self._scores = array('q')
+        # Index card_id -> case sans dictionnaire : chaque carte a un rang fixe, son identifiant
+        # est _keys[rang] et sa case _positions[rang] (-1 hors de la file). Les cartes chargées
+        # ont les premiers rangs, dans l'ordre des identifiants (recherche par bisect) ; les
+        # cartes ajoutées ensuite par push sont rangées à la suite, dans _pushed.
+        self._keys = array('q')
+        self._positions = array('q')
+        self._sorted = 0  # Nombre de rangs triés
+        self._pushed = {}  # card_id -> rang des cartes ajoutées après le chargement
+
+    def __len__(self):
+        return len(self._ranks)
+
+    def __bool__(self):
+        return bool(self._ranks)
+
+    def __contains__(self, card_id):
+        return self._find(card_id) is not None
+
+    def __iter__(self):
+        """
+        Parcourt les cartes dans l'ordre de présentation (sans modifier la file).
+        """
+        order = sorted(range(len(self._ranks)), key=lambda slot: (self._priorities[slot], self._sequences[slot]))
+        return (self._card(slot) for slot in order)
+
+    def _card(self, slot):
+        return LazyCard(self._keys[self._ranks[slot]], self._scores[slot], self.texts)
+
+    def _priority(self, card_id, review_score, card=None):
+        if type(self.policy) is LowestScoreFirst:
+            return review_score  # Cas courant, sans créer de LazyCard
+        return self.policy.priority(card if card is not None else LazyCard(card_id, review_score, self.texts))
+
+    # Index card_id -> case
+
+    def _rank(self, card_id):
+        """
+        Retourne le rang d'une carte déjà vue par la file, ou None.
+        """
+        rank = bisect_left(self._keys, card_id, 0, self._sorted)
+        if rank < self._sorted and self._keys[rank] == card_id:
+            return rank
+        return self._pushed.get(card_id)
+
+    def _new_rank(self, card_id):
+        """
+        Retourne le rang d'une carte, en lui en attribuant un si elle est nouvelle.
+        """
+        rank = self._rank(card_id)
+        if rank is None:
+            rank = len(self._keys)
+            self._keys.append(card_id)
+            self._positions.append(-1)
+            self._pushed[card_id] = rank
+        return rank
+
+    def _find(self, card_id):
+        """
+        Retourne la case d'une carte dans le tas, ou None.
+        """
+        rank = self._rank(card_id)
+        if rank is None or self._positions[rank] < 0:
+            return None
+        return self._positions[rank]
+
+    # Tas binaire sur les tableaux parallèles (mêmes algorithmes que heapq)
+
+    def _get(self, slot):
+        return self._priorities[slot], self._sequences[slot], self._ranks[slot], self._scores[slot]
+
+    def _set(self, slot, entry):
+        self._priorities[slot], self._sequences[slot], self._ranks[slot], self._scores[slot] = entry
+        self._positions[entry[2]] = slot
+
+    def _append(self, entry):
+        self._priorities.append(entry[0])
+        self._sequences.append(entry[1])
+        self._ranks.append(entry[2])
+        self._scores.append(entry[3])
+        self._positions[entry[2]] = len(self._ranks) - 1
+
+    def _pop_last(self):
+        """
+        Retire la dernière case du tas et retourne son entrée.
+        """
+        entry = self._get(len(self._ranks) - 1)
+        for column in (self._priorities, self._sequences, self._ranks, self._scores):
+            column.pop()
+        return entry
+
+    def _sift_up(self, slot):
+        """
+        Remonte l'entrée de slot vers la racine tant qu'elle précède son parent.
+        """
+        priorities, sequences, ranks, scores = self._priorities, self._sequences, self._ranks, self._scores
+        positions = self._positions
+        entry = self._get(slot)
+        key = entry[:2]
+        while slot > 0:
+            parent = (slot - 1) >> 1
+            if (priorities[parent], sequences[parent]) <= key:
+                break
+            priorities[slot], sequences[slot] = priorities[parent], sequences[parent]
+            ranks[slot], scores[slot] = ranks[parent], scores[parent]
+            positions[ranks[slot]] = slot
+            slot = parent
+        self._set(slot, entry)
+
+    def _sift_down(self, slot):
+        """
+        Descend l'entrée de slot tant qu'un de ses enfants la précède.
+        """
+        priorities, sequences, ranks, scores = self._priorities, self._sequences, self._ranks, self._scores
+        positions = self._positions
+        size = len(ranks)
+        entry = self._get(slot)
+        key = entry[:2]
+        child = 2 * slot + 1
+        while child < size:
+            child_key = (priorities[child], sequences[child])
+            right = child + 1
+            if right < size:
+                right_key = (priorities[right], sequences[right])
+                if right_key < child_key:
+                    child, child_key = right, right_key
+            if key <= child_key:
+                break
+            priorities[slot], sequences[slot] = child_key
+            ranks[slot], scores[slot] = ranks[child], scores[child]
+            positions[ranks[slot]] = slot
+            slot = child
+            child = 2 * slot + 1
+        self._set(slot, entry)
+
+    # Interface de ReviewScheduler
+
+    def load(self, cards):
+        """
+        Remplace le contenu de la file par des cartes (id, question, answer, review_score).
+        Seuls les textes des premières cartes sont gardés, dans le cache de textes.
+        """
+        cards = list(cards)
+        if self.texts is not None:
+            self.texts.update({card[0]: (card[1], card[2]) for card in cards[:self.prefetch + 1]})
+        self._load([(card[0], card[3], card) for card in cards])
+
+    def load_keys(self, keys):
+        """
+        Remplace le contenu de la file par des clés (id, review_score), sans les textes
+        (DatabaseManager.get_card_keys_by_category, get_due_card_keys).
+        """
+        self._load([(card_id, review_score, None) for card_id, review_score in keys])
+
+    def _load(self, rows):
+        self._clear()
+        # Rangs dans l'ordre des identifiants ; la case i contient d'abord la carte i
+        order = sorted(range(len(rows)), key=lambda index: rows[index][0])
+        self._keys = array('q', [rows[index][0] for index in order])
+        self._positions = array('q', order)
+        self._sorted = len(rows)
+        ranks = array('q', bytes(8 * len(rows)))
+        for rank, index in enumerate(order):
+            ranks[index] = rank
+        del order
+        self._ranks = ranks
+        for card_id, review_score, card in rows:
+            self._priorities.append(self._priority(card_id, review_score, card))
+            self._sequences.append(next(self._sequence))
+            self._scores.append(review_score)
+        # Une liste déjà triée (ordre SQL) est déjà un tas : chaque nœud n'est comparé qu'à ses enfants
+        for slot in reversed(range(len(self._ranks) // 2)):
+            self._sift_down(slot)
+
+    def upcoming(self, window=None):
+        """
+        Retourne les identifiants des cartes susceptibles d'être présentées prochainement :
+        les premières cases du tas, qui contiennent la tête de file et les suivantes.
+        """
+        window = self.prefetch if window is None else window
+        return [self._keys[rank] for rank in self._ranks[:window + 1]]
+
+    def peek(self):
+        """
+        Retourne la carte en tête de file, ou None si la file est vide. Les textes de
+        la carte et des suivantes sont lus par lot s'ils ne sont pas en cache.
+        """
+        if not self._ranks:
+            return None
+        if self.texts is not None and self._keys[self._ranks[0]] not in self.texts:
+            self.texts.prefetch(self.upcoming())
+        return self._card(0)
+
+    def push(self, card):
+        """
+        Ajoute une carte à la file. Ses textes, s'ils sont donnés, sont mis en cache.
+        """
+        if self.texts is not None and card[1] is not None:
+            self.texts.update({card[0]: (card[1], card[2])})
+        self._append((self._priority(card[0], card[3], card), next(self._sequence), self._new_rank(card[0]), card[3]))
+        self._sift_up(len(self._ranks) - 1)
+
+    def pop(self):
+        """
+        Retire et retourne la carte en tête de file.
+        """
+        card = self._card(0)
+        self._positions[self._ranks[0]] = -1
+        last = self._pop_last()
+        if self._ranks:
+            self._set(0, last)
+            self._sift_down(0)
+        return card
+
+    def reschedule(self, card):
+        """
+        Remplace la carte en tête de file par sa nouvelle version (score mis à jour)
+        et la replace à sa priorité, derrière les cartes de même priorité.
+        """
+        if not self._ranks:
+            raise IndexError("reschedule sur une file vide")
+        rank = self._new_rank(card[0])
+        if rank != self._ranks[0]:
+            self._positions[self._ranks[0]] = -1
+        self._set(0, (self._priority(card[0], card[3], card), next(self._sequence), rank, card[3]))
+        self._sift_down(0)
+
+    def _restore(self, slot):
+        """
+        Replace l'entrée de slot après un changement de sa priorité.
+        """
+        self._sift_down(slot)
+        self._sift_up(slot)
+
+    def remove(self, card_id):
+        """
+        Retire une carte de la file, où qu'elle soit : la dernière case du tas prend sa place.
+        :return: True si la carte était dans la file.
+        """
+        slot = self._find(card_id)
+        if slot is None:
+            return False
+        self._positions[self._ranks[slot]] = -1
+        last = self._pop_last()
+        if slot < len(self._ranks):
+            self._set(slot, last)
+            self._restore(slot)
+        if self.texts is not None:
+            self.texts.discard(card_id)
+        return True
+
+    def update(self, card_id, review_score):
+        """
+        Change le score d'une carte de la file, où qu'elle soit, et la replace à sa
+        nouvelle priorité, derrière les cartes de même priorité.
+        :return: True si la carte était dans la file.
+        """
+        slot = self._find(card_id)
+        if slot is None:
+            return False
+        self._set(slot, (self._priority(card_id, review_score), next(self._sequence), self._ranks[slot], review_score))
+        self._restore(slot)
+        return True
+
+
+# File de révision de plusieurs catégories
+class _CategoryStream:
+    """
+    État de lecture d'une catégorie dans une MergedReviewScheduler.
+    """
+    __slots__ = ('weight', 'unread', 'buffer', 'after', 'exhausted', 'pending', 'head', 'clock', 'skip')
+
+    def __init__(self, weight, size):
+        self.weight = weight
+        self.unread = size  # Cartes pas encore lues, d'après le nombre de cartes de la catégorie
+        self.buffer = deque()  # Cartes lues, derrière la tête de flux (y compris celles retirées depuis)
+        self.after = None  # Clé (review_score, id) de la dernière carte lue
+        self.exhausted = False
+        self.pending = False  # Page demandée par pages_needed, pas encore reçue
+        self.head = False  # Tête de flux présente dans le tas
+        self.clock = 0.0  # Temps virtuel de la dernière carte placée (ordre entrelacé)
+        self.skip = {}  # card_id -> nouveau score d'une carte déjà lue, encore devant le curseur after
+
+
+class MergedReviewScheduler:
+    """
+    File de révision de plusieurs catégories à la fois, sans les charger entièrement.
+    Chaque catégorie est un flux de cartes triées par (review_score, id), lu page par
+    page (DatabaseManager.get_cards_page) ; une fusion k-voies, comme heapq.merge, garde
+    dans un tas la carte de tête de chaque flux et présente la plus prioritaire.
+
+    Seules la page en cours de chaque catégorie, les cartes ratées et les cartes notées
+    dont la nouvelle clé est encore devant le curseur de leur catégorie restent en
+    mémoire : une telle carte reviendrait dans une page suivante, elle y est ignorée.
+    Une bonne réponse (pop) augmente le score de 1, comme SM2. Ces identifiants sont
+    oubliés dès que le curseur a dépassé leur clé, et tous à la fin de la catégorie.
+    Un index card_id -> entrée permet de retirer ou de modifier une carte déjà lue en
+    O(log n) : son entrée est marquée périmée dans le tas (suppression paresseuse,
+    comme ReviewScheduler) ou dans la page en cours.
+
+    Deux ordres de présentation :
+    - par score (défaut) : la priorité d'une carte est (review_score + 1) / poids de sa
+      catégorie ; les cartes de score 1 d'une catégorie de poids 2 passent avec les
+      cartes de score 0 des catégories de poids 1 ;
+    - entrelacé : les catégories se succèdent à tour de rôle, chacune dans l'ordre de
+      ses scores, une catégorie de poids 2 présentant deux cartes par tour.
+
+    Les pages sont lues par fetch(category_id, after, limit) quand un flux est vide.
+    Sans fetch (lectures faites par un autre thread), elles sont fournies par add_page
+    en réponse à pages_needed ; tant qu'une catégorie attend sa page, peek retourne None.
+    """
+    def __init__(self, fetch=None, interleave=False, page_size=100):
+        """
+        :param fetch: Fonction (category_id, after, limit) -> page de cartes, par exemple
+                      DatabaseManager.get_cards_page ; None pour fournir les pages avec add_page.
+        :param interleave: True pour l'ordre entrelacé, False pour l'ordre par score.
+        :param page_size: Nombre de cartes lues à la fois dans chaque catégorie.
+        """
+        self.fetch = fetch
+        self.interleave = interleave
+        self.page_size = page_size
+        self._sequence = count()
+        self._clear()
+
+    def _clear(self):
+        # Entrées [priorité, rang, numéro d'ordre, catégorie, carte] ; rang 0 pour une tête de flux,
+        # 1 pour une carte remise dans la file, qui passe derrière les cartes de même priorité
+        self._heap = []
+        self._entries = {}  # card_id -> entrée valide de la carte dans le tas
+        self._buffered = {}  # card_id -> (catégorie, carte) des cartes valides des pages en cours
+        self._removed = set()  # Cartes pas encore lues retirées de la session
+        self._streams = {}  # category_id -> _CategoryStream
+
+    def __len__(self):
+        return len(self._entries) + len(self._buffered) + sum(stream.unread for stream in self._streams.values())
+
+    def __bool__(self):
+        return bool(self._entries) or self._waiting()
+
+    def __contains__(self, card_id):
+        return card_id in self._entries or card_id in self._buffered
+
+    def _waiting(self):
+        """
+        Indique si une catégorie attend sa page : l'ordre de la tête de file n'est pas encore connu.
+        """
+        return any(not stream.head and not stream.exhausted for stream in self._streams.values())
+
+    def _key(self, stream, card):
+        if stream is None:  # Carte ajoutée hors des catégories de la session
+            return (self._heap[0][0] if self._heap else 0) if self.interleave else card[3] + 1
+        if self.interleave:
+            stream.clock += 1 / stream.weight
+            return stream.clock
+        return (card[3] + 1) / stream.weight
+
+    def _push(self, card, category_id, head=False):
+        stream = self._streams.get(category_id)
+        entry = [self._key(stream, card), 0 if head else 1, next(self._sequence), category_id, card]
+        self._entries[card[0]] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _purge(self):
+        """
+        Retire les entrées périmées de la tête du tas.
+        """
+        heap, entries = self._heap, self._entries
+        while heap and entries.get(heap[0][4][0]) is not heap[0]:
+            heapq.heappop(heap)
+
+    def _compact(self):
+        """
+        Reconstruit le tas avec les seules entrées valides lorsque les entrées périmées y sont majoritaires.
+        """
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+    def _changed(self, category_id, card_id, review_score):
+        """
+        Note qu'une carte déjà lue a désormais la clé (review_score, card_id) en base : si
+        cette clé est devant le curseur de sa catégorie, la carte sera ignorée à la relecture.
+        """
+        stream = self._streams.get(category_id)
+        if stream is None or stream.exhausted:
+            return
+        if stream.after is None or (review_score, card_id) > stream.after:
+            stream.skip[card_id] = review_score
+
+    def _advance(self, category_id):
+        """
+        Place dans le tas la carte suivante d'une catégorie, en lisant une page si besoin.
+        """
+        stream = self._streams[category_id]
+        stream.head = False
+        while True:
+            while stream.buffer:
+                card = stream.buffer.popleft()
+                if self._buffered.pop(card[0], None) is not None:  # Sinon retirée ou modifiée entre-temps
+                    self._push(card, category_id, head=True)
+                    stream.head = True
+                    return
+            if stream.exhausted or self.fetch is None:
+                return
+            self._extend(category_id, self.fetch(category_id, stream.after, self.page_size))
+
+    def _extend(self, category_id, cards):
+        stream = self._streams[category_id]
+        cards = list(cards)
+        stream.unread = max(0, stream.unread - len(cards))
+        for card in cards:
+            if stream.skip.pop(card[0], None) is not None or card[0] in self._removed:
+                self._removed.discard(card[0])
+                continue
+            stream.buffer.append(card)
+            self._buffered[card[0]] = (category_id, card)
+        if cards:
+            stream.after = (cards[-1][3], cards[-1][0])
+            # Les pages suivantes commencent après le curseur : les clés dépassées ne reviendront plus
+            stream.skip = {card_id: score for card_id, score in stream.skip.items()
+                           if (score, card_id) > stream.after}
+        if len(cards) < self.page_size:
+            stream.exhausted = True
+            stream.unread = 0
+            stream.skip = {}
+        stream.pending = False
+
+    def _take(self, card_id, review_score=None):
+        """
+        Retire une carte déjà lue (tas ou page en cours) et retourne (catégorie, carte), ou
+        (None, None) si elle n'est pas en mémoire.
+        :param review_score: Nouveau score de la carte en base, noté avant de lire la page suivante.
+        """
+        entry = self._entries.pop(card_id, None)
+        if entry is None:
+            category_id, card = self._buffered.pop(card_id, (None, None))
+            if card is not None and review_score is not None:
+                self._changed(category_id, card_id, review_score)
+            return category_id, card
+        if review_score is not None:
+            self._changed(entry[3], card_id, review_score)
+        if not entry[1]:
+            self._advance(entry[3])
+        if not self._entries:
+            self._entries = {}  # Un dictionnaire vidé garde la taille de sa table
+        self._compact()
+        return entry[3], entry[4]
+
+    def load_categories(self, categories):
+        """
+        Remplace le contenu de la file par des catégories [(category_id, poids, nombre de cartes)].
+        Avec fetch, la première page de chaque catégorie est lue aussitôt ; sinon, elle
+        est attendue par add_page.
+        """
+        self._clear()
+        for category_id, weight, size in categories:
+            if weight <= 0:
+                raise ValueError("Le poids d'une catégorie doit être positif")
+            self._streams[category_id] = _CategoryStream(weight, size)
+        for category_id in self._streams:
+            self._advance(category_id)
+
+    def pages_needed(self, low_water=None):
+        """
+        Retourne les pages à lire [(category_id, after, limit)] des catégories dont la page
+        en cours est presque épuisée, et les marque comme demandées.
+        :param low_water: Nombre de cartes restantes à partir duquel la page suivante est
+                          demandée, la moitié d'une page par défaut.
+        """
+        low_water = self.page_size // 2 if low_water is None else low_water
+        needed = []
+        for category_id, stream in self._streams.items():
+            if not stream.exhausted and not stream.pending and len(stream.buffer) <= low_water:
+                stream.pending = True
+                needed.append((category_id, stream.after, self.page_size))
+        return needed
+
+    def add_page(self, category_id, cards):
+        """
+        Ajoute la page suivante d'une catégorie, lue pour pages_needed.
+        """
+        stream = self._streams.get(category_id)
+        if stream is None:
+            return  # Catégorie d'une session remplacée entre-temps
+        self._extend(category_id, cards)
+        if not stream.head:
+            self._advance(category_id)
+
+    def peek(self):
+        """
+        Retourne la carte en tête de file, ou None si la file est vide ou attend une page.
+        """
+        if self._waiting():
+            return None
+        self._purge()
+        return self._heap[0][4] if self._heap else None
+
+    def push(self, card):
+        """
+        Ajoute une carte à la file, hors des flux de ses catégories.
+        """
+        self._push(card, None)
+        self._compact()
+
+    def pop(self):
+        """
+        Retire et retourne la carte en tête de file (bonne réponse) ; la carte suivante de sa
+        catégorie prend sa place.
+        """
+        if self.peek() is None:
+            raise IndexError("pop sur une file vide ou en attente d'une page")
+        card = self._heap[0][4]
+        return self._take(card[0], card[3] + 1)[1]
+
+    def reschedule(self, card):
+        """
+        Remplace la carte en tête de file par sa nouvelle version (score mis à jour) et la
+        replace à sa priorité dans sa catégorie : derrière les cartes de même priorité
+        par score, après la prochaine carte de sa catégorie en ordre entrelacé.
+        """
+        if self.peek() is None:
+            raise IndexError("reschedule sur une file vide ou en attente d'une page")
+        category_id, _ = self._take(self._heap[0][4][0], card[3])
+        self._push(card, category_id)
+
+    def remove(self, card_id):
+        """
+        Retire une carte de la file. Une carte pas encore lue sera ignorée si elle est lue.
+        :return: True si la carte était déjà lue.
+        """
+        category_id, card = self._take(card_id)
+        if card is None:
+            self._removed.add(card_id)
+            return False
+        return True
+
+    def update(self, card_id, review_score):
+        """
+        Change le score d'une carte déjà lue et la replace à sa nouvelle priorité.
+        :return: True si la carte était déjà lue.
+        """
+        category_id, card = self._take(card_id, review_score)
+        if card is None:
+            return False
+        self._push((card[0], card[1], card[2], review_score), category_id)
+        self._compact()
+        return True
@@ -0,0 +1,390 @@
+import json
+import logging
+import re
+import secrets
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from CardManager import CardManager
+from DatabaseManager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """
+    Erreur renvoyée au client avec un code HTTP et un message.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Session de révision côté serveur
+class ReviewSession:
+    """
+    Session de révision d'un client : file de révision (CardManager compact) et
+    statistiques de la session. Un seul thread utilise la session à la fois (lock).
+    """
+    def __init__(self, session_id, category_id, user_id=None):
+        self.id = session_id
+        self.category_id = category_id
+        self.user_id = user_id
+        self.card_manager = CardManager(compact=True, user_id=user_id)
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.last_used = time.monotonic()
+        self.correct = 0
+        self.incorrect = 0
+
+    def stats(self):
+        reviewed = self.correct + self.incorrect
+        return {
+            'session': self.id,
+            'category_id': self.category_id,
+            'user_id': self.user_id,
+            'remaining': len(self.card_manager.cards),
+            'reviewed': reviewed,
+            'correct': self.correct,
+            'incorrect': self.incorrect,
+            'success_rate': self.correct / reviewed if reviewed else 0.0,
+            'elapsed': time.time() - self.started_at,
+        }
+
+
+class SessionStore:
+    """
+    Sessions de révision en mémoire ; une session inutilisée pendant idle_timeout
+    secondes est oubliée (ses réponses sont déjà en base) et transmise à on_evict.
+    """
+    def __init__(self, idle_timeout=900.0, max_sessions=10_000, on_evict=None):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.on_evict = on_evict
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, category_id, user_id=None):
+        """
+        Crée une session ; lève HTTPError 503 si le nombre maximal de sessions actives est atteint.
+        """
+        self.evict_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise HTTPError(503, "trop de sessions actives")
+            session = ReviewSession(secrets.token_urlsafe(16), category_id, user_id)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        """
+        Retourne une session et la marque comme utilisée ; lève HTTPError 404 si elle n'existe pas.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "session inconnue ou expirée")
+        session.last_used = time.monotonic()
+        return session
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def evict_idle(self, now=None):
+        """
+        Oublie les sessions inactives depuis idle_timeout et retourne leur nombre.
+        """
+        limit = (time.monotonic() if now is None else now) - self.idle_timeout
+        with self._lock:
+            expired = [session for session in self._sessions.values() if session.last_used < limit]
+            for session in expired:
+                del self._sessions[session.id]
+        if self.on_evict is not None:
+            for session in expired:
+                self.on_evict(session)
+        return len(expired)
+
+
+# Serveur HTTP de révision
+class ReviewServer(HTTPServer):
+    """
+    Service de révision sans interface graphique, exposant une API JSON locale :
+
+        GET    /categories                  catégories et nombre de cartes
+        POST   /sessions                    {"category_id": 1, "user": "nom", "due_only": true}
+        GET    /sessions/<id>               statistiques de la session
+        GET    /sessions/<id>/next          carte courante (null si la session est terminée)
+        POST   /sessions/<id>/grade         {"correct": true}, réponse à la carte courante
+        DELETE /sessions/<id>               fin de la session
+        GET    /stats?user_id=&category_id= statistiques globales, d'un utilisateur, d'une catégorie
+
+    Les requêtes sont traitées par un pool borné de threads, chacun avec sa propre
+    connexion SQLite (lectures concurrentes grâce au mode WAL, écritures réessayées
+    si la base est verrouillée). Les connexions HTTP restent ouvertes entre les
+    requêtes (HTTP/1.1 keep-alive) : une connexion occupe un thread du pool tant
+    qu'elle est ouverte, les suivantes attendent ; une connexion inactive depuis
+    connection_timeout est fermée pour libérer son thread. Les sessions de révision sont conservées
+    par le serveur et oubliées après session_timeout d'inactivité. Comme dans
+    l'application, une session terminée (supprimée ou oubliée) qui a noté au moins
+    une carte est comptée dans les statistiques globales.
+    """
+    request_queue_size = 128
+
+    def __init__(self, address=('127.0.0.1', 8000), db_name='flashcards.db', workers=8,
+                 session_timeout=900.0, connection_timeout=15.0, max_sessions=10_000, **options):
+        """
+        :param address: Adresse (hôte, port) d'écoute ; le port 0 en choisit un libre (voir server_address).
+        :param db_name: Nom du fichier de la base de données SQLite.
+        :param workers: Nombre de threads traitant les connexions, donc de connexions SQLite.
+        :param session_timeout: Inactivité (en secondes) après laquelle une session est oubliée.
+        :param connection_timeout: Inactivité (en secondes) après laquelle une connexion HTTP est fermée.
+        :param max_sessions: Nombre maximal de sessions actives.
+        :param options: Options transmises à chaque DatabaseManager (busy_timeout, write_retries...).
+        """
+        if workers < 1:
+            raise ValueError("workers doit être supérieur à 0")
+        self._db_name = db_name
+        self._options = options
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='review-http')
+        self._local = threading.local()
+        self._managers = []  # Toutes les connexions ouvertes, pour la fermeture
+        self._managers_lock = threading.Lock()
+        self._connections = set()  # Connexions HTTP en cours de traitement
+        self.connection_timeout = connection_timeout
+        self.sessions = SessionStore(session_timeout, max_sessions, on_evict=self._session_evicted)
+        with DatabaseManager(db_name, **options) as db_manager:
+            db_manager.setup_database()
+        super().__init__(address, ReviewRequestHandler)
+
+    def manager(self):
+        """
+        Retourne le DatabaseManager propre au thread courant.
+        """
+        manager = getattr(self._local, 'manager', None)
+        if manager is None:
+            manager = DatabaseManager(self._db_name, check_same_thread=False, **self._options)
+            self._local.manager = manager
+            with self._managers_lock:
+                self._managers.append(manager)
+        return manager
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        with self._managers_lock:
+            self._connections.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._managers_lock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+
+    def service_actions(self):
+        # Appelé par serve_forever entre deux attentes de connexion
+        evicted = self.sessions.evict_idle()
+        if evicted:
+            logger.info("%d sessions inactives oubliées", evicted)
+
+    def server_close(self):
+        """
+        Ferme les connexions HTTP persistantes, attend la fin des requêtes en cours
+        puis ferme les connexions à la base.
+        """
+        super().server_close()
+        with self._managers_lock:
+            for connection in self._connections:
+                try:
+                    connection.shutdown(socket.SHUT_RD)  # La requête en cours reçoit encore sa réponse
+                except OSError:
+                    pass
+        self._pool.shutdown(wait=True)
+        with self._managers_lock:
+            for manager in self._managers:
+                manager.close()
+            self._managers = []
+
+    def _session_evicted(self, session):
+        try:
+            self.end_session(self.manager(), session)
+        except Exception:
+            logger.exception("Session %s oubliée sans être comptabilisée", session.id)
+
+    # Opérations de l'API, avec la base du thread courant
+
+    def list_categories(self, db_manager):
+        counts = db_manager.get_category_card_counts()
+        return [{'id': category_id, 'name': name, 'cards': counts.get(category_id, 0)}
+                for category_id, name in db_manager.get_all_categories()]
+
+    def start_session(self, db_manager, body):
+        category_id = body.get('category_id')
+        if not isinstance(category_id, int) or isinstance(category_id, bool):  # JSON true/false sont des int
+            raise HTTPError(400, "category_id (entier) est requis")
+        user_id = db_manager.add_user(body['user']) if body.get('user') else None
+        session = self.sessions.add(category_id, user_id)
+        with session.lock:
+            session.card_manager.db_manager = db_manager
+            if body.get('due_only', True):
+                session.card_manager.load_due_cards(category_id)
+            else:
+                session.card_manager.load_cards(category_id)
+        return session.stats()
+
+    def next_card(self, db_manager, session):
+        with session.lock:
+            session.card_manager.db_manager = db_manager
+            card = session.card_manager.get_next_card()
+            if card is None:
+                return {'card': None}
+            card_id, question, answer, review_score = card
+            return {'card': {'id': card_id, 'question': question, 'answer': answer, 'review_score': review_score}}
+
+    def grade(self, db_manager, session, body):
+        if not isinstance(body.get('correct'), bool):
+            raise HTTPError(400, "correct (booléen) est requis")
+        with session.lock:
+            session.card_manager.db_manager = db_manager
+            if not session.card_manager.cards:
+                raise HTTPError(409, "la session est terminée")
+            if body['correct']:
+                session.card_manager.mark_card_as_correct()
+                session.correct += 1
+            else:
+                session.card_manager.mark_card_as_incorrect()
+                session.incorrect += 1
+            return session.stats()
+
+    def end_session(self, db_manager, session):
+        """
+        Comptabilise une session terminée dans les statistiques globales, si elle a noté
+        au moins une carte (les réponses sont déjà dans le journal des révisions).
+        """
+        if session.correct + session.incorrect:
+            db_manager.record_session()
+        return session.stats()
+
+    def stats(self, db_manager, query):
+        try:
+            user_id = int(query['user_id'][0]) if 'user_id' in query else None
+            category_id = int(query['category_id'][0]) if 'category_id' in query else None
+        except ValueError:
+            raise HTTPError(400, "user_id et category_id doivent être des entiers")
+        sessions, correct, incorrect, reviewed = db_manager.get_global_stats()
+        result = {'global': {'sessions': sessions, 'correct': correct, 'incorrect': incorrect, 'reviewed': reviewed}}
+        if user_id is not None:
+            result['user'] = dict(zip(('correct', 'incorrect'), db_manager.get_user_stats(user_id)))
+        if category_id is not None:
+            result['category'] = dict(zip(('correct', 'incorrect'),
+                                          db_manager.get_category_review_stats(category_id, user_id=user_id)))
+        return result
+
+
+class ReviewRequestHandler(BaseHTTPRequestHandler):
+    """
+    Traduit les requêtes HTTP en opérations de ReviewServer, avec des corps JSON.
+    """
+    protocol_version = 'HTTP/1.1'  # Connexions persistantes
+    server_version = 'FlashcardsReview/1.0'
+    disable_nagle_algorithm = True  # En-têtes et corps sont envoyés séparément
+    SESSION_PATH = re.compile(r'^/sessions/([\w-]+)(?:/(next|grade))?$')
+    MAX_BODY = 64 * 1024
+
+    def setup(self):
+        self.timeout = self.server.connection_timeout
+        super().setup()
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        try:
+            body = self._read_body()
+            status, result = self._route(method, body)
+        except HTTPError as error:
+            status, result = error.status, {'error': str(error)}
+        except Exception:
+            logger.exception("Erreur pendant %s %s", method, self.path)
+            status, result = 500, {'error': "erreur interne du serveur"}
+        self._send_json(status, result)
+
+    def _route(self, method, body):
+        server = self.server
+        url = urlsplit(self.path)
+        db_manager = server.manager()
+        if url.path == '/categories' and method == 'GET':
+            return 200, server.list_categories(db_manager)
+        if url.path == '/stats' and method == 'GET':
+            return 200, server.stats(db_manager, parse_qs(url.query))
+        if url.path == '/sessions' and method == 'POST':
+            return 201, server.start_session(db_manager, body)
+        match = self.SESSION_PATH.match(url.path)
+        if match is None:
+            raise HTTPError(404, "ressource inconnue")
+        session_id, action = match.groups()
+        if action is None and method == 'DELETE':
+            session = server.sessions.remove(session_id)
+            if session is None:
+                raise HTTPError(404, "session inconnue ou expirée")
+            with session.lock:
+                return 200, server.end_session(db_manager, session)
+        session = server.sessions.get(session_id)
+        if action is None and method == 'GET':
+            return 200, session.stats()
+        if action == 'next' and method == 'GET':
+            return 200, server.next_card(db_manager, session)
+        if action == 'grade' and method == 'POST':
+            return 200, server.grade(db_manager, session, body)
+        raise HTTPError(405, "méthode non autorisée")
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Corps de longueur inconnue : la suite du flux ne peut plus être lue
+            self.close_connection = True
+            raise HTTPError(400, "en-tête Content-Length invalide")
+        if length > self.MAX_BODY:
+            self.close_connection = True
+            raise HTTPError(413, "corps de requête trop long")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, "corps JSON invalide")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "le corps doit être un objet JSON")
+        return body
+
+    def _send_json(self, status, result):
+        data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
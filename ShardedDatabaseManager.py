@@ -0,0 +1,376 @@
+import heapq
+import itertools
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from DatabaseManager import DatabaseManager
+
+SHARD_BITS = 40  # Les cartes du fichier k ont un identifiant dans [k << SHARD_BITS, (k + 1) << SHARD_BITS)
+
+
+def _bm25_idf(rows, documents):
+    """
+    IDF d'un mot tel que calculé par la fonction bm25 de FTS5 (valeur minimale 1e-6).
+    :param rows: Nombre de cartes indexées.
+    :param documents: Nombre de cartes contenant le mot.
+    """
+    idf = math.log((rows - documents + 0.5) / (documents + 0.5))
+    return idf if idf > 0 else 1e-6
+
+
+def shard_names(db_name, shards):
+    """
+    Retourne les fichiers d'une base répartie : db_name, puis nom.shard1.ext, nom.shard2.ext...
+    """
+    root, extension = os.path.splitext(db_name)
+    return [db_name] + [f"{root}.shard{index}{extension}" for index in range(1, shards)]
+
+
+# Base de données répartie sur plusieurs fichiers SQLite
+class ShardedDatabaseManager:
+    """
+    Équivalent de DatabaseManager dont les catégories sont réparties entre plusieurs
+    fichiers SQLite (même interface, mêmes résultats).
+
+    Le premier fichier (db_name) contient la table de routage catégorie -> fichier
+    (category_shards) et les sessions ; une base existante en fichier unique devient
+    donc le fichier 0, ses catégories y restent. Chaque nouvelle catégorie est affectée
+    au fichier qui en contient le moins.
+
+    Les opérations sur une catégorie ou une carte ne touchent qu'un fichier : la
+    catégorie est trouvée par la table de routage, la carte par son identifiant
+    (chaque fichier a sa propre plage, voir SHARD_BITS). Les requêtes qui portent sur
+    toutes les catégories (liste des catégories, nombres de cartes, statistiques,
+    recherche) interrogent les fichiers en parallèle et fusionnent les résultats.
+    Les écritures touchant plusieurs fichiers font une transaction par fichier.
+    Les utilisateurs sont enregistrés dans le premier fichier ; leur progression est
+    conservée dans le fichier de chaque carte.
+    """
+    def __init__(self, db_name='flashcards.db', shards=4, **options):
+        """
+        :param db_name: Fichier principal ; les autres fichiers sont nommés d'après lui.
+        :param shards: Nombre de fichiers. Il peut augmenter d'une exécution à l'autre
+                       (les catégories existantes ne sont pas déplacées), pas diminuer.
+        :param options: Options transmises à chaque DatabaseManager (busy_timeout, instrumentation...).
+        """
+        if shards < 1:
+            raise ValueError("shards doit être supérieur à 0")
+        # Les fichiers sont interrogés depuis les threads du pool, un seul à la fois par fichier
+        options['check_same_thread'] = False
+        self.shard_names = shard_names(db_name, shards)
+        self._shards = [DatabaseManager(name, **options) for name in self.shard_names]
+        self._catalog = self._shards[0]
+        self._routes = {}  # Cache de la table de routage : category_id -> index du fichier
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Ferme les connexions de tous les fichiers et le pool de threads.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for shard in self._shards:
+            shard.close()
+
+    # Routage
+
+    def _fan_out(self, calls):
+        """
+        Exécute en parallèle des fonctions (fichier) -> résultat, une par fichier.
+        :param calls: Dictionnaire index du fichier -> fonction.
+        :return: Dictionnaire index du fichier -> résultat.
+        """
+        if len(calls) == 1:
+            (index, call), = calls.items()
+            return {index: call(self._shards[index])}
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self._shards), thread_name_prefix='sqlite-shard')
+        futures = {index: self._pool.submit(call, self._shards[index]) for index, call in calls.items()}
+        return {index: future.result() for index, future in futures.items()}
+
+    def _all(self, name, *args, **kwargs):
+        """
+        Appelle une méthode sur tous les fichiers en parallèle ; résultats dans l'ordre des fichiers.
+        """
+        results = self._fan_out({index: (lambda shard: getattr(shard, name)(*args, **kwargs))
+                                 for index in range(len(self._shards))})
+        return [results[index] for index in range(len(self._shards))]
+
+    def _category_shard(self, category_id):
+        index = self._routes.get(category_id)
+        if index is None:
+            self._routes = self._catalog.get_category_shards()  # Catégorie créée par un autre processus
+            index = self._routes.get(category_id, 0)  # Sans route : catégorie antérieure à la répartition
+        return index
+
+    def _card_shard(self, card_id):
+        index = card_id >> SHARD_BITS
+        if index >= len(self._shards):
+            raise ValueError(f"La carte {card_id} appartient au fichier {index}, absent de la configuration")
+        return index
+
+    def _by_category(self, category_id):
+        return self._shards[self._category_shard(category_id)]
+
+    # Schéma
+
+    def setup_database(self):
+        self._all('setup_database')
+        self._fan_out({index: (lambda shard, floor=index << SHARD_BITS: shard.set_card_id_floor(floor))
+                       for index in range(1, len(self._shards))})
+        self._routes = self._catalog.get_category_shards()
+
+    def get_schema_version(self):
+        return min(self._all('get_schema_version'))
+
+    # Catégories
+
+    def add_category(self, name):
+        category_id, index = self._catalog.assign_category_shard(name, len(self._shards))
+        self._shards[index].add_category(name, category_id)
+        self._routes[category_id] = index
+        return category_id
+
+    def rename_category(self, category_id, name):
+        index = self._category_shard(category_id)
+        self._catalog.rename_category(category_id, name)  # Table de routage (et catégorie si fichier 0)
+        if index:
+            self._shards[index].rename_category(category_id, name)
+
+    def delete_category(self, category_id):
+        index = self._category_shard(category_id)
+        if index:
+            self._shards[index].delete_category(category_id)
+        self._catalog.delete_category(category_id)  # Table de routage (et catégorie si fichier 0)
+        self._routes.pop(category_id, None)
+
+    def get_all_categories(self):
+        return sorted(itertools.chain.from_iterable(self._all('get_all_categories')))
+
+    # Utilisateurs
+
+    def add_user(self, name):
+        return self._catalog.add_user(name)
+
+    def get_all_users(self):
+        return self._catalog.get_all_users()
+
+    def get_category_card_counts(self):
+        counts = {}
+        for shard_counts in self._all('get_category_card_counts'):
+            counts.update(shard_counts)
+        return counts
+
+    # Cartes d'une catégorie
+
+    def add_card(self, category_id, question, answer, on_duplicate='skip'):
+        return self._by_category(category_id).add_card(category_id, question, answer, on_duplicate)
+
+    def add_cards_bulk(self, cards, on_duplicate='skip'):
+        rows = {}  # Index du fichier -> cartes
+        routes = {}  # Nom de catégorie -> index du fichier
+        for card in cards:
+            if card[0] not in routes:
+                routes[card[0]] = self._category_shard(self.add_category(card[0]))
+            rows.setdefault(routes[card[0]], []).append(card)
+        inserted = self._fan_out({index: (lambda shard, chunk=chunk: shard.add_cards_bulk(chunk, on_duplicate))
+                                  for index, chunk in rows.items()})
+        return sum(inserted.values())
+
+    def get_cards_by_category(self, category_id, user_id=None):
+        return self._by_category(category_id).get_cards_by_category(category_id, user_id=user_id)
+
+    def get_cards_page(self, category_id, after=None, limit=100, user_id=None):
+        return self._by_category(category_id).get_cards_page(category_id, after, limit, user_id=user_id)
+
+    def get_card_key_at(self, category_id, position, user_id=None):
+        return self._by_category(category_id).get_card_key_at(category_id, position, user_id=user_id)
+
+    def get_page_keys(self, category_id, page_size, user_id=None):
+        return self._by_category(category_id).get_page_keys(category_id, page_size, user_id=user_id)
+
+    def count_cards(self, category_id):
+        return self._by_category(category_id).count_cards(category_id)
+
+    def get_due_cards(self, category_id, now=None, limit=None, user_id=None):
+        return self._by_category(category_id).get_due_cards(category_id, now, limit, user_id=user_id)
+
+    def get_card_keys_by_category(self, category_id, user_id=None):
+        return self._by_category(category_id).get_card_keys_by_category(category_id, user_id=user_id)
+
+    def get_due_card_keys(self, category_id, now=None, limit=None, user_id=None):
+        return self._by_category(category_id).get_due_card_keys(category_id, now, limit, user_id=user_id)
+
+    def get_category_stats(self, category_id):
+        return self._by_category(category_id).get_category_stats(category_id)
+
+    def get_next_due(self, category_id, after, user_id=None):
+        return self._by_category(category_id).get_next_due(category_id, after, user_id=user_id)
+
+    def get_category_review_stats(self, category_id, user_id=None):
+        return self._by_category(category_id).get_category_review_stats(category_id, user_id=user_id)
+
+    # Cartes
+
+    def _group_cards(self, card_ids):
+        groups = {}
+        for card_id in card_ids:
+            groups.setdefault(self._card_shard(card_id), []).append(card_id)
+        return groups
+
+    def get_card_categories(self, card_ids):
+        results = self._fan_out({index: (lambda shard, ids=ids: shard.get_card_categories(ids))
+                                 for index, ids in self._group_cards(card_ids).items()})
+        categories = {}
+        for shard_categories in results.values():
+            categories.update(shard_categories)
+        return categories
+
+    def get_card_texts(self, card_ids):
+        results = self._fan_out({index: (lambda shard, ids=ids: shard.get_card_texts(ids))
+                                 for index, ids in self._group_cards(card_ids).items()})
+        texts = {}
+        for shard_texts in results.values():
+            texts.update(shard_texts)
+        return texts
+
+    def delete_card(self, card_id):
+        return self._shards[self._card_shard(card_id)].delete_card(card_id)
+
+    def deduplicate_cards(self, chunk_size=1000, max_chunks=None):
+        # Les doublons sont toujours dans le même fichier (même catégorie)
+        results = self._all('deduplicate_cards', chunk_size, max_chunks)
+        return tuple(sum(column) for column in zip(*results))
+
+    def update_card_score(self, card_id, is_correct, now=None, user_id=None):
+        self._shards[self._card_shard(card_id)].update_card_score(card_id, is_correct, now, user_id)
+
+    def apply_grades(self, grades, journal=None, last_sequence=None, user_id=None):
+        """
+        Applique un lot de réponses : une transaction par fichier concerné.
+        Avec un journal, chaque fichier enregistre sa propre progression. Les réponses
+        du lot portent alors les numéros consécutifs se terminant à last_sequence (lots
+        de GradeBuffer) : au rejeu après un échec partiel, un fichier ignore les
+        réponses qu'il a déjà appliquées.
+        """
+        grades = list(grades)
+        if journal is None:
+            batches = {}
+            for grade in grades:
+                batches.setdefault(self._card_shard(grade[0]), []).append(grade)
+            self._fan_out({index: (lambda shard, batch=batch: shard.apply_grades(batch, user_id=user_id))
+                           for index, batch in batches.items()})
+            return
+        first_sequence = last_sequence - len(grades) + 1
+        applied = self._all('get_last_grade_sequence', journal)
+        batches = {index: [] for index, sequence in enumerate(applied) if sequence < last_sequence}
+        for offset, grade in enumerate(grades):
+            index = self._card_shard(grade[0])
+            if index in batches and first_sequence + offset > applied[index]:
+                batches[index].append(grade)
+        # Les fichiers sans réponse dans le lot enregistrent aussi la progression
+        self._fan_out({index: (lambda shard, batch=batch: shard.apply_grades(batch, journal, last_sequence, user_id))
+                       for index, batch in batches.items()})
+
+    def get_last_grade_sequence(self, journal):
+        return min(self._all('get_last_grade_sequence', journal))
+
+    # Recherche
+
+    def search_cards(self, query, category_id=None, limit=20, offset=0, with_rank=False):
+        """
+        Recherche dans tous les fichiers (voir DatabaseManager.search_cards).
+
+        Le score bm25 de chaque fichier dépend de ses propres fréquences : un mot rare dans
+        la base mais présent dans la plupart des cartes d'un petit fichier y a un poids quasi
+        nul. Les meilleurs résultats de chaque fichier sont donc notés à nouveau avec l'IDF
+        calculé sur l'ensemble des fichiers, mot par mot (le score bm25 d'une requête est
+        la somme des scores de ses mots). Restent propres à chaque fichier la longueur
+        moyenne des cartes et le choix des candidats (les offset + limit meilleurs du
+        fichier, identiques pour une requête d'un seul mot).
+        """
+        if category_id is not None:
+            return self._by_category(category_id).search_cards(query, category_id, limit, offset, with_rank)
+        results = self._all('search_cards', query, None, offset + limit, 0, True)
+        if len(self._shards) > 1:
+            results = self._rescore(query, results)
+        merged = itertools.islice(heapq.merge(*results, key=lambda result: result[-1]), offset, offset + limit)
+        return [result if with_rank else result[:-1] for result in merged]
+
+    def _rescore(self, query, results):
+        """
+        Remplace le score bm25 local des résultats de chaque fichier par le score global.
+        :param results: Résultats de search_cards (avec with_rank) dans l'ordre des fichiers.
+        :return: Résultats de chaque fichier, triés par score global.
+        """
+        statistics = self._fan_out({index: (lambda shard, found=found: shard.get_search_statistics(
+            query, [result[0] for result in found])) for index, found in enumerate(results)})
+        rows = sum(shard_rows for shard_rows, _, _ in statistics.values())
+        documents = [sum(column) for column in zip(*(counts for _, counts, _ in statistics.values()))]
+        weights = [_bm25_idf(rows, count) for count in documents]
+        rescored = []
+        for index, found in enumerate(results):
+            shard_rows, counts, scores = statistics[index]
+            local = [_bm25_idf(shard_rows, count) for count in counts]
+            shard_results = []
+            for result in found:
+                rank = sum(score / idf * weight for score, idf, weight in zip(scores[result[0]], local, weights))
+                shard_results.append(result[:-1] + (rank,))
+            shard_results.sort(key=lambda result: result[-1])
+            rescored.append(shard_results)
+        return rescored
+
+    def get_search_statistics(self, query, card_ids):
+        by_shard = self._group_cards(card_ids)
+        statistics = self._fan_out({index: (lambda shard, ids=by_shard.get(index, []): shard.get_search_statistics(
+            query, ids)) for index in range(len(self._shards))})
+        documents = [sum(column) for column in zip(*(counts for _, counts, _ in statistics.values()))]
+        scores = {}
+        for _, _, shard_scores in statistics.values():
+            scores.update(shard_scores)
+        return sum(rows for rows, _, _ in statistics.values()), documents, scores
+
+    def rebuild_search_index(self):
+        self._all('rebuild_search_index')
+
+    # Statistiques
+
+    def get_global_stats(self):
+        return tuple(sum(column) for column in zip(*self._all('get_global_stats')))
+
+    def get_all_category_stats(self):
+        stats = {}
+        for shard_stats in self._all('get_all_category_stats'):
+            stats.update(shard_stats)
+        return stats
+
+    def rebuild_category_stats(self):
+        self._all('rebuild_category_stats')
+
+    def get_user_stats(self, user_id):
+        return tuple(sum(column) for column in zip(*self._all('get_user_stats', user_id)))
+
+    def get_daily_review_stats(self, days=7):
+        totals = {}
+        for shard_days in self._all('get_daily_review_stats', days):
+            for day, correct, incorrect in shard_days:
+                previous = totals.get(day, (0, 0))
+                totals[day] = (previous[0] + correct, previous[1] + incorrect)
+        return [(day,) + totals[day] for day in sorted(totals, reverse=True)[:days]]
+
+    def rebuild_review_stats(self):
+        self._all('rebuild_review_stats')
+
+    def record_session(self):
+        self._catalog.record_session()
+
+    def update_global_stats(self, correct, incorrect, reviewed):
+        self._catalog.update_global_stats(correct, incorrect, reviewed)
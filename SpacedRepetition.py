@@ -0,0 +1,57 @@
+import time
+
+SECONDS_PER_DAY = 86400
+
+
+# Algorithme de répétition espacée
+class SM2:
+    """
+    Implémentation de l'algorithme SM-2 (SuperMemo 2).
+    Le nombre de bonnes réponses consécutives est le review_score de la carte,
+    l'intervalle est exprimé en jours et l'échéance en secondes (epoch).
+    """
+    DEFAULT_EASE = 2.5
+    MIN_EASE = 1.3
+
+    def __init__(self, correct_quality=4, incorrect_quality=1):
+        """
+        :param correct_quality: Qualité SM-2 (0 à 5) attribuée à une bonne réponse.
+        :param incorrect_quality: Qualité SM-2 (0 à 5) attribuée à une mauvaise réponse.
+        """
+        self.correct_quality = correct_quality
+        self.incorrect_quality = incorrect_quality
+
+    def interval_for(self, repetitions, ease=DEFAULT_EASE):
+        """
+        Intervalle (en jours) après un nombre donné de bonnes réponses consécutives,
+        en supposant une facilité constante. Sert à migrer les anciens scores.
+        """
+        interval = 0
+        for repetition in range(1, repetitions + 1):
+            interval = self._next_interval(repetition, interval, ease)
+        return interval
+
+    @staticmethod
+    def _next_interval(repetition, interval, ease):
+        if repetition == 1:
+            return 1
+        if repetition == 2:
+            return 6
+        return round(interval * ease)
+
+    def review(self, ease, interval, repetitions, is_correct, now=None):
+        """
+        Calcule le nouvel état d'une carte après une révision.
+        :return: Tuple (ease, interval, repetitions, next_due).
+        """
+        now = time.time() if now is None else now
+        quality = self.correct_quality if is_correct else self.incorrect_quality
+        ease = max(self.MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        if quality >= 3:
+            repetitions += 1
+            interval = self._next_interval(repetitions, interval, ease)
+        else:
+            # Carte oubliée : elle redevient due immédiatement
+            repetitions = 0
+            interval = 0
+        return ease, interval, repetitions, now + interval * SECONDS_PER_DAY
@@ -0,0 +1,183 @@
+import tkinter as tk
+from collections import OrderedDict
+
+
+# Pagination des cartes d'une catégorie
+class CardPager:
+    """
+    Garde en cache un nombre borné de pages de cartes d'une catégorie.
+    Une page est lue par pagination sur clé à partir de la dernière carte de la page
+    précédente si elle est en cache, sinon à partir de la clé de fin de la page
+    précédente (DatabaseManager.get_page_keys). Ces clés sont lues en un seul parcours
+    de l'index au premier saut, puis gardées comme les pages : un saut ne coûte
+    ensuite qu'une lecture de page, quelle que soit la position.
+    """
+    def __init__(self, category_id, total, page_size=100, max_pages=8, user_id=None):
+        """
+        :param category_id: Catégorie parcourue.
+        :param total: Nombre de cartes de la catégorie.
+        :param page_size: Nombre de cartes par page.
+        :param max_pages: Nombre maximal de pages conservées (les moins récentes sont oubliées).
+        :param user_id: Utilisateur dont les scores ordonnent les cartes, None pour la progression partagée.
+        """
+        self.category_id = category_id
+        self.total = total
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.user_id = user_id
+        self.pages = OrderedDict()  # Index de page -> cartes, dans l'ordre d'utilisation
+        self.page_keys = None  # Clé de la dernière carte de chaque page, lue au premier saut
+
+    def pages_for(self, first, count, margin=0):
+        """
+        Retourne les index des pages couvrant les lignes [first, first + count),
+        élargies de margin lignes de chaque côté.
+        """
+        start = max(0, first - margin)
+        end = min(self.total, first + count + margin)
+        if end <= start:
+            return []
+        return list(range(start // self.page_size, (end - 1) // self.page_size + 1))
+
+    def missing_pages(self, first, count, margin=0):
+        return [page for page in self.pages_for(first, count, margin) if page not in self.pages]
+
+    def fetch_task(self, page_index):
+        """
+        Retourne une fonction qui lit la page depuis un DatabaseManager.
+        La clé de départ est déterminée maintenant, la lecture peut avoir lieu dans un autre thread.
+        """
+        category_id, limit, user_id = self.category_id, self.page_size, self.user_id
+        previous = self.pages.get(page_index - 1)
+
+        def fetch(db_manager):
+            if page_index == 0:
+                after = None
+            elif previous:
+                after = (previous[-1][3], previous[-1][0])
+            else:
+                if self.page_keys is None:  # Lectures sérialisées par le DatabaseWorker
+                    self.page_keys = db_manager.get_page_keys(category_id, limit, user_id=user_id)
+                if page_index > len(self.page_keys):
+                    return []
+                after = self.page_keys[page_index - 1]
+            return db_manager.get_cards_page(category_id, after, limit, user_id=user_id)
+        return fetch
+
+    def store(self, page_index, cards):
+        """
+        Ajoute une page au cache en oubliant les pages les moins récemment utilisées.
+        """
+        self.pages[page_index] = cards
+        self.pages.move_to_end(page_index)
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+
+    def rows(self, first, count):
+        """
+        Retourne les cartes des lignes [first, first + count) ; None pour une ligne pas encore lue.
+        """
+        rows = []
+        for position in range(first, min(self.total, first + count)):
+            page = self.pages.get(position // self.page_size)
+            if page is not None:
+                self.pages.move_to_end(position // self.page_size)
+            offset = position % self.page_size
+            rows.append(page[offset] if page is not None and offset < len(page) else None)
+        return rows
+
+
+# Liste virtualisée des cartes
+class VirtualCardList:
+    """
+    Liste Tkinter qui n'affiche et ne lit que les cartes visibles, plus une marge
+    de préchargement. Les lectures passent par un DatabaseWorker.
+    """
+    PLACEHOLDER = "..."
+
+    def __init__(self, parent, worker, height=10, width=50, page_size=100, prefetch=50):
+        """
+        :param parent: Widget parent.
+        :param worker: DatabaseWorker utilisé pour lire les pages.
+        :param height: Nombre de lignes visibles.
+        :param page_size: Nombre de cartes lues par requête.
+        :param prefetch: Nombre de lignes préchargées avant et après la zone visible.
+        """
+        self.worker = worker
+        self.height = height
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.pager = None
+        self.first = 0  # Première ligne visible
+        self._requested = set()
+
+        self.frame = tk.Frame(parent)
+        self.listbox = tk.Listbox(self.frame, selectmode="single", width=width, height=height)
+        self.scrollbar = tk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.listbox.pack(side="left")
+        self.scrollbar.pack(side="right", fill="y")
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1))
+        self.listbox.bind("<Up>", lambda event: self.scroll(-1))
+        self.listbox.bind("<Down>", lambda event: self.scroll(1))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def show_category(self, category_id, total):
+        """
+        Affiche les cartes d'une catégorie contenant total cartes.
+        """
+        self.pager = CardPager(category_id, total, self.page_size,
+                               max_pages=2 * (self.height + 2 * self.prefetch) // self.page_size + 4)
+        self._requested = set()
+        self.first = 0
+        self.render()
+
+    def yview(self, *args):
+        """
+        Gère les commandes de la barre de défilement (moveto, scroll units/pages).
+        """
+        if self.pager is None:
+            return
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * self.pager.total)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.height if args[2] == "pages" else 1)
+            self.first += step
+        self.render()
+
+    def scroll(self, lines):
+        if self.pager is not None:
+            self.first += lines
+            self.render()
+        return "break"
+
+    def render(self):
+        """
+        Affiche les lignes visibles et demande les pages manquantes.
+        """
+        pager = self.pager
+        self.first = max(0, min(self.first, max(0, pager.total - self.height)))
+        self.listbox.delete(0, tk.END)
+        for card in pager.rows(self.first, self.height):
+            self.listbox.insert(tk.END, self.PLACEHOLDER if card is None else f"{card[1]} - {card[2]}")
+        if pager.total:
+            self.scrollbar.set(self.first / pager.total, min(1.0, (self.first + self.height) / pager.total))
+        else:
+            self.scrollbar.set(0, 1)
+        for page_index in pager.missing_pages(self.first, self.height, self.prefetch):
+            if page_index not in self._requested:
+                self._request(pager, page_index)
+
+    def _request(self, pager, page_index):
+        def on_loaded(cards):
+            if pager is self.pager and self.frame.winfo_exists():
+                self._requested.discard(page_index)
+                pager.store(page_index, cards)
+                self.render()
+
+        self._requested.add(page_index)
+        # Pas de clé par page : les pages d'une même vue ne s'annulent pas entre elles
+        self.worker.submit(pager.fetch_task(page_index), on_loaded)
@@ -0,0 +1,161 @@
+"""
+Benchmark de révisions concurrentes : plusieurs utilisateurs révisent en même temps
+sur la même base SQLite.
+
+Chaque révision simulée a sa propre connexion (son DatabaseManager) et son propre
+utilisateur ; les réviseurs sont des threads ou des processus (--mode). Chacun répond
+en continu aux cartes dues de sa file et écrit ses réponses une par une
+(update_card_score) ou par lots (apply_grades, --batch). Affiche pour chaque
+scénario le débit, la latence p50/p99 d'une transaction d'écriture et le taux d'écritures
+échouées faute de verrou, ainsi que le nombre de transactions réessayées.
+
+Avec --compare, le scénario demandé est précédé du scénario historique : réponses
+une par une, sans nouvelle tentative après busy_timeout.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_concurrency --reviewers 8 --duration 5 --batch 20 --compare
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from DatabaseManager import DatabaseManager
+
+
+def make_database(path, cards, reviewers):
+    """
+    Crée une catégorie de cards cartes et un utilisateur par réviseur.
+    :return: (identifiant de la catégorie, identifiants des utilisateurs).
+    """
+    with DatabaseManager(path) as db_manager:
+        db_manager.setup_database()
+        db_manager.add_cards_bulk(("Révisions", f"Question {card}", f"Réponse {card}") for card in range(cards))
+        users = [db_manager.add_user(f"reviewer{reviewer}") for reviewer in range(reviewers)]
+        return db_manager.get_all_categories()[0][0], users
+
+
+def review(path, category_id, user_id, duration, batch, options, seed):
+    """
+    Révise pendant duration secondes sous un utilisateur.
+    :return: Dictionnaire : latences des écritures (secondes), réponses écrites,
+             écritures échouées faute de verrou, transactions réessayées.
+    """
+    rng = random.Random(seed + user_id)
+    latencies = []
+    grades = 0
+    lock_errors = 0
+    with DatabaseManager(path, **options) as db_manager:
+        queue = [card_id for card_id, _ in db_manager.get_card_keys_by_category(category_id, user_id=user_id)]
+        rng.shuffle(queue)
+        pending = []
+        deadline = time.perf_counter() + duration
+        position = 0
+        while time.perf_counter() < deadline:
+            pending.append((queue[position % len(queue)], rng.random() < 0.7, time.time()))
+            position += 1
+            if len(pending) < batch:
+                continue
+            start = time.perf_counter()
+            try:
+                if batch == 1:
+                    db_manager.update_card_score(*pending[0], user_id=user_id)
+                else:
+                    db_manager.apply_grades(pending, user_id=user_id)
+                grades += len(pending)
+            except sqlite3.OperationalError:
+                lock_errors += 1
+            latencies.append(time.perf_counter() - start)
+            pending = []
+        retries = db_manager.lock_retries
+    return {'latencies': latencies, 'grades': grades, 'lock_errors': lock_errors, 'retries': retries}
+
+
+def _review_process(results, *args):
+    results.put(review(*args))
+
+
+def run(path, category_id, users, duration, batch, options, mode='thread', seed=42):
+    """
+    Lance une révision par utilisateur, simultanément, et retourne leurs résultats cumulés.
+    """
+    arguments = [(path, category_id, user_id, duration, batch, options, seed) for user_id in users]
+    if mode == 'process':
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_review_process, args=(results,) + args) for args in arguments]
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    else:
+        reports = [None] * len(users)
+
+        def target(index):
+            reports[index] = review(*arguments[index])
+        workers = [threading.Thread(target=target, args=(index,)) for index in range(len(users))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    total = {'latencies': [], 'grades': 0, 'lock_errors': 0, 'retries': 0}
+    for report in reports:
+        total['latencies'].extend(report['latencies'])
+        for name in ('grades', 'lock_errors', 'retries'):
+            total[name] += report[name]
+    total['latencies'].sort()
+    return total
+
+
+def percentile(values, fraction):
+    """
+    Percentile d'une liste triée (0 si elle est vide).
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviewers", type=int, default=8)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--duration", type=float, default=5.0, help="durée de chaque scénario, en secondes")
+    parser.add_argument("--batch", type=int, default=20, help="réponses par transaction")
+    parser.add_argument("--retries", type=int, default=5, help="nouvelles tentatives d'une écriture verrouillée")
+    parser.add_argument("--busy-timeout", type=float, default=0.1,
+                        help="attente de SQLite sur une base verrouillée, en secondes")
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--compare", action="store_true",
+                        help="mesure d'abord le scénario historique (une réponse par transaction, sans reprise)")
+    args = parser.parse_args()
+
+    scenarios = []
+    if args.compare:
+        scenarios.append(("historique", 1, {'busy_timeout': args.busy_timeout, 'write_retries': 0}))
+    scenarios.append((f"lots de {args.batch}, {args.retries} reprises", args.batch,
+                      {'busy_timeout': args.busy_timeout, 'write_retries': args.retries}))
+
+    work_dir = tempfile.mkdtemp(prefix='bench_concurrency_')
+    try:
+        for index, (name, batch, options) in enumerate(scenarios):
+            path = os.path.join(work_dir, f'scenario{index}.db')
+            category_id, users = make_database(path, args.cards, args.reviewers)
+            total = run(path, category_id, users, args.duration, batch, options, args.mode)
+            writes = len(total['latencies'])
+            error_rate = total['lock_errors'] / writes if writes else 0.0
+            print(f"{name} ({args.reviewers} {'processus' if args.mode == 'process' else 'threads'}) : "
+                  f"{total['grades'] / args.duration:,.0f} réponses/s, transaction p50 {percentile(total['latencies'], 0.5) * 1000:.2f} ms / "
+                  f"p99 {percentile(total['latencies'], 0.99) * 1000:.2f} ms, "
+                  f"{total['lock_errors']} échecs de verrou ({error_rate:.2%}), {total['retries']} reprises")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
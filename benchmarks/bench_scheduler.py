@@ -0,0 +1,88 @@
+"""
+Benchmark du débit d'une session de révision sur une grande catégorie.
+
+Compare l'ancienne file (liste Python + list.pop(index) + rotation d'index)
+au tas binaire de ReviewScheduler, hors base de données.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_scheduler --cards 100000 --grades 200000
+"""
+import argparse
+import random
+import time
+
+from ReviewScheduler import ReviewScheduler
+
+
+def make_cards(count, seed):
+    rng = random.Random(seed)
+    cards = [(i, f"Q{i}", f"A{i}", rng.randint(0, 10)) for i in range(count)]
+    cards.sort(key=lambda card: card[3])  # Ordre renvoyé par la requête SQL
+    return cards
+
+
+def make_grades(count, seed, success_rate=0.7):
+    rng = random.Random(seed)
+    return [rng.random() < success_rate for _ in range(count)]
+
+
+def run_list_session(cards, grades):
+    """
+    Reproduit l'ancienne logique de CardManager.
+    """
+    cards = list(cards)
+    cards.sort(key=lambda card: card[3])
+    index = 0
+    graded = 0
+    for is_correct in grades:
+        if not cards:
+            break
+        if is_correct:
+            cards.pop(index)
+            if index >= len(cards):
+                index = 0
+        else:
+            index = (index + 1) % len(cards) if len(cards) > 1 else 0
+        graded += 1
+    return graded
+
+
+def run_heap_session(cards, grades):
+    scheduler = ReviewScheduler()
+    scheduler.load(cards)
+    graded = 0
+    for is_correct in grades:
+        if not scheduler:
+            break
+        if is_correct:
+            scheduler.pop()
+        else:
+            card_id, question, answer, _ = scheduler.peek()
+            scheduler.reschedule((card_id, question, answer, 0))
+        graded += 1
+    return graded
+
+
+def measure(function, cards, grades):
+    start = time.perf_counter()
+    graded = function(cards, grades)
+    elapsed = time.perf_counter() - start
+    return graded, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=100_000)
+    parser.add_argument("--grades", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    cards = make_cards(args.cards, args.seed)
+    grades = make_grades(args.grades, args.seed)
+    for name, function in (("liste", run_list_session), ("tas", run_heap_session)):
+        graded, elapsed = measure(function, cards, grades)
+        print(f"{name:>6} : {graded} notes en {elapsed:.3f} s ({graded / elapsed:,.0f} notes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Client de charge du service de révision HTTP (ReviewServer).
+
+Chaque client simulé ouvre une session de révision sous son propre utilisateur
+puis enchaîne carte suivante / réponse, en recommençant une session quand la
+précédente est terminée. Affiche le débit en requêtes par seconde et la latence
+p50/p99 de chaque type de requête, avec ou sans connexions persistantes.
+
+Sans --url, un serveur est lancé dans le processus sur une base temporaire.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_server --clients 8 --duration 5
+    python -m benchmarks.bench_server --url http://127.0.0.1:8000 --no-keep-alive
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from DatabaseManager import DatabaseManager
+from ReviewServer import ReviewServer
+
+
+class Client:
+    """
+    Client JSON minimal ; avec keep_alive, une seule connexion sert toutes les requêtes.
+    """
+    def __init__(self, host, port, keep_alive=True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.connection = None
+        self.latencies = {}  # Requête -> durées (secondes)
+        self.errors = 0
+
+    def request(self, name, method, path, body=None):
+        start = time.perf_counter()
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        headers = {'Content-Type': 'application/json'}
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        try:
+            self.connection.request(method, path, None if body is None else json.dumps(body), headers)
+            response = self.connection.getresponse()
+            result = json.loads(response.read())
+        finally:
+            if not self.keep_alive:
+                self.close()
+        self.latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if response.status >= 400:
+            self.errors += 1
+            return None
+        return result
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def review(client, category_id, user, deadline, rng):
+    """
+    Révise jusqu'à deadline, en ouvrant une nouvelle session à chaque fin de session.
+    """
+    session = None
+    while time.perf_counter() < deadline:
+        if session is None:
+            created = client.request('session', 'POST', '/sessions',
+                                     {'category_id': category_id, 'user': user, 'due_only': False})
+            if created is None:
+                break
+            session = created['session']
+        card = client.request('next', 'GET', f'/sessions/{session}/next')
+        if card is None or card['card'] is None:
+            session = None
+            continue
+        client.request('grade', 'POST', f'/sessions/{session}/grade', {'correct': rng.random() < 0.7})
+    client.close()
+
+
+def run(host, port, category_id, clients, duration, keep_alive=True, seed=42):
+    """
+    Lance les clients simultanés et retourne (latences par requête triées, erreurs).
+    """
+    deadline = time.perf_counter() + duration
+    workers = [Client(host, port, keep_alive) for _ in range(clients)]
+    threads = [threading.Thread(target=review, args=(client, category_id, f"client{index}", deadline,
+                                                     random.Random(seed + index)))
+               for index, client in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = {}
+    for client in workers:
+        for name, values in client.latencies.items():
+            latencies.setdefault(name, []).extend(values)
+    for values in latencies.values():
+        values.sort()
+    return latencies, sum(client.errors for client in workers)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="serveur à tester, par exemple http://127.0.0.1:8000")
+    parser.add_argument("--category", type=int, help="catégorie révisée (avec --url), la première par défaut")
+    parser.add_argument("--clients", type=int, default=8,
+                        help="clients simultanés ; avec des connexions persistantes, au plus --workers "
+                             "sont servis à la fois")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=8, help="threads du serveur lancé localement")
+    parser.add_argument("--cards", type=int, default=200, help="cartes de la base temporaire")
+    parser.add_argument("--no-keep-alive", dest="keep_alive", action="store_false",
+                        help="une connexion TCP par requête")
+    args = parser.parse_args()
+
+    work_dir = server = None
+    try:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+            category_id = args.category
+            if category_id is None:
+                connection = http.client.HTTPConnection(host, port)
+                connection.request('GET', '/categories')
+                category_id = json.loads(connection.getresponse().read())[0]['id']
+                connection.close()
+        else:
+            work_dir = tempfile.mkdtemp(prefix='bench_server_')
+            db_name = os.path.join(work_dir, 'bench.db')
+            with DatabaseManager(db_name) as db_manager:
+                db_manager.setup_database()
+                db_manager.add_cards_bulk(("Révisions", f"Question {card}", f"Réponse {card}")
+                                          for card in range(args.cards))
+                category_id = db_manager.get_all_categories()[0][0]
+            server = ReviewServer(('127.0.0.1', 0), db_name, workers=args.workers)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            host, port = server.server_address[:2]
+
+        latencies, errors = run(host, port, category_id, args.clients, args.duration, args.keep_alive)
+        total = sum(len(values) for values in latencies.values())
+        print(f"{args.clients} clients, {'connexions persistantes' if args.keep_alive else 'une connexion par requête'} : "
+              f"{total / args.duration:,.0f} requêtes/s, {errors} erreurs")
+        for name, values in sorted(latencies.items()):
+            print(f"  {name:>8} : {len(values):7d} requêtes, p50 {percentile(values, 0.5) * 1000:.2f} ms, "
+                  f"p99 {percentile(values, 0.99) * 1000:.2f} ms")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
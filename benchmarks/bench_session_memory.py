@@ -0,0 +1,149 @@
+"""
+Benchmark de la mémoire d'une session de révision sur une grande catégorie.
+
+Compare la session complète (ReviewScheduler chargée avec les tuples
+(id, question, answer, review_score)), la session compacte (CompactReviewScheduler :
+identifiants et scores en tableaux, textes lus à la demande dans un CardTextCache)
+et la révision mixte (MergedReviewScheduler : cartes lues page par page).
+Mesure avec tracemalloc la mémoire retenue par la session après le chargement,
+ainsi que la durée du chargement et le débit des réponses (sans écriture en base).
+La session mixte est aussi mesurée pendant et après un passage complet de la
+catégorie : elle garde les cartes ratées et les identifiants des cartes notées
+encore devant le curseur de lecture, oubliés à mesure que la lecture avance.
+
+Mesure de référence (100 000 cartes, reprise dans la documentation de
+CompactReviewScheduler) : complète ~55 Mo (~547 octets par carte), compacte ~5 Mo
+(~49 octets par carte, index card_id -> case compris), mixte ~0,05 Mo après le
+chargement (une page par catégorie), ~0,03 Mo après un passage complet, avec un pic
+de ~30 Mo pendant le passage (30 % de cartes ratées gardées avec leurs textes).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_session_memory --cards 100000
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from CardManager import CardManager
+from DatabaseManager import DatabaseManager
+
+
+def make_database(path, count, seed):
+    """
+    Crée une catégorie de count cartes dont les textes font de 40 à 120 caractères.
+    """
+    rng = random.Random(seed)
+    with DatabaseManager(path) as db_manager:
+        db_manager.setup_database()
+        db_manager.add_cards_bulk(("Grande catégorie",
+                                   f"Question {card} " + "q" * rng.randint(30, 110),
+                                   f"Réponse {card} " + "r" * rng.randint(30, 110))
+                                  for card in range(count))
+        return db_manager.get_all_categories()[0][0]
+
+
+class _NoGrades:
+    """
+    Tampon de réponses qui ignore les réponses : seul le coût de la session est mesuré.
+    """
+    db_manager = None
+
+    def record(self, card_id, is_correct):
+        pass
+
+    def flush(self, db_manager=None):
+        pass
+
+
+def measure_session(db_manager, category_id, mode, grades, seed):
+    """
+    Charge la catégorie dans une session ('complète', 'compacte' ou 'mixte') et retourne
+    (octets retenus, durée du chargement, réponses par seconde).
+    """
+    card_manager = CardManager(grade_buffer=_NoGrades(), db_manager=db_manager, compact=mode == "compacte")
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "mixte":
+        card_manager.load_mixed_cards([category_id])
+    else:
+        card_manager.load_cards(category_id)
+    card_manager.get_next_card()  # Textes de la tête de file (et des suivantes) pour la session compacte
+    load_time = time.perf_counter() - start
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(grades):
+        if not card_manager.cards:
+            break
+        card_manager.get_next_card()[1]  # Question affichée
+        if rng.random() < 0.7:
+            card_manager.mark_card_as_correct()
+        else:
+            card_manager.mark_card_as_incorrect()
+    elapsed = time.perf_counter() - start
+    return retained, load_time, grades / elapsed if elapsed else 0.0
+
+
+def measure_full_pass(db_manager, category_id, seed):
+    """
+    Révise toute la catégorie en session mixte (70 % de bonnes réponses, chaque carte
+    ratée l'étant une seule fois) et retourne (octets retenus après le passage, pic
+    pendant le passage, nombre de cartes présentées).
+    """
+    card_manager = CardManager(grade_buffer=_NoGrades(), db_manager=db_manager)
+    rng = random.Random(seed)
+    failed = set()
+    gc.collect()
+    tracemalloc.start()
+    card_manager.load_mixed_cards([category_id])
+    shown = 0
+    while card_manager.cards:
+        card_id = card_manager.get_next_card()[0]
+        shown += 1
+        if card_id not in failed and rng.random() >= 0.7:
+            failed.add(card_id)
+            card_manager.mark_card_as_incorrect()
+        else:
+            card_manager.mark_card_as_correct()
+    failed = None
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, peak, shown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=100_000)
+    parser.add_argument("--grades", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_memory_')
+    try:
+        path = os.path.join(work_dir, 'bench.db')
+        category_id = make_database(path, args.cards, args.seed)
+        with DatabaseManager(path) as db_manager:
+            for name in ("complète", "compacte", "mixte"):
+                retained, load_time, rate = measure_session(db_manager, category_id, name, args.grades, args.seed)
+                print(f"{name:>9} : {retained / 1e6:7.2f} Mo pour {args.cards} cartes "
+                      f"({retained / args.cards:.0f} octets/carte), chargement {load_time:.3f} s, "
+                      f"{rate:,.0f} réponses/s")
+            retained, peak, shown = measure_full_pass(db_manager, category_id, args.seed)
+            print(f"{'mixte':>9} : {retained / 1e6:7.2f} Mo après un passage complet ({shown} cartes présentées), "
+                  f"pic {peak / 1e6:.2f} Mo")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Benchmark des couches de stockage (DatabaseManager) et de session
+(CategoryManager, CardManager) sur une base synthétique.
+
+La base est générée une seule fois par jeu de paramètres dans --cache-dir, puis
+copiée avant chaque exécution : toutes les mesures partent du même état.
+Aucune fenêtre Tk n'est créée.
+
+Mesures : chargement des catégories, chargement des cartes, débit des réponses
+(écriture directe et via GradeBuffer), suppression puis rechargement, requêtes
+de statistiques. Les résultats sont écrits en JSON ; avec --baseline, chaque
+mesure est comparée à une exécution de référence et le programme se termine
+avec le code 1 si l'une d'elles est plus lente que la tolérance (--tolerance).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_storage --categories 1000 --cards 1000 --output results.json
+    python -m benchmarks.bench_storage --categories 1000 --cards 1000 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from CachedStore import CachedStore
+from CardManager import CardManager
+from CategoryManager import CategoryManager
+from DatabaseManager import DatabaseManager
+from GradeBuffer import GradeBuffer
+
+
+def make_database(path, categories, cards_per_category, seed):
+    """
+    Crée une base de categories × cards_per_category cartes, avec une partie des cartes déjà révisées.
+    """
+    rng = random.Random(seed)
+    with DatabaseManager(path) as db_manager:
+        db_manager.setup_database()
+        for category in range(categories):
+            name = f"Catégorie {category:05d}"
+            db_manager.add_cards_bulk((name, f"Question {category}-{card} {rng.random():.6f}", f"Réponse {card}")
+                                      for card in range(cards_per_category))
+        # Quelques révisions pour avoir des scores et des échéances variés
+        card_count = categories * cards_per_category
+        grades = [(rng.randint(1, card_count), rng.random() < 0.7, 1_000_000.0 + i)
+                  for i in range(min(card_count, 10_000))]
+        db_manager.apply_grades(grades)
+
+
+def cached_database(cache_dir, categories, cards_per_category, seed):
+    """
+    Retourne le chemin de la base de référence, générée si elle n'existe pas encore.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"bench_{categories}x{cards_per_category}_{seed}.db")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        make_database(path + '.tmp', categories, cards_per_category, seed)
+        os.replace(path + '.tmp', path)
+        print(f"Base générée en {time.perf_counter() - start:.1f} s : {path}", file=sys.stderr)
+    return path
+
+
+def measure(function, repeat):
+    """
+    Exécute function repeat fois. function retourne le nombre d'opérations effectuées.
+    """
+    timings = []
+    operations = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = function()
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        'operations': operations,
+        'median_s': median,
+        'min_s': min(timings),
+        'ops_per_s': operations / median if median else 0.0,
+    }
+
+
+def run_suite(db_path, sample=20, grades=2000, repeat=5, seed=42, journal_dir=None, cache=False):
+    """
+    Exécute toutes les mesures sur la base db_path (modifiée par les mesures d'écriture).
+    :param cache: Si True, les managers partagent un CachedStore au lieu du DatabaseManager.
+    :return: Dictionnaire nom de la mesure -> résultats de measure.
+    """
+    rng = random.Random(seed)
+    db_manager = DatabaseManager(db_path)
+    if cache:
+        db_manager = CachedStore(db_manager)
+    db_manager.setup_database()
+    category_ids = [category_id for category_id, _ in db_manager.get_all_categories()]
+    sampled = rng.sample(category_ids, min(sample, len(category_ids)))
+    journal_dir = journal_dir or tempfile.mkdtemp(prefix='bench_journal_')
+    results = {}
+
+    category_manager = CategoryManager(load=False, db_manager=db_manager)
+    card_manager = CardManager(db_manager=db_manager)
+
+    def category_load():
+        category_manager.set_categories(db_manager.get_all_categories())
+        category_manager.set_card_counts(db_manager.get_category_card_counts())
+        return len(category_manager.categories)
+    results['category_load'] = measure(category_load, repeat)
+
+    def card_load():
+        loaded = 0
+        for category_id in sampled:
+            card_manager.load_cards(category_id)
+            loaded += len(card_manager.cards)
+        return loaded
+    results['card_load'] = measure(card_load, repeat)
+
+    def due_card_load():
+        loaded = 0
+        for category_id in sampled:
+            card_manager.load_due_cards(category_id, now=2_000_000.0)
+            loaded += len(card_manager.cards)
+        return loaded
+    results['due_card_load'] = measure(due_card_load, repeat)
+
+    answers = [rng.random() < 0.7 for _ in range(grades)]
+
+    def grade_session(manager, count):
+        manager.load_cards(sampled[0])
+        graded = 0
+        for is_correct in answers[:count]:
+            if not manager.cards:
+                break
+            if is_correct:
+                manager.mark_card_as_correct()
+            else:
+                manager.mark_card_as_incorrect()
+            graded += 1
+        manager.flush_grades()
+        return graded
+
+    # Une transaction par réponse : mesuré sur moins de réponses
+    results['grade_direct'] = measure(lambda: grade_session(card_manager, max(1, grades // 10)), repeat)
+
+    grade_buffer = GradeBuffer(db_manager, journal_path=os.path.join(journal_dir, 'grades.journal'))
+    buffered_manager = CardManager(grade_buffer=grade_buffer, db_manager=db_manager)
+    results['grade_buffered'] = measure(lambda: grade_session(buffered_manager, grades), repeat)
+    grade_buffer.close()
+
+    def delete_reload():
+        deleted = 0
+        for category_id in sampled:
+            cards = db_manager.get_cards_page(category_id, limit=1)
+            if cards:
+                db_manager.delete_card(cards[0][0])
+                category_manager.invalidate_card_count(category_id)
+                card_manager.load_cards(category_id)
+                category_manager.get_card_count(category_id)
+                deleted += 1
+        return deleted
+    results['delete_reload'] = measure(delete_reload, repeat)
+
+    def stats_queries():
+        db_manager.get_global_stats()
+        db_manager.get_daily_review_stats(30)
+        for category_id in sampled:
+            db_manager.get_category_review_stats(category_id)
+        return len(sampled) + 2
+    results['stats_queries'] = measure(stats_queries, repeat)
+
+    db_manager.close()
+    shutil.rmtree(journal_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare les meilleurs temps aux résultats de référence (le minimum est moins
+    sensible que la médiane aux perturbations de la machine).
+    :return: Liste de (mesure, temps de référence, temps actuel) pour chaque régression.
+    """
+    regressions = []
+    for name, reference in baseline.get('results', {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current['min_s'] > reference['min_s'] * (1 + tolerance):
+            regressions.append((name, reference['min_s'], current['min_s']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--cards", type=int, default=1000, help="cartes par catégorie")
+    parser.add_argument("--sample", type=int, default=20, help="catégories utilisées par les mesures")
+    parser.add_argument("--grades", type=int, default=2000, help="réponses par mesure de débit")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "flashcards_bench"))
+    parser.add_argument("--cache", action="store_true", help="mesure à travers un CachedStore")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="fichier JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="ralentissement toléré par rapport à la référence (0.3 = 30 %%)")
+    args = parser.parse_args(argv)
+
+    parameters = {name: getattr(args, name) for name in ('categories', 'cards', 'sample', 'grades', 'repeat', 'seed', 'cache')}
+    template = cached_database(args.cache_dir, args.categories, args.cards, args.seed)
+    work_dir = tempfile.mkdtemp(prefix='bench_run_')
+    try:
+        db_path = os.path.join(work_dir, 'bench.db')
+        shutil.copyfile(template, db_path)
+        results = run_suite(db_path, args.sample, args.grades, args.repeat, args.seed, cache=args.cache)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'parameters': parameters,
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    for name, result in results.items():
+        print(f"{name:>15} : {result['median_s'] * 1000:9.2f} ms ({result['ops_per_s']:,.0f} op/s)", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('parameters') != parameters:
+            print("Attention : paramètres différents de la référence", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, reference, current in regressions:
+            print(f"RÉGRESSION {name} : {current * 1000:.2f} ms contre {reference * 1000:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
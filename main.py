@@ -1,8 +1,106 @@
-from FlashcardApp import FlashcardApp
-import tkinter as tk
+import time
+
+STARTED_AT = time.perf_counter()  # Référence des mesures de démarrage, avant les imports
+
+import argparse
+import json
+import logging
+import sys
+
+STARTUP_TIMEOUT_MS = 30000
+
+
+def measure_startup(root, app, imports_done):
+    """
+    Attend la fin du démarrage, affiche les temps de chaque étape puis ferme l'application.
+    """
+    def check():
+        waited = (time.perf_counter() - STARTED_AT) * 1000
+        if all(milestone in app.startup_times for milestone in app.STARTUP_MILESTONES) \
+                or waited > STARTUP_TIMEOUT_MS:
+            report = {"imports": imports_done}
+            report.update(app.startup_times)
+            print(json.dumps({name: round(seconds * 1000, 1) for name, seconds in report.items()}))
+            app.on_closing()
+        else:
+            root.after(10, check)
+    root.after(10, check)
+
 
 # Lancement de l'application
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = FlashcardApp(root)
-    root.mainloop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Application de révision par flashcards")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="recalcule les statistiques à partir du journal des révisions et des cartes puis quitte")
+    parser.add_argument("--deduplicate", action="store_true",
+                        help="fusionne les cartes en double de chaque catégorie puis quitte")
+    parser.add_argument("--metrics", metavar="FICHIER",
+                        help="mesure les accès à la base et écrit les mesures à la fermeture "
+                             "(JSON si le fichier se termine par .json, sinon format Prometheus)")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="journalise les requêtes plus lentes que ce seuil avec leur plan d'exécution")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="répartit les catégories entre ce nombre de fichiers SQLite")
+    parser.add_argument("--user", metavar="NOM",
+                        help="révise sous ce nom d'utilisateur, avec sa propre progression et ses statistiques")
+    parser.add_argument("--serve", metavar="[HÔTE:]PORT",
+                        help="lance le service de révision HTTP (sans interface graphique) sur cette adresse")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="nombre de threads (et de connexions SQLite) du service HTTP")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="affiche en millisecondes la durée de chaque étape du démarrage "
+                             "(dont 'interactive' : fenêtre utilisable) puis quitte")
+    args = parser.parse_args()
+
+    instrumentation = None
+    if args.metrics or args.slow_query_ms is not None:
+        from Instrumentation import Instrumentation
+        logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s")
+        threshold = None if args.slow_query_ms is None else args.slow_query_ms / 1000
+        instrumentation = Instrumentation(slow_query_threshold=threshold)
+
+    if args.shards > 1:
+        from ShardedDatabaseManager import ShardedDatabaseManager
+        store_factory = lambda: ShardedDatabaseManager(shards=args.shards, instrumentation=instrumentation)
+    else:
+        from DatabaseManager import DatabaseManager
+        store_factory = lambda: DatabaseManager(instrumentation=instrumentation)
+
+    if args.rebuild_stats:
+        with store_factory() as db_manager:
+            db_manager.setup_database()
+            db_manager.rebuild_review_stats()
+            db_manager.rebuild_category_stats()
+    elif args.serve:
+        if args.shards > 1:
+            parser.error("--serve utilise une base en fichier unique")
+        from ReviewServer import ReviewServer
+        logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s", level=logging.INFO)
+        host, _, port = args.serve.rpartition(':')
+        with ReviewServer((host or '127.0.0.1', int(port)), workers=args.workers,
+                          instrumentation=instrumentation) as server:
+            print(f"Service de révision sur http://{server.server_address[0]}:{server.server_address[1]}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    elif args.deduplicate:
+        with store_factory() as db_manager:
+            db_manager.setup_database()
+            processed, removed = db_manager.deduplicate_cards()
+            print(f"{processed} cartes vérifiées, {removed} doublons supprimés")
+    else:
+        # L'interface n'est importée que si elle est affichée
+        import tkinter as tk
+        from FlashcardApp import FlashcardApp
+
+        imports_done = time.perf_counter() - STARTED_AT
+        root = tk.Tk()
+        app = FlashcardApp(root, store_factory=store_factory, started_at=STARTED_AT, user=args.user)
+        if args.measure_startup:
+            measure_startup(root, app, imports_done)
+        root.mainloop()
+
+    if args.metrics:
+        instrumentation.write(args.metrics)
+    sys.exit(0)
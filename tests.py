@@ -1,8 +1,37 @@
 import unittest
+import asyncio
+import contextlib
+import http.client
+import io
+import json
 import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
 from DatabaseManager import DatabaseManager
+from AsyncDatabaseManager import AsyncDatabaseManager
+from ShardedDatabaseManager import ShardedDatabaseManager
 from CategoryManager import CategoryManager
 from CardManager import CardManager
+from CachedStore import CachedStore
+from DeckImporter import DeckImporter
+from DeckPack import DeckPack
+from GradeBuffer import GradeBuffer
+from DatabaseWorker import DatabaseWorker
+from VirtualCardList import CardPager
+from Instrumentation import Instrumentation
+from ReviewServer import ReviewServer
+from benchmarks import bench_concurrency, bench_storage
+import main
+
+
+def remove_test_db(db_name):
+    """Supprime la db de test ainsi que les fichiers annexes du mode WAL"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
 
 class TestDatabaseManager(unittest.TestCase):
     def setUp(self):
@@ -14,8 +43,7 @@ class TestDatabaseManager(unittest.TestCase):
     def tearDown(self):
         """Destruction de la db temporaire pour les tests"""
         self.db_manager._disconnect()
-        if os.path.exists(self.test_db_name):
-            os.remove(self.test_db_name)
+        remove_test_db(self.test_db_name)
 
     def test_add_category(self):
         """Test d'ajout d'une catégorie"""
@@ -76,6 +104,491 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertEqual(updated_stats[2], 2)  # total_incorrect
         self.assertEqual(updated_stats[3], 7)  # total_reviewed
 
+    def test_review_log_aggregates(self):
+        """Test du journal des révisions et des agrégats maintenus par trigger"""
+        self.db_manager.update_global_stats(5, 2, 7)  # Totaux historiques
+        category_id = self.db_manager.add_category("Test Category")
+        self.db_manager.add_card(category_id, "Q1", "A1")
+        self.db_manager.add_card(category_id, "Q2", "A2")
+        card_ids = [card[0] for card in self.db_manager.get_cards_by_category(category_id)]
+        now = 1_000_000.0
+        self.db_manager.update_card_score(card_ids[0], True, now)
+        self.db_manager.apply_grades([(card_ids[1], False, now), (card_ids[0], True, now + 86400)])
+        self.db_manager.record_session()
+
+        log = self.db_manager._connection.execute("SELECT card_id, is_correct FROM review_log ORDER BY id").fetchall()
+        self.assertEqual(log, [(card_ids[0], 1), (card_ids[1], 0), (card_ids[0], 1)])
+        self.assertEqual(self.db_manager.get_global_stats(), (2, 7, 3, 10))
+        self.assertEqual(self.db_manager.get_category_review_stats(category_id), (2, 1))
+        self.assertEqual([day[1:] for day in self.db_manager.get_daily_review_stats()], [(1, 0), (1, 1)])
+
+        aggregates = self.db_manager._connection.execute("SELECT * FROM review_stats ORDER BY 1, 2").fetchall()
+        self.db_manager.rebuild_review_stats()
+        self.assertEqual(self.db_manager._connection.execute("SELECT * FROM review_stats ORDER BY 1, 2").fetchall(),
+                         aggregates)
+
+    def test_persistent_connection_is_reused(self):
+        """Test de la connexion persistante entre les appels"""
+        self.db_manager.add_category("Test Category")
+        connection = self.db_manager._connection
+        self.assertIsNotNone(connection)
+        self.db_manager.get_all_categories()
+        self.assertIs(self.db_manager._connection, connection)
+        journal_mode = connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(journal_mode, 'wal')
+
+    def test_legacy_mode_closes_connection(self):
+        """Test du mode historique : une connexion par appel"""
+        legacy_manager = DatabaseManager(self.test_db_name, persistent=False)
+        legacy_manager.add_category("Test Category")
+        self.assertIsNone(legacy_manager._connection)
+        self.assertEqual(len(legacy_manager.get_all_categories()), 1)
+
+    def test_context_manager_closes_connection(self):
+        """Test de la fermeture via le gestionnaire de contexte"""
+        with DatabaseManager(self.test_db_name) as db_manager:
+            db_manager.add_category("Test Category")
+            self.assertIsNotNone(db_manager._connection)
+        self.assertIsNone(db_manager._connection)
+
+    def test_add_cards_bulk(self):
+        """Test d'ajout en masse avec création des catégories"""
+        inserted = self.db_manager.add_cards_bulk([("Cat A", "Q1", "A1"), ("Cat B", "Q2", "A2"), ("Cat A", "Q3", "A3")])
+        self.assertEqual(inserted, 3)
+        categories = dict((name, category_id) for category_id, name in self.db_manager.get_all_categories())
+        self.assertEqual(len(self.db_manager.get_cards_by_category(categories["Cat A"])), 2)
+        self.assertEqual(len(self.db_manager.get_cards_by_category(categories["Cat B"])), 1)
+
+    def test_duplicate_policies(self):
+        """Test de la détection des doublons par empreinte du contenu normalisé"""
+        from DatabaseManager import DuplicateCardError
+        category_id = self.db_manager.add_category("Test Category")
+        other_id = self.db_manager.add_category("Autre")
+        card_id = self.db_manager.add_card(category_id, "Capitale de la France ?", "Paris")
+        self.assertEqual(self.db_manager.add_card(category_id, "  capitale DE LA france ? ", "paris"), card_id)
+        self.assertNotEqual(self.db_manager.add_card(other_id, "Capitale de la France ?", "Paris"), card_id)
+        with self.assertRaises(DuplicateCardError) as context:
+            self.db_manager.add_card(category_id, "Capitale de la France ?", "PARIS", on_duplicate='report')
+        self.assertEqual(context.exception.card_id, card_id)
+        self.db_manager.add_card(category_id, "Capitale de la France ?", "PARIS", on_duplicate='update')
+        self.assertEqual(self.db_manager.get_cards_by_category(category_id), [(card_id, "Capitale de la France ?", "PARIS", 0)])
+        inserted = self.db_manager.add_cards_bulk([("Test Category", "capitale de la france ?", "paris"),
+                                                   ("Test Category", "Q2", "A2"), ("Test Category", "q2", "a2")])
+        self.assertEqual(inserted, 1)
+        self.assertEqual(self.db_manager.count_cards(category_id), 2)
+
+    def test_deduplicate_existing_cards(self):
+        """Test de la fusion des doublons antérieurs à l'empreinte, en gardant la meilleure progression"""
+        category_id = self.db_manager.add_category("Test Category")
+        connection = self.db_manager._connection
+        connection.executemany("INSERT INTO flashcards (category_id, question, answer, review_score, interval) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               [(category_id, "Q1", "A1", 1, 1.0), (category_id, "q1 ", "a1", 3, 15.0),
+                                (category_id, "Q1", "A1", 2, 6.0), (category_id, "Q2", "A2", 0, 0.0)])
+        connection.commit()
+        self.assertEqual(self.db_manager.deduplicate_cards(chunk_size=3), (4, 2))
+        cards = self.db_manager.get_cards_by_category(category_id)
+        self.assertEqual([(card[1], card[3]) for card in cards], [("Q2", 0), ("Q1", 3)])
+        self.assertEqual(connection.execute("SELECT interval FROM flashcards WHERE question = 'Q1'").fetchone()[0], 15.0)
+        self.assertEqual(self.db_manager.deduplicate_cards(), (0, 0))
+        self.assertEqual(len(self.db_manager.search_cards("Q1")), 1)
+
+    def test_deduplicate_keeps_user_progress(self):
+        """Test de la fusion des progressions par utilisateur lors de la suppression d'un doublon"""
+        category_id = self.db_manager.add_category("Test Category")
+        alice, bob = self.db_manager.add_user("alice"), self.db_manager.add_user("bob")
+        connection = self.db_manager._connection
+        connection.executemany("INSERT INTO flashcards (category_id, question, answer) VALUES (?, ?, ?)",
+                               [(category_id, "Q1", "A1"), (category_id, "q1", "a1")])
+        kept, duplicate = [row[0] for row in connection.execute("SELECT id FROM flashcards ORDER BY id")]
+        connection.executemany("INSERT INTO user_progress (user_id, card_id, review_score, interval) VALUES (?, ?, ?, ?)",
+                               [(alice, kept, 1, 1.0), (alice, duplicate, 4, 30.0),
+                                (bob, kept, 3, 15.0), (bob, duplicate, 2, 6.0)])
+        connection.commit()
+        self.assertEqual(self.db_manager.deduplicate_cards(), (2, 1))
+        progress = connection.execute("SELECT user_id, card_id, review_score, interval FROM user_progress "
+                                      "ORDER BY user_id").fetchall()
+        self.assertEqual(progress, [(alice, kept, 4, 30.0), (bob, kept, 3, 15.0)])
+
+    def test_schema_migrations(self):
+        """Test des migrations versionnées et de l'index sur les cartes"""
+        from Migrations import SCHEMA_VERSION
+        self.assertEqual(self.db_manager.get_schema_version(), SCHEMA_VERSION)
+        self.db_manager.setup_database()  # Déjà à jour : ne doit rien faire
+        self.assertEqual(self.db_manager.get_schema_version(), SCHEMA_VERSION)
+        plan = self.db_manager._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM flashcards WHERE category_id = ? ORDER BY review_score", (1,)).fetchall()
+        self.assertIn("idx_flashcards_category_score", " ".join(row[-1] for row in plan))
+
+    def test_migrate_unversioned_database(self):
+        """Test de la migration d'une base créée avant le versionnage"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        connection = sqlite3.connect(self.test_db_name)
+        connection.execute("CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE)")
+        connection.execute("INSERT INTO categories (name) VALUES ('Ancienne')")
+        connection.commit()
+        connection.close()
+        self.db_manager.setup_database()
+        self.assertEqual(self.db_manager.get_all_categories(), [(1, 'Ancienne')])
+        self.assertEqual(self.db_manager.get_global_stats(), (0, 0, 0, 0))
+
+    def test_due_cards(self):
+        """Test de la requête des cartes dues et de la planification SM-2"""
+        self.db_manager.add_category("Test Category")
+        category_id = self.db_manager.get_all_categories()[0][0]
+        self.db_manager.add_card(category_id, "Q1", "A1")
+        self.db_manager.add_card(category_id, "Q2", "A2")
+        now = 1_000_000.0
+        card_id = self.db_manager.get_due_cards(category_id, now)[0][0]
+        self.db_manager.update_card_score(card_id, True, now)
+        due = self.db_manager.get_due_cards(category_id, now)
+        self.assertEqual([card[1] for card in due], ["Q2"])
+        # Un jour plus tard, la carte réussie est de nouveau due
+        self.assertEqual(len(self.db_manager.get_due_cards(category_id, now + 86400)), 2)
+        plan = self.db_manager._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM flashcards WHERE category_id = ? AND next_due <= ? ORDER BY next_due",
+            (category_id, now)).fetchall()
+        self.assertIn("idx_flashcards_category_due", " ".join(row[-1] for row in plan))
+
+    def test_category_stats_maintained(self):
+        """Test des statistiques par catégorie après un gros lot, un déplacement de carte et une migration"""
+        from DatabaseManager import DEFERRED_SEARCH_INDEX_ROWS
+        count = DEFERRED_SEARCH_INDEX_ROWS + 10
+        self.db_manager.add_cards_bulk([("A", f"Q{i}", "R") for i in range(count)] + [("B", "Q", "R")])
+        categories = {name: category_id for category_id, name in self.db_manager.get_all_categories()}
+        self.assertEqual(self.db_manager.get_category_card_counts(), {categories["A"]: count, categories["B"]: 1})
+        connection = self.db_manager._connection
+        connection.execute("UPDATE flashcards SET category_id = ? WHERE question = 'Q0'", (categories["B"],))
+        connection.commit()
+        self.assertEqual(self.db_manager.get_category_stats(categories["B"]), (2, 0, (2, 0, 0, 0, 0)))
+        self.db_manager.add_card(categories["A"], "Q0", "R")  # Les triggers ont été recréés
+        self.assertEqual(self.db_manager.count_cards(categories["A"]), count)
+        # Une base antérieure à la migration 10 retrouve ses statistiques
+        connection.execute("DROP TABLE category_stats")
+        connection.execute("PRAGMA user_version = 9")
+        connection.commit()
+        self.db_manager.setup_database()
+        self.assertEqual(self.db_manager.get_category_stats(categories["A"]), (count, 0, (count, 0, 0, 0, 0)))
+
+    def test_review_scores_migrated_to_intervals(self):
+        """Test de la migration des anciens review_score vers le modèle SM-2"""
+        from Migrations import MIGRATIONS
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        self.db_manager._connect()
+        for number in (1, 2):
+            self.db_manager._apply_migration(number, MIGRATIONS[number - 1])
+        self.db_manager._connection.execute("INSERT INTO categories (name) VALUES ('Cat')")
+        self.db_manager._connection.execute(
+            "INSERT INTO flashcards (category_id, question, answer, review_score) VALUES (1, 'Q', 'A', 3)")
+        self.db_manager._connection.commit()
+        self.db_manager.setup_database()
+        row = self.db_manager._connection.execute("SELECT review_score, interval, next_due FROM flashcards").fetchone()
+        self.assertEqual(row, (3, 15, 0))
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire avec quelques cartes"""
+        self.test_db_name = 'test_flashcards.db'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.db_manager.add_cards_bulk([("Géo", "Capitale de la France", "Paris"),
+                                        ("Géo", "Capitale de l'Italie", "Rome"),
+                                        ("Histoire", "Année de la prise de la Bastille", "1789 à Paris")])
+        self.categories = dict((name, category_id) for category_id, name in self.db_manager.get_all_categories())
+
+    def tearDown(self):
+        """Destruction de la db temporaire"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+
+    def test_search_with_prefix_and_category(self):
+        """Test de la recherche par préfixe, du filtre de catégorie et des extraits"""
+        results = self.db_manager.search_cards("pari")
+        self.assertEqual(len(results), 2)
+        results = self.db_manager.search_cards("pari", category_id=self.categories["Histoire"])
+        self.assertEqual(len(results), 1)
+        self.assertIn("[Paris]", results[0][4])
+        self.assertEqual(self.db_manager.search_cards("capitale italie")[0][2], "[Capitale] de l'[Italie]")
+
+    def test_index_follows_changes(self):
+        """Test de la synchronisation de l'index par les triggers"""
+        card_id = self.db_manager.search_cards("Rome")[0][0]
+        self.db_manager.delete_card(card_id)
+        self.assertEqual(self.db_manager.search_cards("Rome"), [])
+        self.assertEqual(self.db_manager.search_cards('"  OR ('), [])  # Syntaxe FTS5 neutralisée
+
+    def test_rebuild_index(self):
+        """Test de la reconstruction de l'index d'une base existante"""
+        self.db_manager._connection.execute("DELETE FROM flashcards_fts")
+        self.db_manager._connection.commit()
+        self.assertEqual(self.db_manager.search_cards("Paris"), [])
+        self.db_manager.rebuild_search_index()
+        self.assertEqual(len(self.db_manager.search_cards("Paris")), 2)
+
+    def test_large_batch_indexed(self):
+        """Test de l'indexation différée d'un gros lot (trigger recréé ensuite)"""
+        from DatabaseManager import DEFERRED_SEARCH_INDEX_ROWS
+        self.db_manager.add_cards_bulk(("Lot", f"Question {i}", f"Réponse lot{i}") for i in range(DEFERRED_SEARCH_INDEX_ROWS))
+        self.assertEqual(len(self.db_manager.search_cards(f"lot{DEFERRED_SEARCH_INDEX_ROWS - 1}")), 1)
+        self.assertEqual(len(self.db_manager.search_cards("Paris")), 2)  # Cartes antérieures intactes
+        self.db_manager.add_card(self.categories["Géo"], "Capitale du Pérou", "Lima")
+        self.assertEqual(len(self.db_manager.search_cards("Lima")), 1)
+
+class StoreContractTests:
+    """
+    Tests communs à DatabaseManager et AsyncDatabaseManager : les deux classes
+    doivent avoir la même sémantique. Les sous-classes fournissent call et iterate_cards.
+    """
+    test_db_name = 'test_store_contract.db'
+
+    def setUp(self):
+        self.open_store()
+        self.call('setup_database')
+        self.call('add_category', "Test Category")
+        self.category_id = self.call('get_all_categories')[0][0]
+
+    def tearDown(self):
+        self.close_store()
+        remove_test_db(self.test_db_name)
+
+    def test_categories_and_cards(self):
+        self.call('add_card', self.category_id, "Q1", "A1")
+        cards = self.call('get_cards_by_category', self.category_id)
+        self.assertEqual([(card[1], card[2], card[3]) for card in cards], [("Q1", "A1", 0)])
+
+    def test_scores_and_delete(self):
+        self.call('add_card', self.category_id, "Q1", "A1")
+        card_id = self.call('get_cards_by_category', self.category_id)[0][0]
+        self.call('update_card_score', card_id, True, 0)
+        self.assertEqual(self.call('get_cards_by_category', self.category_id)[0][3], 1)
+        self.assertEqual(self.call('get_due_cards', self.category_id, 0), [])
+        self.call('apply_grades', [(card_id, False, 10)])
+        self.assertEqual(len(self.call('get_due_cards', self.category_id, 10)), 1)
+        self.call('delete_card', card_id)
+        self.assertEqual(self.call('get_cards_by_category', self.category_id), [])
+
+    def test_global_stats(self):
+        self.call('update_global_stats', 3, 1, 4)
+        self.assertEqual(self.call('get_global_stats'), (1, 3, 1, 4))
+
+    def test_bulk_and_pagination(self):
+        self.call('add_cards_bulk', [("Test Category", f"Q{i}", f"A{i}") for i in range(25)])
+        first_page = self.call('get_cards_page', self.category_id, None, 10)
+        self.assertEqual(len(first_page), 10)
+        second_page = self.call('get_cards_page', self.category_id, (first_page[-1][3], first_page[-1][0]), 10)
+        self.assertEqual(second_page[0][0], first_page[-1][0] + 1)
+        self.assertEqual(self.call('get_page_keys', self.category_id, 10),
+                         [(0, first_page[-1][0]), (0, second_page[-1][0])])
+        cards = self.iterate_cards(self.category_id, 7)
+        self.assertEqual([card[1] for card in cards], [f"Q{i}" for i in range(25)])
+
+    def test_category_card_counts(self):
+        self.call('add_cards_bulk', [("Cat A", "Q1", "A1"), ("Cat A", "Q2", "A2"), ("Cat B", "Q3", "A3")])
+        categories = dict((name, category_id) for category_id, name in self.call('get_all_categories'))
+        counts = self.call('get_category_card_counts')
+        self.assertEqual(counts, {categories["Cat A"]: 2, categories["Cat B"]: 1})
+
+    def test_category_stats(self):
+        self.call('add_cards_bulk', [("Test Category", f"Q{i}", f"A{i}") for i in range(4)])
+        card_ids = [card[0] for card in self.call('get_cards_by_category', self.category_id)]
+        self.call('apply_grades', [(card_ids[0], True, 0), (card_ids[0], True, 0), (card_ids[1], True, 0)])
+        self.call('delete_card', card_ids[3])
+        self.assertEqual(self.call('get_category_stats', self.category_id), (3, 0, (1, 1, 1, 0, 0)))
+        self.call('apply_grades', [(card_ids[0], True, 0)] * 3)  # Intervalle de plus de 21 jours
+        self.assertEqual(self.call('get_category_stats', self.category_id), (3, 1, (1, 1, 0, 0, 1)))
+        self.assertEqual(self.call('get_all_category_stats'), {self.category_id: (3, 1, (1, 1, 0, 0, 1))})
+        self.call('rebuild_category_stats')
+        self.assertEqual(self.call('get_category_stats', self.category_id), (3, 1, (1, 1, 0, 0, 1)))
+        self.call('delete_category', self.category_id)
+        self.assertEqual(self.call('get_category_stats', self.category_id), (0, 0, (0, 0, 0, 0, 0)))
+
+class TestSyncStoreContract(StoreContractTests, unittest.TestCase):
+    def open_store(self):
+        self.store = DatabaseManager(self.test_db_name)
+
+    def close_store(self):
+        self.store.close()
+
+    def call(self, name, *args):
+        return getattr(self.store, name)(*args)
+
+    def iterate_cards(self, category_id, batch_size):
+        cards, after = [], None
+        while True:
+            page = self.store.get_cards_page(category_id, after, batch_size)
+            cards.extend(page)
+            if len(page) < batch_size:
+                return cards
+            after = (page[-1][3], page[-1][0])
+
+class TestAsyncStoreContract(StoreContractTests, unittest.TestCase):
+    def open_store(self):
+        self.loop = asyncio.new_event_loop()
+        self.store = AsyncDatabaseManager(self.test_db_name, pool_size=2)
+
+    def close_store(self):
+        self.loop.run_until_complete(self.store.close())
+        self.loop.close()
+
+    def call(self, name, *args):
+        return self.loop.run_until_complete(getattr(self.store, name)(*args))
+
+    def iterate_cards(self, category_id, batch_size):
+        async def collect():
+            return [card async for card in self.store.iter_cards_by_category(category_id, batch_size)]
+        return self.loop.run_until_complete(collect())
+
+    def test_every_operation_is_awaitable(self):
+        """Test que chaque opération publique de DatabaseManager a sa version asynchrone"""
+        operations = {name for name in dir(DatabaseManager) if not name.startswith('_') and name != 'close'}
+        self.assertEqual(operations, set(AsyncDatabaseManager.READ_METHODS + AsyncDatabaseManager.WRITE_METHODS))
+
+    def test_concurrent_reads(self):
+        """Test de lectures concurrentes pendant des écritures"""
+        async def scenario():
+            writes = [self.store.add_card(self.category_id, f"Q{i}", f"A{i}") for i in range(20)]
+            await asyncio.gather(*writes)
+            reads = [self.store.get_cards_by_category(self.category_id) for _ in range(10)]
+            return await asyncio.gather(*reads)
+        results = self.loop.run_until_complete(scenario())
+        self.assertTrue(all(len(cards) == 20 for cards in results))
+
+    def test_connection_options_passed_through(self):
+        """Test des options de connexion explicites, dont persistent"""
+        for persistent in (True, False):
+            store = AsyncDatabaseManager(self.test_db_name, pool_size=1, persistent=persistent, busy_timeout=1.0)
+            try:
+                categories = self.loop.run_until_complete(store.get_all_categories())
+                self.assertEqual(categories, [(self.category_id, "Test Category")])
+            finally:
+                self.loop.run_until_complete(store.close())
+
+class TestShardedStoreContract(StoreContractTests, unittest.TestCase):
+    def open_store(self):
+        self.store = ShardedDatabaseManager(self.test_db_name, shards=3)
+
+    def close_store(self):
+        self.store.close()
+        for name in self.store.shard_names[1:]:
+            remove_test_db(name)
+
+    call = TestSyncStoreContract.call
+    iterate_cards = TestSyncStoreContract.iterate_cards
+
+    def test_categories_are_spread_over_shards(self):
+        """Test de la répartition des catégories et des plages d'identifiants de cartes"""
+        self.call('add_cards_bulk', [(f"Cat {i}", "Question commune", f"A{i}") for i in range(5)])
+        routes = self.store._catalog.get_category_shards()
+        self.assertEqual(sorted(routes.values()), [0, 0, 1, 1, 2, 2])
+        categories = self.store.get_all_categories()
+        self.assertEqual([category_id for category_id, _ in categories], sorted(routes))
+        card_ids = self.store.get_card_categories(
+            card[0] for category_id, _ in categories for card in self.store.get_cards_by_category(category_id))
+        self.assertEqual({card_id >> 40 for card_id in card_ids}, {0, 1, 2})
+        self.assertEqual(len(self.store.search_cards("question", limit=3)), 3)
+        self.assertEqual(len(self.store.search_cards("question", limit=10, offset=2)), 3)
+        self.store.rename_category(categories[-1][0], "Renommée")
+        self.assertEqual(self.store.get_all_categories()[-1][1], "Renommée")
+        self.assertEqual(self.store.add_category("Renommée"), categories[-1][0])
+
+    def test_search_ranks_across_uneven_shards(self):
+        """Test du classement global d'une recherche sur des fichiers de tailles très différentes"""
+        cards = [("Grande", f"Question {i}", f"Réponse {i}") for i in range(200)]
+        cards.append(("Grande", "Relief", "Une longue réponse qui parle en passant d'un volcan parmi bien d'autres choses"))
+        cards += [("Petite", "Volcan", "Etna"), ("Petite", "Volcan actif", "Stromboli")]
+        self.store.add_cards_bulk(cards)
+        routes = self.store._catalog.get_category_shards()
+        self.assertEqual(len(set(routes.values())), 3)  # Fichiers de 0, 201 et 2 cartes
+        reference_name = 'test_search_reference.db'
+        with DatabaseManager(reference_name) as reference:
+            reference.setup_database()
+            reference.add_cards_bulk(cards)
+            expected = [result[2] for result in reference.search_cards("volcan")]
+        remove_test_db(reference_name)
+        # Les deux cartes du petit fichier, où « volcan » est partout, passent avant la carte longue
+        self.assertEqual(expected, ["[Volcan]", "[Volcan] actif", "Relief"])
+        self.assertEqual([result[2] for result in self.store.search_cards("volcan")], expected)
+        self.assertEqual([result[2] for result in self.store.search_cards("volcan", limit=1, offset=1)], expected[1:2])
+        self.assertEqual(self.store.search_cards("volcan actif")[0][2], "[Volcan] [actif]")
+
+    def test_partial_grade_batch_is_not_applied_twice(self):
+        """Test du rejeu d'un lot appliqué sur une partie des fichiers seulement"""
+        second_id = self.store.add_category("Autre")
+        self.store.add_card(self.category_id, "Q1", "A1")
+        self.store.add_card(second_id, "Q2", "A2")
+        first_card = self.store.get_cards_by_category(self.category_id)[0][0]
+        second_card = self.store.get_cards_by_category(second_id)[0][0]
+        grades = [(first_card, True, 0), (second_card, True, 0)]
+        # Arrêt après le commit du premier fichier seulement
+        self.store._shards[first_card >> 40].apply_grades(grades[:1], "journal", 2)
+        self.assertEqual(self.store.get_last_grade_sequence("journal"), 0)
+        self.store.apply_grades(grades, "journal", 2)
+        self.assertEqual(self.store.get_last_grade_sequence("journal"), 2)
+        self.assertEqual(self.store.get_global_stats(), (0, 2, 0, 2))
+
+class TestCardPager(unittest.TestCase):
+    def setUp(self):
+        """Création d'une catégorie de 250 cartes"""
+        self.test_db_name = 'test_flashcards.db'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.db_manager.add_cards_bulk(("Cat", f"Q{i}", f"A{i}") for i in range(250))
+        self.category_id = self.db_manager.get_all_categories()[0][0]
+
+    def tearDown(self):
+        """Destruction de la db temporaire"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+
+    def load(self, pager, first, count, margin=0):
+        for page_index in pager.missing_pages(first, count, margin):
+            pager.store(page_index, pager.fetch_task(page_index)(self.db_manager))
+
+    def test_window_with_prefetch(self):
+        """Test du chargement de la seule fenêtre visible et de sa marge"""
+        pager = CardPager(self.category_id, 250, page_size=50)
+        self.assertEqual(pager.missing_pages(120, 10, margin=20), [2])
+        self.assertEqual(pager.missing_pages(95, 10, margin=20), [1, 2])
+        self.load(pager, 95, 10)
+        self.assertEqual([card[1] for card in pager.rows(98, 4)], ["Q98", "Q99", "Q100", "Q101"])
+
+    def test_jump_without_previous_page(self):
+        """Test d'un saut direct au milieu de la catégorie"""
+        pager = CardPager(self.category_id, 250, page_size=50)
+        self.load(pager, 200, 10)
+        self.assertEqual(list(pager.pages), [4])
+        self.assertEqual(pager.rows(200, 1)[0][1], "Q200")
+        self.assertEqual(pager.rows(0, 1), [None])
+        # Clés de fin de page lues une fois : les sauts suivants ne relisent que la page
+        self.assertEqual(len(pager.page_keys), 5)
+        reads = []
+        get_page_keys = self.db_manager.get_page_keys
+        self.db_manager.get_page_keys = lambda *args, **kwargs: reads.append(args) or get_page_keys(*args, **kwargs)
+        self.load(pager, 100, 10)
+        self.assertEqual(pager.rows(100, 1)[0][1], "Q100")
+        self.assertEqual(reads, [])
+
+    def test_jump_follows_user_order(self):
+        """Test d'un saut dans l'ordre des scores d'un utilisateur, comme les pages"""
+        user_id = self.db_manager.add_user("Alice")
+        cards = self.db_manager.get_cards_by_category(self.category_id)
+        self.db_manager.apply_grades([(card[0], True, 0) for card in cards[:60]], user_id=user_id)
+        pager = CardPager(self.category_id, 250, page_size=50, user_id=user_id)
+        self.load(pager, 150, 10)  # Les 60 cartes réussies par Alice passent en fin d'ordre
+        self.assertEqual(pager.rows(150, 1)[0][1], "Q210")
+        self.assertEqual(self.db_manager.get_card_key_at(self.category_id, 149, user_id=user_id),
+                         pager.page_keys[2])
+        self.assertEqual(self.db_manager.get_card_key_at(self.category_id, 149), (0, cards[149][0]))
+
+    def test_cache_is_bounded(self):
+        """Test de l'éviction des pages les moins récentes"""
+        pager = CardPager(self.category_id, 250, page_size=50, max_pages=2)
+        for first in (0, 50, 100):
+            self.load(pager, first, 10)
+        self.assertEqual(list(pager.pages), [1, 2])
+
 class TestCategoryManager(unittest.TestCase):
     def setUp(self):
         """Création d'une db temporaire pour les tests"""
@@ -88,8 +601,8 @@ class TestCategoryManager(unittest.TestCase):
 
     def tearDown(self):
         """Destruction de la db temporaire pour les tests"""
-        if os.path.exists(self.test_db_name):
-            os.remove(self.test_db_name)
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
 
     def test_add_category(self):
         """Test d'ajout d'une catégorie"""
@@ -109,6 +622,165 @@ class TestCategoryManager(unittest.TestCase):
         for category in test_categories:
             self.assertIn(category, retrieved_categories)
 
+class TestCategoryRegistry(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire et d'un registre vide"""
+        self.test_db_name = 'test_flashcards.db'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.category_manager = CategoryManager(load=False)
+        self.category_manager.db_manager = self.db_manager
+
+    def tearDown(self):
+        """Destruction de la db temporaire"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+
+    def test_lookup_after_incremental_updates(self):
+        """Test de la recherche par nom et par id après ajout, renommage et suppression"""
+        first_id = self.category_manager.add_category("Maths")
+        second_id = self.category_manager.add_category("Histoire")
+        self.assertEqual(self.category_manager.add_category("Maths"), first_id)  # Nom déjà pris
+        self.assertEqual(self.category_manager.get_by_name("Histoire"), (second_id, "Histoire"))
+        self.category_manager.rename_category(second_id, "Géographie")
+        self.assertIsNone(self.category_manager.get_by_name("Histoire"))
+        self.assertEqual(self.category_manager.get_by_id(second_id), (second_id, "Géographie"))
+        self.category_manager.delete_category(first_id)
+        self.assertEqual(self.category_manager.categories, [(second_id, "Géographie")])
+        self.assertEqual(self.category_manager.categories, self.db_manager.get_all_categories())
+
+    def test_card_count_cache(self):
+        """Test du cache du nombre de cartes et de son invalidation"""
+        category_id = self.category_manager.add_category("Maths")
+        self.db_manager.add_card(category_id, "Q1", "A1")
+        self.assertEqual(self.category_manager.get_card_count(category_id), 1)
+        self.db_manager.add_card(category_id, "Q2", "A2")
+        self.assertEqual(self.category_manager.get_card_count(category_id), 1)  # Valeur en cache
+        self.category_manager.invalidate_card_count(category_id)
+        self.assertEqual(self.category_manager.get_card_count(category_id), 2)
+
+    def test_delete_category_removes_cards(self):
+        """Test de la suppression des cartes avec leur catégorie"""
+        category_id = self.category_manager.add_category("Maths")
+        self.db_manager.add_card(category_id, "Q1", "A1")
+        self.category_manager.delete_category(category_id)
+        self.assertEqual(self.db_manager.get_category_card_counts(), {})
+
+    def test_menu_positions(self):
+        """Test des positions dans l'ordre d'ajout après ajouts, renommages et suppressions"""
+        import random
+        rng = random.Random(5)
+        self.category_manager.set_categories([(number, f"C{number}") for number in range(1, 40)])
+        for step in range(200):
+            category_ids = [category_id for category_id, _ in self.category_manager.categories]
+            action = rng.random()
+            if action < 0.4 and category_ids:
+                self.category_manager.forget_category(rng.choice(category_ids))
+            elif action < 0.6 and category_ids:
+                self.category_manager.register_category(rng.choice(category_ids), f"R{step}")
+            else:
+                self.category_manager.register_category(100 + step, f"N{step}")
+            for position, (category_id, _) in enumerate(self.category_manager.categories):
+                self.assertEqual(self.category_manager.get_position(category_id), position)
+        self.assertIsNone(self.category_manager.get_position(-1))
+
+class TestCachedStore(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire derrière un cache"""
+        self.test_db_name = 'test_flashcards.db'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.store = CachedStore(self.db_manager, max_entries=8)
+        self.category_id = self.store.add_category("Maths")
+        self.store.add_cards_bulk([("Maths", f"Q{i}", f"A{i}") for i in range(5)])
+
+    def tearDown(self):
+        self.store.close()
+        remove_test_db(self.test_db_name)
+
+    def test_repeated_reads_are_served_from_memory(self):
+        """Test des lectures répétées servies par le cache"""
+        cards = self.store.get_cards_by_category(self.category_id)
+        cards.clear()  # La liste reçue peut être modifiée sans toucher au cache
+        self.assertEqual(len(self.store.get_cards_by_category(self.category_id)), 5)
+        self.assertEqual((self.store.hits, self.store.misses), (1, 1))
+        self.store.add_card(self.category_id, "Q5", "A5")
+        self.assertEqual(len(self.store.get_cards_by_category(self.category_id)), 6)
+        self.assertEqual(self.store.misses, 2)
+
+    def test_delete_updates_cached_results(self):
+        """Test de la suppression d'une carte reportée dans le cache sans relecture"""
+        self.store.get_category_card_counts()
+        self.store.count_cards(self.category_id)
+        due = self.store.get_due_cards(self.category_id, now=1000.0)
+        misses = self.store.misses
+        self.store.delete_card(due[0][0])
+        self.assertEqual(len(self.store.get_due_cards(self.category_id, now=1001.0)), 4)
+        self.assertEqual(self.store.count_cards(self.category_id), 4)
+        self.assertEqual(self.store.get_category_card_counts(), {self.category_id: 4})
+        self.assertEqual(self.store.misses, misses)
+        self.assertEqual(self.store.get_due_cards(self.category_id, now=1001.0),
+                         self.db_manager.get_due_cards(self.category_id, now=1001.0))
+
+    def test_session_reads_are_cached(self):
+        """Test du cache des clés et des textes lus par la session compacte"""
+        calls = []
+        for name in ('get_due_card_keys', 'get_card_keys_by_category', 'get_card_texts'):
+            method = getattr(self.db_manager, name)
+            setattr(self.db_manager, name,
+                    lambda *args, method=method, name=name, **kwargs: calls.append(name) or method(*args, **kwargs))
+        keys = self.store.get_due_card_keys(self.category_id, now=1000.0)
+        self.assertEqual(self.store.get_due_card_keys(self.category_id, now=1001.0), keys)
+        self.assertEqual(self.store.get_card_keys_by_category(self.category_id),
+                         self.store.get_card_keys_by_category(self.category_id))
+        ids = [card_id for card_id, _ in keys]
+        self.assertEqual(len(self.store.get_card_texts(ids[:3])), 3)
+        self.assertEqual(self.store.get_card_texts(ids[:2]), self.db_manager.get_card_texts(ids[:2]))
+        self.assertEqual(calls, ['get_due_card_keys', 'get_card_keys_by_category', 'get_card_texts', 'get_card_texts'])
+        # Une suppression retire la carte sans relecture, une réponse invalide la catégorie
+        del calls[:]
+        self.store.delete_card(ids[0])
+        self.assertEqual(self.store.get_due_card_keys(self.category_id, now=1001.0), keys[1:])
+        self.assertEqual(self.store.get_card_texts(ids[1:3]), self.db_manager.get_card_texts(ids[1:3]))
+        self.assertEqual(calls, ['get_card_texts'])
+        self.store.apply_grades([(ids[1], True, 1000.0)])
+        self.assertEqual(len(self.store.get_due_card_keys(self.category_id, now=1001.0)), 3)
+        self.assertEqual(calls, ['get_card_texts', 'get_due_card_keys'])
+
+    def test_grades_invalidate_category_and_stats(self):
+        """Test de l'invalidation précise après des réponses"""
+        other_id = self.store.add_category("Histoire")
+        self.store.get_cards_by_category(other_id)
+        card_id = self.store.get_cards_by_category(self.category_id)[0][0]
+        self.store.get_global_stats()
+        self.store.apply_grades([(card_id, True, 1000.0)])
+        self.assertEqual(self.store.get_cards_by_category(self.category_id)[-1][3], 1)
+        self.assertEqual(self.store.get_global_stats()[1], 1)
+        misses = self.store.misses
+        self.store.get_cards_by_category(other_id)  # Autre catégorie : toujours en cache
+        self.assertEqual(self.store.misses, misses)
+        # La carte réussie redevient due un jour plus tard : le résultat en cache expire
+        self.assertEqual(len(self.store.get_due_cards(self.category_id, now=2000.0)), 4)
+        self.assertEqual(len(self.store.get_due_cards(self.category_id, now=1000.0 + 86400)), 5)
+
+    def test_lru_bound(self):
+        """Test de la limite du nombre d'entrées"""
+        for position in range(10):
+            self.store.get_card_key_at(self.category_id, position)
+        self.assertEqual(len(self.store._entries), 8)
+        self.store.get_card_key_at(self.category_id, 0)
+        self.assertEqual(self.store.hits, 0)  # Entrée la plus ancienne oubliée
+
+    def test_managers_share_injected_store(self):
+        """Test de l'injection de la même base dans CategoryManager et CardManager"""
+        category_manager = CategoryManager(db_manager=self.store)
+        card_manager = CardManager(db_manager=self.store)
+        self.assertEqual(category_manager.get_by_name("Maths"), (self.category_id, "Maths"))
+        card_manager.load_cards(self.category_id)
+        card_manager.load_cards(self.category_id)
+        self.assertIs(category_manager.db_manager, card_manager.db_manager)
+        self.assertEqual(self.store.hits, 1)
+
 class TestCardManager(unittest.TestCase):
     def setUp(self):
         """Création d'une db temporaire pour les tests'"""
@@ -127,14 +799,14 @@ class TestCardManager(unittest.TestCase):
 
     def tearDown(self):
         """Destruction de la db temporaire pour les tests"""
-        if os.path.exists(self.test_db_name):
-            os.remove(self.test_db_name)
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
 
     def test_load_cards(self):
         """Test du chargment des cartes d'une catégorie"""
         self.card_manager.load_cards(self.category_id)
         self.assertEqual(len(self.card_manager.cards), 2)
-        self.assertEqual(self.card_manager.current_card_index, 0)
+        self.assertEqual(self.card_manager.get_next_card()[1], "Q1")
 
     def test_get_next_card(self):
         """Test recevoir prochaine carte"""
@@ -153,10 +825,786 @@ class TestCardManager(unittest.TestCase):
     def test_mark_card_as_incorrect(self):
         """Test carte incorrecte"""
         self.card_manager.load_cards(self.category_id)
-        initial_index = self.card_manager.current_card_index
         self.card_manager.mark_card_as_incorrect()
-        # For two cards, after marking incorrect, index should be 1
-        self.assertEqual(self.card_manager.current_card_index, (initial_index + 1) % len(self.card_manager.cards))
+        # The failed card goes back behind the other card of same score
+        self.assertEqual(len(self.card_manager.cards), 2)
+        self.assertEqual(self.card_manager.get_next_card()[1], "Q2")
+
+    def test_failed_card_reinserted_by_score(self):
+        """Test de la réinsertion d'une carte ratée selon son score remis à zéro"""
+        self.card_manager.cards.load([(1, "Q1", "A1", 3), (2, "Q2", "A2", 4), (3, "Q3", "A3", 5)])
+        self.card_manager.mark_card_as_correct()  # Q1 quitte la session
+        self.card_manager.cards.reschedule((2, "Q2", "A2", 6))  # Q2 passe derrière Q3
+        self.assertEqual(self.card_manager.get_next_card()[1], "Q3")
+        self.card_manager.mark_card_as_incorrect()  # Q3 revient à 0 et repasse devant
+        self.assertEqual(self.card_manager.get_next_card(), (3, "Q3", "A3", 0))
+
+    def test_pluggable_policy(self):
+        """Test d'une politique d'ordonnancement alternative"""
+        from ReviewScheduler import ReviewScheduler, InsertionOrder
+        card_manager = CardManager(ReviewScheduler(InsertionOrder()))
+        card_manager.cards.load([(1, "Q1", "A1", 5), (2, "Q2", "A2", 0)])
+        self.assertEqual(card_manager.get_next_card()[1], "Q1")
+        card_manager.db_manager = self.db_manager
+        card_manager.mark_card_as_incorrect()
+        self.assertEqual(card_manager.get_next_card()[1], "Q2")
+
+    def test_compact_session(self):
+        """Test de la session compacte : même ordre, textes lus à la demande"""
+        card_manager = CardManager(db_manager=self.db_manager, compact=True)
+        card_manager.load_cards(self.category_id)
+        self.assertEqual(len(card_manager.cards), 2)
+        self.assertEqual(len(card_manager.cards.texts), 0)  # Aucun texte chargé avec les clés
+        card_id, question, answer, score = card_manager.get_next_card()
+        self.assertEqual((question, answer, score), ("Q1", "A1", 0))
+        self.assertIn(card_id, card_manager.cards.texts)
+        card_manager.mark_card_as_incorrect()
+        self.assertEqual(card_manager.get_next_card()[1], "Q2")
+        card_manager.mark_card_as_correct()
+        self.assertEqual(list(card_manager.cards), [(card_id, "Q1", "A1", 0)])
+
+    def test_incremental_session_changes(self):
+        """Test de l'ajout, du retrait et du changement de score d'une carte sans recharger la session"""
+        for compact in (False, True):
+            card_manager = CardManager(db_manager=self.db_manager, compact=compact)
+            card_manager.load_cards(self.category_id)
+            card_id = self.db_manager.add_card(self.category_id, "Q3", "A3")
+            card_manager.insert_card(card_id, "Q3", "A3")
+            self.assertEqual([card[1] for card in card_manager.cards], ["Q1", "Q2", "Q3"])
+            self.assertTrue(card_manager.update_card_score(card_id, -1))  # Q3 passe en tête
+            self.assertEqual(tuple(card_manager.get_next_card()), (card_id, "Q3", "A3", -1))
+            head = card_manager.get_next_card()[0]
+            self.assertTrue(self.db_manager.delete_card(head))
+            self.assertTrue(card_manager.remove_card(head))
+            self.assertFalse(card_manager.remove_card(head))
+            self.assertFalse(self.db_manager.delete_card(head))
+            self.assertEqual([card[1] for card in card_manager.cards], ["Q1", "Q2"])
+
+    def test_mixed_review(self):
+        """Test de la révision mixte : fusion des catégories par score ou en alternance, lue page par page"""
+        other_id = self.db_manager.add_category("Other Category")
+        for number in range(1, 5):
+            self.db_manager.add_card(other_id, f"O{number}", f"B{number}")
+        self.db_manager.update_card_score(self.db_manager.get_cards_by_category(self.category_id)[1][0], True)
+        reads = []
+        get_cards_page = self.db_manager.get_cards_page
+        self.db_manager.get_cards_page = lambda *args, **kwargs: reads.append(args) or get_cards_page(*args, **kwargs)
+        self.card_manager.load_mixed_cards([self.category_id, other_id], page_size=2)
+        self.assertTrue(self.card_manager.is_mixed)
+        self.assertEqual(len(reads), 2)  # Une page par catégorie
+        self.assertEqual(len(self.card_manager.cards), 6)
+        order = []
+        while self.card_manager.cards:
+            order.append(self.card_manager.get_next_card()[1])
+            self.card_manager.mark_card_as_correct()  # Le score augmente : la carte ne doit pas revenir
+        self.assertEqual(order, ["Q1", "O1", "O2", "O3", "O4", "Q2"])
+
+        # En alternance, une catégorie de poids 2 présente deux cartes par tour
+        self.card_manager.load_mixed_cards([self.category_id, other_id], {other_id: 2}, interleave=True, page_size=2)
+        order = []
+        while self.card_manager.cards:
+            order.append(self.card_manager.get_next_card()[1])
+            self.card_manager.mark_card_as_correct()
+        self.assertEqual(order, ["O1", "Q1", "O2", "O3", "Q2", "O4"])
+        self.card_manager.load_cards(self.category_id)
+        self.assertFalse(self.card_manager.is_mixed)
+
+    def test_mixed_review_pages_from_worker(self):
+        """Test de la révision mixte dont les pages sont lues par un autre thread"""
+        card_manager = CardManager(db_manager=self.db_manager)
+        card_manager.set_mixed_cards([(self.category_id, 1, 2, self.db_manager.get_cards_page(self.category_id, None, 1))],
+                                     page_size=1)
+        self.assertEqual(card_manager.get_next_card()[1], "Q1")
+        needed = card_manager.cards.pages_needed()
+        self.assertEqual(needed, [(self.category_id, (0, card_manager.get_next_card()[0]), 1)])
+        self.assertEqual(card_manager.cards.pages_needed(), [])  # Page déjà demandée
+        card_manager.mark_card_as_incorrect()
+        self.assertIsNone(card_manager.get_next_card())  # En attente de la page suivante
+        self.assertTrue(card_manager.cards)
+        card_manager.cards.add_page(self.category_id, self.db_manager.get_cards_page(*needed[0]))
+        self.assertEqual(card_manager.get_next_card()[1], "Q2")
+        self.assertTrue(card_manager.remove_card(card_manager.get_next_card()[0]))
+        self.assertIsNone(card_manager.get_next_card())
+        for category_id, after, limit in card_manager.cards.pages_needed():
+            card_manager.cards.add_page(category_id, self.db_manager.get_cards_page(category_id, after, limit))
+        self.assertEqual(card_manager.get_next_card()[1], "Q1")  # Catégorie épuisée : reste la carte ratée
+        card_manager.mark_card_as_correct()
+        self.assertFalse(card_manager.cards)
+
+    def test_mixed_review_state_is_bounded(self):
+        """Test de la mémoire d'une révision mixte : rien n'est retenu après un passage complet"""
+        card_ids = [card_id for card_id, _, _, _ in self.db_manager.get_cards_by_category(self.category_id)]
+        card_ids += [self.db_manager.add_card(self.category_id, f"Q{number}", f"A{number}") for number in range(3, 31)]
+        self.card_manager.load_mixed_cards([self.category_id], page_size=4)
+        scheduler = self.card_manager.cards
+        stream = scheduler._streams[self.category_id]
+        self.assertIn(card_ids[1], scheduler)
+        self.assertTrue(scheduler.update(card_ids[1], 0))  # Carte de la page en cours modifiée
+        self.assertTrue(scheduler.remove(card_ids[2]))
+        self.assertFalse(scheduler.remove(card_ids[20]))  # Pas encore lue : ignorée à la lecture
+        for _ in range(100):
+            self.assertTrue(scheduler.update(card_ids[0], 0))  # Tête de flux modifiée sans reconstruire le tas
+        self.assertLessEqual(len(scheduler._heap), 2 * len(scheduler._entries) + 17)
+        seen, failed = [], set()
+        while self.card_manager.cards:
+            card_id = self.card_manager.get_next_card()[0]
+            seen.append(card_id)
+            if card_id % 3 == 0 and card_id not in failed:
+                failed.add(card_id)
+                self.card_manager.mark_card_as_incorrect()
+            else:
+                self.card_manager.mark_card_as_correct()
+            # Seules les cartes notées dont la nouvelle clé est devant le curseur sont retenues
+            self.assertTrue(all((score, card_id) > stream.after for card_id, score in stream.skip.items()))
+        self.assertEqual(sorted(set(seen)), sorted(set(card_ids) - {card_ids[2], card_ids[20]}))
+        self.assertEqual(len(seen), len(set(seen)) + len(failed))
+        self.assertTrue(stream.exhausted)
+        self.assertEqual((stream.skip, scheduler._entries, scheduler._buffered, scheduler._removed), ({}, {}, {}, set()))
+
+    def test_stale_entries_are_bounded(self):
+        """Test de la taille du tas après de nombreux changements de score d'une même carte"""
+        from ReviewScheduler import ReviewScheduler
+        scheduler = ReviewScheduler()
+        scheduler.load([(1, "Q1", "A1", 0), (2, "Q2", "A2", 1)])
+        for score in range(1000):
+            self.assertTrue(scheduler.update(1, score % 3))
+        self.assertLessEqual(len(scheduler._heap), 2 * len(scheduler) + 17)
+        self.assertEqual(len(scheduler), 2)
+        self.assertEqual(scheduler.peek(), (1, "Q1", "A1", 0))
+
+    def test_compact_scheduler_matches_heap(self):
+        """Test de l'ordre de CompactReviewScheduler par rapport à ReviewScheduler"""
+        import random
+        from CardTextCache import CardTextCache
+        from ReviewScheduler import CompactReviewScheduler, InsertionOrder, ReviewScheduler
+        rng = random.Random(3)
+        cards = [(i, f"Q{i}", f"A{i}", rng.randint(0, 5)) for i in range(200)]
+        for policy in (None, InsertionOrder()):
+            reference, compact = ReviewScheduler(policy), CompactReviewScheduler(policy, CardTextCache(max_cards=4))
+            reference.load(cards)
+            compact.load_keys([(card[0], card[3]) for card in cards])
+            for _ in range(300):
+                self.assertEqual(compact.peek()[0], reference.peek()[0])
+                action = rng.random()
+                if action < 0.4:
+                    reference.pop(), compact.pop()
+                elif action < 0.6:
+                    card_id = rng.randrange(200)
+                    self.assertEqual(compact.remove(card_id), reference.remove(card_id))
+                elif action < 0.8:
+                    card_id, score = rng.randrange(200), rng.randint(0, 5)
+                    self.assertEqual(compact.update(card_id, score), reference.update(card_id, score))
+                else:
+                    card = (reference.peek()[0], None, None, rng.randint(0, 5))
+                    reference.reschedule(card), compact.reschedule(card)
+                self.assertEqual(len(compact), len(reference))
+                self.assertEqual([compact._find(card.id) for card in map(compact._card, range(len(compact)))],
+                                 list(range(len(compact))))
+                if not reference:
+                    break
+            self.assertEqual([card[0] for card in compact], [card[0] for card in reference])
+            self.assertIsNone(compact.peek()[1] if compact else None)  # Pas de loader : texte absent
+
+class TestGradeBuffer(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire et d'une catégorie de test"""
+        self.test_db_name = 'test_flashcards.db'
+        self.journal_path = 'test_grades.journal'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.db_manager.add_category("Test Category")
+        self.category_id = self.db_manager.get_all_categories()[0][0]
+        self.db_manager.add_card(self.category_id, "Q1", "A1")
+        self.card_id = self.db_manager.get_cards_by_category(self.category_id)[0][0]
+
+    def tearDown(self):
+        """Destruction de la db et du journal temporaires"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        for path in (self.journal_path, self.journal_path + '.flushing'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def score(self):
+        return self.db_manager.get_cards_by_category(self.category_id)[0][3]
+
+    def test_flush_on_threshold(self):
+        """Test de l'écriture groupée au seuil de taille"""
+        buffer = GradeBuffer(self.db_manager, self.journal_path, max_pending=3)
+        buffer.record(self.card_id, True)
+        buffer.record(self.card_id, True)
+        self.assertEqual(self.score(), 0)
+        self.assertEqual(len(buffer), 2)
+        buffer.record(self.card_id, True)
+        self.assertEqual(self.score(), 3)
+        self.assertEqual(len(buffer), 0)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_recover_after_crash(self):
+        """Test du rejeu du journal après un arrêt avant l'écriture"""
+        buffer = GradeBuffer(self.db_manager, self.journal_path)
+        buffer.record(self.card_id, True)
+        buffer.record(self.card_id, True)
+        buffer._journal.close()  # Simule l'arrêt du processus sans écriture en base
+        GradeBuffer(self.db_manager, self.journal_path)
+        self.assertEqual(self.score(), 2)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_recover_does_not_replay_applied_grades(self):
+        """Test de l'absence de double application si l'arrêt survient après le commit"""
+        buffer = GradeBuffer(self.db_manager, self.journal_path)
+        buffer.record(self.card_id, True)
+        journal = open(self.journal_path).read()
+        buffer.flush()
+        with open(self.journal_path, 'w') as file:
+            file.write(journal)  # Journal non vidé au moment de l'arrêt
+        GradeBuffer(self.db_manager, self.journal_path)
+        self.assertEqual(self.score(), 1)
+
+    def test_card_manager_uses_buffer(self):
+        """Test des réponses regroupées depuis CardManager"""
+        card_manager = CardManager(grade_buffer=GradeBuffer(self.db_manager, self.journal_path))
+        card_manager.db_manager = self.db_manager
+        card_manager.load_cards(self.category_id)
+        card_manager.mark_card_as_correct()
+        self.assertEqual(self.score(), 0)
+        card_manager.load_cards(self.category_id)  # Changement de catégorie : écriture
+        self.assertEqual(self.score(), 1)
+
+class ManualRoot:
+    """Remplace la fenêtre Tkinter : les appels à after sont exécutés à la demande"""
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+
+    def run_pending(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+class TestDatabaseWorker(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire et d'un worker"""
+        self.test_db_name = 'test_flashcards.db'
+        self.root = ManualRoot()
+        self.busy_changes = []
+        self.worker = DatabaseWorker(self.root, lambda: DatabaseManager(self.test_db_name),
+                                     on_busy_change=self.busy_changes.append)
+        self.worker.submit(lambda db: db.setup_database())
+
+    def tearDown(self):
+        """Arrêt du worker et destruction de la db temporaire"""
+        self.worker.stop()
+        remove_test_db(self.test_db_name)
+
+    def wait_results(self):
+        """Attend la fin des tâches puis livre les résultats comme la boucle Tkinter"""
+        self.worker.submit(lambda db: None)
+        while self.worker.busy:
+            self.root.run_pending()
+
+    def test_results_delivered_through_after(self):
+        """Test de la livraison des résultats dans le thread appelant"""
+        results = []
+        self.worker.submit(lambda db: db.add_category("Test Category"))
+        self.worker.submit(lambda db: db.get_all_categories(), results.append)
+        self.assertEqual(results, [])  # Rien n'est livré avant le passage de after
+        self.wait_results()
+        self.assertEqual(results, [[(1, "Test Category")]])
+        self.assertEqual(self.busy_changes, [True, False])
+
+    def test_stale_requests_cancelled(self):
+        """Test de l'annulation des requêtes obsolètes de même clé"""
+        results = []
+        self.worker.submit(lambda db: "première", results.append, key="session")
+        self.worker.submit(lambda db: "seconde", results.append, key="session")
+        self.wait_results()
+        self.assertEqual(results, ["seconde"])
+
+    def test_errors_delivered_to_errback(self):
+        """Test de la transmission des erreurs"""
+        errors = []
+        self.worker.submit(lambda db: db.add_card(999, "Q", "A"), errback=errors.append)
+        self.wait_results()
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], sqlite3.IntegrityError)
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.test_db_name = 'test_instrumentation.db'
+        self.instrumentation = Instrumentation(slow_query_threshold=0.0)
+        self.db_manager = DatabaseManager(self.test_db_name, instrumentation=self.instrumentation)
+        self.db_manager.setup_database()
+
+    def tearDown(self):
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+
+    def test_methods_queries_and_connections_are_measured(self):
+        """Test des mesures par méthode, par requête et des connexions"""
+        category_id = self.db_manager.add_category("Cat")
+        self.db_manager.add_cards_bulk([("Cat", f"Q{i}", "A") for i in range(5)])
+        self.assertEqual(len(self.db_manager.get_cards_by_category(category_id)), 5)
+        self.db_manager.close()
+        snapshot = self.instrumentation.snapshot()
+        self.assertEqual(snapshot['connections'], {'opened': 1, 'closed': 1})
+        self.assertEqual(snapshot['methods']['get_cards_by_category']['count'], 1)
+        self.assertEqual(snapshot['methods']['add_cards_bulk']['buckets']['+Inf'], 1)
+        select = next(sql for sql in snapshot['queries'] if sql.startswith("SELECT id, question, answer"))
+        self.assertEqual(snapshot['queries'][select]['rows'], 5)
+        insert = next(sql for sql in snapshot['queries'] if sql.startswith("INSERT INTO flashcards "))
+        self.assertEqual(snapshot['queries'][insert]['rows'], 5)
+
+    def test_rows_counted_when_iterating(self):
+        """Test du nombre de lignes d'une requête lue en parcourant le curseur"""
+        self.db_manager.add_cards_bulk([("Cat", f"Q{i}", "A") for i in range(5)])
+        card_ids = [card[0] for card in self.db_manager.get_cards_by_category(self.db_manager.add_category("Cat"))]
+        self.assertEqual(len(self.db_manager.get_card_texts(card_ids)), 5)
+        self.db_manager.close()
+        queries = self.instrumentation.snapshot()['queries']
+        select = next(sql for sql in queries if sql.startswith("SELECT id, question, answer FROM flashcards WHERE id IN"))
+        self.assertEqual(queries[select]['rows'], 5)
+
+    def test_slow_query_log_and_exports(self):
+        """Test du journal des requêtes lentes avec leur plan et des exports"""
+        with self.assertLogs('flashcards.sql', level='WARNING') as logs:
+            self.db_manager.count_cards(1)
+        self.assertIn("SELECT card_count FROM category_stats", logs.output[0])
+        sql, _, plan = self.instrumentation.slow_queries[-1]
+        self.assertIn("INTEGER PRIMARY KEY", " ".join(plan))
+        text = self.instrumentation.to_prometheus()
+        self.assertIn('flashcards_method_seconds_count{method="count_cards"} 1', text)
+        self.assertIn('flashcards_connections_opened_total 1', text)
+
+    def test_disabled_by_default(self):
+        """Test de l'absence de mesure sans instrumentation"""
+        db_manager = DatabaseManager(self.test_db_name)
+        db_manager.get_all_categories()
+        self.assertIs(type(db_manager._connection), sqlite3.Connection)
+        self.assertNotIn('get_all_categories', vars(db_manager))
+        db_manager.close()
+
+class TestSpacedRepetition(unittest.TestCase):
+    def test_sm2_intervals(self):
+        """Test de la progression des intervalles SM-2"""
+        from SpacedRepetition import SM2, SECONDS_PER_DAY
+        algorithm = SM2()
+        ease, interval, repetitions = SM2.DEFAULT_EASE, 0, 0
+        intervals = []
+        for _ in range(3):
+            ease, interval, repetitions, next_due = algorithm.review(ease, interval, repetitions, True, now=0)
+            intervals.append(interval)
+        self.assertEqual(intervals, [1, 6, 15])
+        self.assertEqual(next_due, 15 * SECONDS_PER_DAY)
+        ease, interval, repetitions, next_due = algorithm.review(ease, interval, repetitions, False, now=10)
+        self.assertEqual((interval, repetitions, next_due), (0, 0, 10))
+        self.assertGreaterEqual(ease, SM2.MIN_EASE)
+        self.assertLess(ease, SM2.DEFAULT_EASE)
+
+class TestDeckImporter(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire pour les tests"""
+        self.test_db_name = 'test_flashcards.db'
+        self.import_file_name = 'test_deck'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+
+    def tearDown(self):
+        """Destruction de la db et des fichiers temporaires"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        for extension in ('.csv', '.jsonl'):
+            if os.path.exists(self.import_file_name + extension):
+                os.remove(self.import_file_name + extension)
+
+    def test_import_csv(self):
+        """Test d'import d'un fichier CSV par paquets"""
+        path = self.import_file_name + '.csv'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write("category,question,answer\n")
+            for i in range(25):
+                file.write(f"Deck,Q{i},A{i}\n")
+        progress = []
+        importer = DeckImporter(self.db_manager, chunk_size=10, progress_callback=lambda r: progress.append(r.processed))
+        report = importer.import_file(path)
+        self.assertEqual(report.imported, 25)
+        self.assertEqual(progress, [10, 20, 25])
+        category_id = self.db_manager.get_all_categories()[0][0]
+        self.assertEqual(len(self.db_manager.get_cards_by_category(category_id)), 25)
+        self.assertEqual(DeckImporter(self.db_manager).import_file(path).imported, 0)  # Réimport : doublons ignorés
+        report = DeckImporter(self.db_manager, on_duplicate='report').import_file(path)
+        self.assertEqual(len(report.errors), 25)
+
+    def test_import_jsonl_reports_errors(self):
+        """Test des erreurs par ligne sans interrompre l'import"""
+        path = self.import_file_name + '.jsonl'
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"question": "Q1", "answer": "A1"}\n')
+            file.write('pas du json\n')
+            file.write('{"question": "Q2"}\n')
+            file.write('{"category": "Autre", "question": "Q3", "answer": "A3"}\n')
+        report = DeckImporter(self.db_manager).import_file(path, default_category="Défaut")
+        self.assertEqual(report.processed, 4)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([line for line, _ in report.errors], [2, 3])
+        self.assertEqual(sorted(name for _, name in self.db_manager.get_all_categories()), ["Autre", "Défaut"])
+
+class TestDeckPack(unittest.TestCase):
+    def setUp(self):
+        """Création d'une db temporaire et d'un deck binaire"""
+        self.test_db_name = 'test_flashcards.db'
+        self.pack_name = 'test_deck.fcpk'
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.cards = [("Géo", "Capitale de la France", "Paris"), ("Histoire", "Révolution", "1789"),
+                      ("Géo", "Capitale du Japon", "Tōkyō")]
+        DeckPack.write(self.pack_name, self.cards)
+
+    def tearDown(self):
+        """Destruction de la db et du deck"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        for path in (self.pack_name, 'test_export.fcpk'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_random_access(self):
+        """Test de la lecture directe des cartes, regroupées par catégorie"""
+        with DeckPack(self.pack_name) as pack:
+            self.assertEqual(len(pack), 3)
+            self.assertEqual([(name, count) for name, _, count in pack.categories], [("Géo", 2), ("Histoire", 1)])
+            self.assertEqual(pack[1], ("Géo", "Capitale du Japon", "Tōkyō"))
+            self.assertEqual(pack[-1], ("Histoire", "Révolution", "1789"))
+            question, answer = pack.raw_card(1)
+            self.assertEqual(bytes(answer), "Tōkyō".encode('utf-8'))
+            del question, answer  # Les vues doivent être libérées avant la fermeture
+            self.assertEqual(sorted(pack), sorted(self.cards))
+            with self.assertRaises(IndexError):
+                pack[3]
+
+    def test_invalid_file(self):
+        """Test du refus d'un fichier qui n'est pas un deck"""
+        with open(self.pack_name, 'r+b') as file:
+            file.write(b'XXXX')
+        with self.assertRaises(ValueError):
+            DeckPack(self.pack_name)
+
+    def test_corrupt_category_table_closes_file(self):
+        """Test de la fermeture du fichier quand la table des catégories est corrompue"""
+        from DeckPack import CATEGORY, HEADER
+        with open(self.pack_name, 'rb') as file:
+            header = HEADER.unpack(file.read(HEADER.size))
+        categories_at = header[5]
+        closed = []
+        close = DeckPack.close
+        DeckPack.close = lambda pack: closed.append(pack) or close(pack)
+        try:
+            with open(self.pack_name, 'r+b') as file:
+                file.seek(categories_at)
+                name_at = CATEGORY.unpack(file.read(CATEGORY.size))[0]
+                for corruption in (lambda: file.write(CATEGORY.pack(2 ** 40, 0, 2)),  # Nom hors du fichier
+                                   lambda: file.write(CATEGORY.pack(name_at - 2, 0, 2)),  # Longueur démesurée
+                                   lambda: (file.seek(name_at + 4), file.write(b'\xff'))):  # UTF-8 invalide
+                    file.seek(categories_at)
+                    file.write(CATEGORY.pack(name_at, 0, 2))
+                    file.seek(categories_at)
+                    corruption()
+                    file.flush()
+                    with self.assertRaises(ValueError):
+                        DeckPack(self.pack_name)
+                    self.assertTrue(closed[-1]._file.closed)
+        finally:
+            DeckPack.close = close
+        self.assertEqual(len(closed), 3)
+
+    def test_restore_and_export(self):
+        """Test de la restauration dans une base puis de l'export à l'identique"""
+        report = DeckImporter(self.db_manager).import_file(self.pack_name)
+        self.assertEqual((report.processed, report.imported), (3, 3))
+        self.assertEqual(len(self.db_manager.search_cards("Tokyo")), 1)
+        self.assertEqual(DeckPack.export(self.db_manager, 'test_export.fcpk'), 3)
+        with DeckPack('test_export.fcpk') as pack:
+            self.assertEqual(sorted(pack), sorted(self.cards))
+
+class TestMultiUser(unittest.TestCase):
+    def setUp(self):
+        self.test_db_name = 'test_users.db'
+        remove_test_db(self.test_db_name)
+        self.db_manager = DatabaseManager(self.test_db_name)
+        self.db_manager.setup_database()
+        self.category_id = self.db_manager.add_category("Cat")
+        self.card_ids = [self.db_manager.add_card(self.category_id, f"Q{index}", f"A{index}") for index in range(3)]
+
+    def tearDown(self):
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+
+    def test_progress_and_stats_per_user(self):
+        """Test de la séparation de la progression et des statistiques de chaque utilisateur"""
+        alice, bob = self.db_manager.add_user("alice"), self.db_manager.add_user("bob")
+        self.assertEqual(self.db_manager.add_user("alice"), alice)
+        self.assertEqual(self.db_manager.get_all_users(), [(alice, "alice"), (bob, "bob")])
+        now = 1_000_000.0
+        self.db_manager.update_card_score(self.card_ids[0], True, now, user_id=alice)
+        self.db_manager.apply_grades([(self.card_ids[1], True, now), (self.card_ids[2], False, now)], user_id=alice)
+        self.assertEqual([card[0] for card in self.db_manager.get_due_cards(self.category_id, now, user_id=alice)],
+                         [self.card_ids[2]])
+        self.assertEqual(len(self.db_manager.get_due_card_keys(self.category_id, now, user_id=bob)), 3)
+        self.assertEqual(self.db_manager.get_next_due(self.category_id, now, user_id=alice), now + 86400)
+        self.assertEqual([score for _, score in self.db_manager.get_card_keys_by_category(self.category_id)], [0, 0, 0])
+        self.assertEqual(self.db_manager.get_user_stats(alice), (2, 1))
+        self.assertEqual(self.db_manager.get_user_stats(bob), (0, 0))
+        self.assertEqual(self.db_manager.get_category_review_stats(self.category_id, user_id=alice), (2, 1))
+        self.assertEqual(self.db_manager.get_category_review_stats(self.category_id), (2, 1))
+        self.db_manager.rebuild_review_stats()
+        self.assertEqual(self.db_manager.get_user_stats(alice), (2, 1))
+        self.db_manager.delete_card(self.card_ids[0])
+        count = self.db_manager._connection.execute("SELECT COUNT(*) FROM user_progress").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_write_retried_while_locked(self):
+        """Test de la reprise d'une écriture tant qu'une autre connexion verrouille la base"""
+        import threading
+        db_manager = DatabaseManager(self.test_db_name, busy_timeout=0.01, retry_backoff=0.02)
+        blocker = sqlite3.connect(self.test_db_name, check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.1, blocker.commit).start()
+        try:
+            db_manager.update_card_score(self.card_ids[0], True)
+            self.assertGreater(db_manager.lock_retries, 0)
+            self.assertEqual(db_manager.get_category_review_stats(self.category_id), (1, 0))
+            # Sans nouvelle tentative, l'erreur est transmise et rien n'est écrit
+            blocker.execute("BEGIN IMMEDIATE")
+            impatient = DatabaseManager(self.test_db_name, busy_timeout=0.01, write_retries=0)
+            with self.assertRaises(sqlite3.OperationalError):
+                impatient.apply_grades([(self.card_ids[1], True, 0.0)])
+            blocker.rollback()
+            impatient.close()
+            self.assertEqual(db_manager.get_category_review_stats(self.category_id), (1, 0))
+        finally:
+            blocker.close()
+            db_manager.close()
+
+    def test_catalog_writes_retried_while_locked(self):
+        """Test de la reprise des écritures de catégories et des imports sous verrou"""
+        import threading
+        db_manager = DatabaseManager(self.test_db_name, busy_timeout=0.01, retry_backoff=0.02)
+        blocker = sqlite3.connect(self.test_db_name, check_same_thread=False)
+        try:
+            for write in (lambda: db_manager.add_category("Locked"),
+                          lambda: db_manager.add_cards_bulk((("Locked", f"Q{i}", "A") for i in range(3))),
+                          lambda: db_manager.rename_category(self.category_id, "Renamed"),
+                          db_manager.rebuild_review_stats, db_manager.rebuild_search_index):
+                blocker.execute("BEGIN IMMEDIATE")
+                threading.Timer(0.05, blocker.commit).start()
+                retries = db_manager.lock_retries
+                write()
+                self.assertGreater(db_manager.lock_retries, retries)
+            self.assertEqual(sorted(name for _, name in db_manager.get_all_categories()), ["Locked", "Renamed"])
+            self.assertEqual(db_manager.count_cards(db_manager.add_category("Locked")), 3)
+        finally:
+            blocker.close()
+            db_manager.close()
+
+    def test_migrations_retried_and_applied_once(self):
+        """Test des migrations au démarrage sous verrou, sans rejouer celles d'un autre processus"""
+        import threading
+        from DatabaseManager import SCHEMA_VERSION
+        fresh_name = 'test_fresh_migrations.db'
+        remove_test_db(fresh_name)
+        db_manager = DatabaseManager(fresh_name, busy_timeout=0.01, retry_backoff=0.02)
+        blocker = sqlite3.connect(fresh_name, check_same_thread=False)
+        blocker.execute("PRAGMA journal_mode = WAL")  # Fichier créé par le premier processus
+        try:
+            blocker.execute("BEGIN IMMEDIATE")
+            threading.Timer(0.05, blocker.commit).start()
+            db_manager.setup_database()
+            self.assertGreater(db_manager.lock_retries, 0)
+            self.assertEqual(db_manager.get_schema_version(), SCHEMA_VERSION)
+            # Version lue avant qu'un autre processus applique la migration : elle n'est pas rejouée
+            def replayed(cursor):
+                raise AssertionError("migration rejouée")
+            db_manager._apply_migration(SCHEMA_VERSION, [replayed])
+            self.assertEqual(db_manager.get_schema_version(), SCHEMA_VERSION)
+        finally:
+            blocker.close()
+            db_manager.close()
+            remove_test_db(fresh_name)
+
+    def test_concurrency_benchmark(self):
+        """Test du générateur de charge sur quelques réviseurs simultanés"""
+        self.db_manager.close()
+        remove_test_db(self.test_db_name)
+        category_id, users = bench_concurrency.make_database(self.test_db_name, 20, 3)
+        total = bench_concurrency.run(self.test_db_name, category_id, users, 0.2, 5, {'busy_timeout': 1.0})
+        self.assertGreater(total['grades'], 0)
+        self.assertEqual(total['lock_errors'], 0)
+        self.assertEqual(sum(self.db_manager.get_user_stats(user_id)[0] + self.db_manager.get_user_stats(user_id)[1]
+                             for user_id in users), total['grades'])
+
+class TestReviewServer(unittest.TestCase):
+    def setUp(self):
+        import threading
+        self.test_db_name = 'test_server.db'
+        remove_test_db(self.test_db_name)
+        with DatabaseManager(self.test_db_name) as db_manager:
+            db_manager.setup_database()
+            self.category_id = db_manager.add_category("Cat")
+            for index in range(3):
+                db_manager.add_card(self.category_id, f"Q{index}", f"A{index}")
+        self.server = ReviewServer(('127.0.0.1', 0), self.test_db_name, workers=2)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = http.client.HTTPConnection(*self.server.server_address[:2], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        remove_test_db(self.test_db_name)
+
+    def request(self, method, path, body=None):
+        self.connection.request(method, path, None if body is None else json.dumps(body))
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_review_session(self):
+        """Test d'une session de révision complète à travers l'API HTTP, sur une seule connexion"""
+        self.assertEqual(self.request('GET', '/categories'), (200, [{'id': self.category_id, 'name': "Cat", 'cards': 3}]))
+        status, session = self.request('POST', '/sessions', {'category_id': self.category_id, 'user': "alice"})
+        self.assertEqual((status, session['remaining']), (201, 3))
+        path = f"/sessions/{session['session']}"
+        answers = []
+        while True:
+            status, result = self.request('GET', path + '/next')
+            if result['card'] is None:
+                break
+            answers.append(result['card']['answer'])
+            self.request('POST', path + '/grade', {'correct': True})
+        self.assertEqual(sorted(answers), ["A0", "A1", "A2"])
+        self.assertEqual(self.request('POST', path + '/grade', {'correct': True})[0], 409)
+        self.assertEqual(self.request('POST', path + '/grade', {'correct': "oui"})[0], 400)
+        for category_id in (True, False, "1", None):  # JSON true/false ne sont pas des identifiants
+            self.assertEqual(self.request('POST', '/sessions', {'category_id': category_id})[0], 400)
+        status, stats = self.request('GET', f"/stats?user_id={session['user_id']}&category_id={self.category_id}")
+        self.assertEqual((stats['user'], stats['category']), ({'correct': 3, 'incorrect': 0},) * 2)
+        self.assertEqual(self.request('DELETE', path)[1]['reviewed'], 3)
+        self.assertEqual(self.request('GET', path)[0], 404)
+        self.assertEqual(self.request('GET', '/stats')[1]['global']['sessions'], 1)  # Comme une session de l'application
+        self.assertEqual(len(self.server._managers), 1)  # Une seule connexion HTTP, donc un seul thread
+
+    def test_idle_sessions_evicted(self):
+        """Test de l'oubli des sessions inactives"""
+        status, session = self.request('POST', '/sessions', {'category_id': self.category_id})
+        self.assertIsNone(session['user_id'])
+        self.assertEqual(self.server.sessions.evict_idle(), 0)
+        self.assertEqual(self.server.sessions.evict_idle(time.monotonic() + 3600), 1)
+        self.assertEqual(self.request('GET', f"/sessions/{session['session']}/next")[0], 404)
+        # Seule une session oubliée après au moins une réponse est comptabilisée
+        status, session = self.request('POST', '/sessions', {'category_id': self.category_id})
+        self.request('POST', f"/sessions/{session['session']}/grade", {'correct': False})
+        self.assertEqual(self.server.sessions.evict_idle(time.monotonic() + 3600), 1)
+        self.assertEqual(self.request('GET', '/stats')[1]['global']['sessions'], 1)
+
+    def test_invalid_content_length(self):
+        """Test du refus d'un en-tête Content-Length non numérique ou négatif"""
+        for length in ("abc", "-5"):
+            connection = http.client.HTTPConnection(*self.server.server_address[:2], timeout=5)
+            connection.putrequest('POST', '/sessions')
+            connection.putheader('Content-Length', length)
+            connection.endheaders()
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertIn("Content-Length", json.loads(response.read())['error'])
+            self.assertTrue(response.will_close)  # Connexion fermée : le flux ne peut plus être lu
+            connection.close()
+        self.assertEqual(self.request('GET', '/categories')[0], 200)
+
+class FakeStartingApp:
+    """Application minimale dont les étapes de démarrage sont renseignées par le test"""
+    STARTUP_MILESTONES = ("window", "interactive")
+
+    def __init__(self):
+        self.startup_times = {"window": 0.01}
+        self.closed = False
+
+    def on_closing(self):
+        self.closed = True
+
+
+class TestStartup(unittest.TestCase):
+    REPO = os.path.dirname(os.path.abspath(__file__))
+
+    def run_main(self, *arguments):
+        """Exécute main.py dans un répertoire vide et renvoie les modules d'interface importés"""
+        script = (
+            "import runpy, sys\n"
+            f"sys.argv = ['main.py'] + {list(arguments)!r}\n"
+            "try:\n"
+            f"    runpy.run_path({os.path.join(self.REPO, 'main.py')!r}, run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print(sorted(name for name in ('tkinter', 'FlashcardApp') if name in sys.modules))\n"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            environment = dict(os.environ, PYTHONPATH=self.REPO)
+            result = subprocess.run([sys.executable, "-c", script], cwd=directory, env=environment,
+                                    capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip().splitlines()
+
+    def test_command_line_paths_do_not_import_gui(self):
+        """Test que les modes sans fenêtre n'importent ni tkinter ni FlashcardApp"""
+        for arguments in (["--deduplicate"], ["--rebuild-stats"], ["--deduplicate", "--shards", "2"]):
+            with self.subTest(arguments=arguments):
+                output = self.run_main(*arguments)
+                self.assertEqual(output[-1], "[]")
+
+    def test_measure_startup_reports_every_milestone(self):
+        """Test que --measure-startup attend toutes les étapes, les affiche en ms puis ferme l'application"""
+        root = ManualRoot()
+        app = FakeStartingApp()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.measure_startup(root, app, 0.005)
+            root.run_pending()  # Démarrage en cours : nouvelle vérification programmée
+            self.assertEqual(output.getvalue(), "")
+            self.assertFalse(app.closed)
+            app.startup_times["interactive"] = 0.02
+            root.run_pending()
+        report = json.loads(output.getvalue())
+        self.assertTrue(app.closed)
+        self.assertEqual(report, {"imports": 5.0, "window": 10.0, "interactive": 20.0})
+
+    @unittest.skipUnless(os.environ.get("DISPLAY"), "nécessite un affichage")
+    def test_measure_startup_with_window(self):
+        """Test de bout en bout de main.py --measure-startup avec la vraie fenêtre"""
+        with tempfile.TemporaryDirectory() as directory:
+            result = subprocess.run([sys.executable, os.path.join(self.REPO, "main.py"), "--measure-startup"],
+                                    cwd=directory, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertLessEqual({"imports", "window", "interactive", "schema", "categories", "global_stats"},
+                             set(report))
+
+class TestStorageBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.test_db_name = 'test_bench.db'
+        remove_test_db(self.test_db_name)
+
+    def tearDown(self):
+        remove_test_db(self.test_db_name)
+
+    def test_suite_runs_and_detects_regressions(self):
+        """Test de la suite de benchmarks sur une petite base et de la comparaison à une référence"""
+        bench_storage.make_database(self.test_db_name, 3, 20, seed=1)
+        results = bench_storage.run_suite(self.test_db_name, sample=2, grades=20, repeat=1)
+        self.assertEqual(results['category_load']['operations'], 3)
+        self.assertEqual(results['card_load']['operations'], 40)
+        self.assertEqual(bench_storage.compare(results, {'results': results}, 0.3), [])
+        faster = {'results': {'card_load': dict(results['card_load'], min_s=results['card_load']['min_s'] / 10)}}
+        self.assertEqual([name for name, _, _ in bench_storage.compare(results, faster, 0.3)], ['card_load'])
 
 if __name__ == '__main__':
     unittest.main()